@@ -0,0 +1,172 @@
+"""
+Overpass 미러 클라이언트 (헤징 + 상태 점수 + 서킷 브레이커)
+- 가장 건강한 미러부터 요청하고, 응답이 p50 지연만큼 늦으면 다음 미러에도 요청을 겹쳐 보내 먼저 온 정상 응답을 사용
+- 미러별 최근 N회(롤링 윈도) 지연/오류율로 순위를 매김: 점수 = p50 지연 x (1 + 4 x 오류율)
+- 연속 실패가 쌓인 미러는 쿨다운 동안 건너뛰고(열림), 쿨다운 뒤 동시 요청 중 하나만 시험(반열림) 후 닫음
+- main.py / backend.* 두 경로로 임포트되어도 같은 상태를 공유
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+for _alias in ("geo_mirrors", "backend.geo_mirrors"):
+    sys.modules.setdefault(_alias, sys.modules[__name__])
+
+T = TypeVar("T")
+
+
+class _MirrorHealth:
+    def __init__(self, window: int):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)  # (지연 초, 성공)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False  # 반열림 시험 요청 진행 중
+
+    def p50(self) -> Optional[float]:
+        ok = [latency for latency, success in self.samples if success]
+        return float(np.median(ok)) if ok else None
+
+    def error_rate(self) -> float:
+        return sum(1 for _, success in self.samples if not success) / len(self.samples) if self.samples else 0.0
+
+
+class MirrorPool:
+    """같은 요청을 받는 여러 미러에 대한 헤징 클라이언트.
+
+    hedge_min_sec: 다음 미러로 헤징하기 전 최소 대기 (OVERPASS_HEDGE_MIN_SEC, 기본 0.3초)
+    failures: 이만큼 연속 실패하면 서킷을 엶 (OVERPASS_BREAKER_FAILURES, 기본 3)
+    cooldown_sec: 열린 서킷을 건너뛰는 시간 (OVERPASS_BREAKER_COOLDOWN_SEC, 기본 60초)
+    """
+
+    def __init__(self, urls: Sequence[str], window: int = 50, hedge_min_sec: Optional[float] = None,
+                 failures: Optional[int] = None, cooldown_sec: Optional[float] = None):
+        self.urls = list(urls)
+        self.hedge_min_sec = (
+            float(os.getenv("OVERPASS_HEDGE_MIN_SEC", "0.3")) if hedge_min_sec is None else hedge_min_sec
+        )
+        self.failures = int(os.getenv("OVERPASS_BREAKER_FAILURES", "3")) if failures is None else failures
+        self.cooldown_sec = (
+            float(os.getenv("OVERPASS_BREAKER_COOLDOWN_SEC", "60")) if cooldown_sec is None else cooldown_sec
+        )
+        self._health: Dict[str, _MirrorHealth] = {url: _MirrorHealth(window) for url in self.urls}
+        self._lock = threading.Lock()
+
+    def _score(self, url: str) -> float:
+        health = self._health[url]
+        p50 = health.p50()
+        if p50 is None:
+            return 0.0 if not health.samples else float("inf")  # 처음 보는 미러는 먼저 시험
+        return p50 * (1 + 4 * health.error_rate())
+
+    def ranked(self) -> List[str]:
+        """요청할 미러 순서 (열린 서킷과 시험 요청 중인 미러 제외). 모두 열려 있으면 빈 목록."""
+        now = time.monotonic()
+        with self._lock:
+            usable = []
+            for url in self.urls:
+                health = self._health[url]
+                if health.open_until <= now and not health.probing:
+                    usable.append(url)
+            return sorted(usable, key=self._score)
+
+    def _claim(self, url: str) -> Tuple[bool, bool]:
+        """(지금 url로 보내도 되는지, 반열림 시험 요청인지). 시험 요청은 고른 순간 잠금 안에서 표시해 하나만 보냄."""
+        with self._lock:
+            health = self._health[url]
+            if health.open_until == 0.0:
+                return True, False  # 닫힘
+            if health.open_until > time.monotonic() or health.probing:
+                return False, False  # 열림, 또는 다른 요청이 이미 시험 중
+            health.probing = True
+            return True, True
+
+    def hedge_delay(self, url: str, timeout: float) -> float:
+        """url 응답을 기다린 뒤 다음 미러를 추가로 부를 때까지의 시간 (해당 미러 p50, 상한 timeout/2)"""
+        with self._lock:
+            p50 = self._health[url].p50()
+        return min(max(self.hedge_min_sec, p50 if p50 is not None else self.hedge_min_sec), timeout / 2)
+
+    def record(self, url: str, latency: float, ok: bool, probe: bool = False) -> None:
+        with self._lock:
+            health = self._health[url]
+            health.samples.append((latency, ok))
+            if probe:
+                health.probing = False
+            if ok:
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                return
+            health.consecutive_failures += 1
+            # 시험 요청 실패는 바로 다시 열고, 닫힌 서킷은 연속 실패가 쌓이면 엶
+            if probe or health.consecutive_failures >= self.failures:
+                health.open_until = time.monotonic() + self.cooldown_sec
+
+    def _launch(self, url: str, send: Callable[[str], T], probe: bool) -> "Future[Tuple[bool, Optional[T]]]":
+        """요청마다 데몬 스레드 하나 — 진 헤지가 시간 초과까지 붙잡혀 있어도 새 요청이 그 뒤에 줄 서지 않음"""
+        future: "Future[Tuple[bool, Optional[T]]]" = Future()
+        submitted = time.monotonic()
+
+        def run() -> None:
+            try:
+                value = send(url)
+            except Exception:
+                self.record(url, time.monotonic() - submitted, False, probe)
+                future.set_result((False, None))
+                return
+            self.record(url, time.monotonic() - submitted, True, probe)
+            future.set_result((True, value))
+
+        threading.Thread(target=run, name="mirror", daemon=True).start()
+        return future
+
+    def request(self, send: Callable[[str], T], timeout: float) -> Optional[T]:
+        """send(url)을 건강한 미러부터 헤징하며 호출해 처음 성공한 값을 반환합니다.
+
+        send는 실패 시 예외를 던져야 합니다. 모든 미러 실패 또는 timeout 초과 시 None.
+        """
+        candidates = self.ranked()
+        deadline = time.monotonic() + timeout
+        running: Dict = {}
+        next_launch = 0.0
+        while candidates or running:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if candidates and now >= next_launch:
+                url = candidates.pop(0)
+                allowed, probe = self._claim(url)
+                if not allowed:
+                    continue  # 순위를 정한 뒤 서킷이 열렸거나 다른 요청이 시험 중
+                running[self._launch(url, send, probe)] = url
+                next_launch = now + self.hedge_delay(url, timeout)
+                continue
+            until = min(deadline, next_launch) if candidates else deadline
+            done, _ = wait(list(running), timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                ok, value = future.result()
+                if ok:
+                    return value
+                next_launch = 0.0  # 실패하면 기다리지 않고 다음 미러로
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            out = {}
+            for url, health in self._health.items():
+                p50 = health.p50()
+                out[url] = {
+                    "requests": len(health.samples),
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "error_rate": round(health.error_rate(), 4),
+                    "open": health.open_until > now,
+                }
+            return out
@@ -0,0 +1,553 @@
+"""
+로컬 POI(병원/의원/약국) 공간 인덱스
+- OSM 추출본(Overpass JSON 덤프) 또는 누적된 Overpass 응답을 SQLite(POI_DB_PATH)에 보관
+- 카테고리별 KD-트리(단위 구 위 3차원 좌표)로 최근접 N개를 로컬에서 조회 (요청당 네트워크 없음)
+- 지오해시 셀 타일 캐시: 셀별로 한 번 받아 온 시각을 기록(TTL), 반경 질의를 덮는 셀 중 없거나 만료된
+  셀만 하나의 Overpass bbox 질의로 갱신 — SQLite(WAL)라 워커 간 공유, 재시작 후에도 적중
+- 주소 태그가 없는 POI는 응답을 막지 않고 백그라운드 워커(AddressWorker)가 역지오코딩해
+  좌표→주소 캐시(같은 SQLite)에 채움 — 요청 간격은 워커/프로세스 전체에서 공유 (Nominatim 1회/초 정책)
+- 병원과 약국처럼 여러 카테고리 그룹은 nearby_poi_groups로 Overpass 한 번에 받아 그룹별로 나눔
+- main.py / backend.* 두 경로로 임포트되어도 같은 저장소를 공유
+"""
+
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+for _alias in ("geo_poi_store", "backend.geo_poi_store"):
+    sys.modules.setdefault(_alias, sys.modules[__name__])
+
+EARTH_RADIUS_KM = 6371.0
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# OSM amenity 태그 → 저장 카테고리
+CATEGORIES = ("hospital", "clinic", "pharmacy")
+
+Element = Dict
+BBox = Tuple[float, float, float, float]  # (south, west, north, east)
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r)])
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def circle_bbox(lat: float, lon: float, radius_m: float) -> BBox:
+    """반경 radius_m 원을 감싸는 bbox"""
+    dlat = math.degrees(radius_m / 1000 / EARTH_RADIUS_KM)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """지오해시 셀의 (위도 폭, 경도 폭) — 5비트/글자, 경도 비트부터 번갈아 배치"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def _cell_hash(i: int, j: int, precision: int) -> str:
+    """위도 칸 번호 i, 경도 칸 번호 j의 지오해시 문자열"""
+    bits = 5 * precision
+    lat_bits, lon_bits = bits // 2, (bits + 1) // 2
+    value = 0
+    for b in range(bits):
+        if b % 2 == 0:  # 짝수 비트는 경도
+            bit = (j >> (lon_bits - 1 - b // 2)) & 1
+        else:
+            bit = (i >> (lat_bits - 1 - b // 2)) & 1
+        value = (value << 1) | bit
+    return "".join(_GEOHASH_BASE32[(value >> (5 * k)) & 31] for k in reversed(range(precision)))
+
+
+def geohash(lat: float, lon: float, precision: int = 6) -> str:
+    dlat, dlon = _cell_size(precision)
+    return _cell_hash(int((lat + 90) // dlat), int((lon + 180) // dlon), precision)
+
+
+def cells_in_bbox(bbox: BBox, precision: int, inside: bool = False) -> List[Tuple[str, BBox]]:
+    """bbox와 겹치는(inside=True면 bbox 안에 완전히 들어가는) 지오해시 셀 목록 (셀 해시, 셀 bbox)"""
+    south, west, north, east = bbox
+    dlat, dlon = _cell_size(precision)
+    eps = 1e-9
+    if inside:
+        i0, i1 = math.ceil((south + 90) / dlat - eps), math.floor((north + 90) / dlat + eps) - 1
+        j0, j1 = math.ceil((west + 180) / dlon - eps), math.floor((east + 180) / dlon + eps) - 1
+    else:
+        i0, i1 = math.floor((south + 90) / dlat), math.floor((north + 90) / dlat - eps)
+        j0, j1 = math.floor((west + 180) / dlon), math.floor((east + 180) / dlon - eps)
+    return [
+        (_cell_hash(i, j, precision), (i * dlat - 90, j * dlon - 180, (i + 1) * dlat - 90, (j + 1) * dlon - 180))
+        for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)
+    ]
+
+
+def union_bbox(boxes: Iterable[BBox]) -> BBox:
+    boxes = list(boxes)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def build_address_from_tags(tags: Dict[str, str]) -> str:
+    parts: List[str] = []
+    # Common OSM address tags in Japan
+    for key in [
+        "addr:prefecture",
+        "addr:city",
+        "addr:ward",
+        "addr:district",
+        "addr:suburb",
+        "addr:neighbourhood",
+        "addr:street",
+        "addr:block",
+        "addr:housenumber",
+        "addr:postcode",
+    ]:
+        val = tags.get(key)
+        if val:
+            parts.append(val)
+    if not parts:
+        # fallback single fields
+        for key in ["addr:full", "addr:place", "addr:hamlet"]:
+            val = tags.get(key)
+            if val:
+                parts.append(val)
+                break
+    return " ".join(parts)
+
+
+# 주소 캐시 좌표 키: 소수점 5자리(약 1m) 격자
+ADDRESS_KEY_SCALE = 100000
+
+
+def address_key(lat: float, lon: float) -> Tuple[int, int]:
+    return round(lat * ADDRESS_KEY_SCALE), round(lon * ADDRESS_KEY_SCALE)
+
+
+def element_category(tags: Dict[str, str]) -> Optional[str]:
+    amenity = (tags or {}).get("amenity")
+    if amenity in CATEGORIES:
+        return amenity
+    if (tags or {}).get("healthcare") == "pharmacy":
+        return "pharmacy"
+    return None
+
+
+def element_point(el: Element) -> Tuple[Optional[float], Optional[float]]:
+    """node는 좌표, way/relation은 out center의 중심 좌표"""
+    if el.get("lat") is not None and el.get("lon") is not None:
+        return float(el["lat"]), float(el["lon"])
+    center = el.get("center") or {}
+    if center.get("lat") is None or center.get("lon") is None:
+        return None, None
+    return float(center["lat"]), float(center["lon"])
+
+
+class POIStore:
+    """SQLite에 영속화되는 POI 저장소 + 지오해시 타일 캐시 + 카테고리별 KD-트리.
+
+    트리는 데이터가 바뀐 뒤 첫 조회 때 다시 만들고, 조회는 잠금 없이 현재 트리 사전을 읽습니다.
+    다른 워커가 타일을 갱신하면 타일 조회 시 더 새로운 fetched_at을 보고 트리를 다시 읽습니다.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_sec: Optional[float] = None,
+                 precision: Optional[int] = None):
+        default = Path(__file__).resolve().parents[1] / "data" / "cache" / "geo" / "poi.sqlite"
+        self.db_path = str(db_path or os.getenv("POI_DB_PATH", str(default)))
+        # 타일 TTL: 이보다 오래된 셀은 Overpass로 다시 받음 (기본 7일)
+        self.ttl_sec = float(os.getenv("POI_TILE_TTL_SEC", str(7 * 86400))) if ttl_sec is None else ttl_sec
+        # 지오해시 정밀도 (6 = 약 1.2km x 0.6km 셀)
+        self.precision = int(os.getenv("POI_TILE_PRECISION", "6")) if precision is None else precision
+        self._lock = threading.Lock()
+        self._trees: Optional[Dict[str, Tuple[cKDTree, List[Dict]]]] = None
+        self._trees_stamp = 0.0  # 트리에 반영된 가장 최근 타일 fetched_at
+        self.tile_hits = 0
+        self.tile_misses = 0
+        self._init_db()
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """트랜잭션 단위 연결 (:memory:는 연결마다 새 DB이므로 하나를 재사용)"""
+        conn = self._memory_conn or sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            if conn is not self._memory_conn:
+                conn.close()
+
+    def _init_db(self) -> None:
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        if self.db_path == ":memory:":
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._db() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pois (
+                    osm_type TEXT NOT NULL,
+                    osm_id INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    name TEXT,
+                    address TEXT,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (osm_type, osm_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tiles (
+                    geohash TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (geohash, category)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS addresses (
+                    lat_key INTEGER NOT NULL,
+                    lon_key INTEGER NOT NULL,
+                    address TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (lat_key, lon_key)
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, next_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS pois_lat ON pois (lat)")
+        if self._memory_conn is None:
+            # 여러 워커가 읽는 동안에도 한 워커가 타일을 기록할 수 있도록
+            with self._db() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+
+    # ---- 적재 ----
+
+    def ingest(self, elements: Iterable[Element], categories: Sequence[str] = (),
+               bbox: Optional[BBox] = None, fetched_at: Optional[float] = None) -> int:
+        """Overpass 요소를 저장하고, bbox가 주어지면 bbox 안에 완전히 들어가는 지오해시 셀을
+        categories에 대해 '받아 옴'(fetched_at)으로 기록합니다.
+
+        bbox 안에서 이번 응답에 없는 같은 카테고리 POI는 폐업/삭제로 보고 지웁니다.
+        호출자는 완전한 응답만 넘겨야 합니다 — 불완전 응답(Overpass 시간 초과 시 200 + remark)은
+        fetch_overpass_pois가 실패(None)로 걸러 내므로, 빈 카테고리도 '없음'으로 타일을 기록합니다.
+        """
+        now = time.time() if fetched_at is None else fetched_at
+        rows = []
+        for el in elements:
+            tags = el.get("tags") or {}
+            category = element_category(tags)
+            lat, lon = element_point(el)
+            if category is None or lat is None or el.get("id") is None:
+                continue
+            name = tags.get("name") or tags.get("name:ja") or tags.get("name:en") or ""
+            address = build_address_from_tags(tags)
+            rows.append((el.get("type", "node"), int(el["id"]), category, name, address, lat, lon, now))
+        with self._lock, self._db() as conn:
+            if bbox is not None and categories:
+                south, west, north, east = bbox
+                marks = ",".join("?" * len(categories))
+                conn.execute(
+                    f"DELETE FROM pois WHERE category IN ({marks}) AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+                    (*categories, south, north, west, east),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?)",
+                    [(cell, c, now) for cell, _ in cells_in_bbox(bbox, self.precision, inside=True) for c in categories],
+                )
+            conn.executemany("INSERT OR REPLACE INTO pois VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._trees = None
+        return len(rows)
+
+    # ---- 조회 ----
+
+    def _load_trees(self) -> Dict[str, Tuple[cKDTree, List[Dict]]]:
+        trees = self._trees
+        if trees is not None:
+            return trees
+        with self._lock, self._db() as conn:
+            stamp = conn.execute("SELECT COALESCE(MAX(fetched_at), 0) FROM tiles").fetchone()[0]
+            rows = conn.execute("SELECT category, name, address, lat, lon FROM pois").fetchall()
+            trees = {}
+            for category in CATEGORIES:
+                items = [
+                    {"name": name or category, "address": address or "", "lat": lat, "lon": lon}
+                    for cat, name, address, lat, lon in rows if cat == category
+                ]
+                if items:
+                    coords = _unit_vectors(np.array([i["lat"] for i in items]), np.array([i["lon"] for i in items]))
+                    trees[category] = (cKDTree(coords), items)
+            self._trees = trees
+            self._trees_stamp = stamp
+        return trees
+
+    def stale_cells(self, lat: float, lon: float, radius_m: float, categories: Sequence[str]) -> List[Tuple[str, BBox]]:
+        """반경 radius_m 원을 덮는 셀 중, 어느 카테고리든 아직 받지 않았거나 TTL이 지난 셀"""
+        cells = cells_in_bbox(circle_bbox(lat, lon, radius_m), self.precision)
+        hashes = [h for h, _ in cells]
+        marks = ",".join("?" * len(hashes))
+        cat_marks = ",".join("?" * len(categories))
+        with self._db() as conn:
+            rows = conn.execute(
+                f"SELECT geohash, category, fetched_at FROM tiles WHERE geohash IN ({marks}) AND category IN ({cat_marks})",
+                (*hashes, *categories),
+            ).fetchall()
+        fetched = {(h, c): t for h, c, t in rows}
+        if rows and max(t for _, _, t in rows) > self._trees_stamp:
+            # 다른 워커가 갱신한 타일이 있으면 트리를 다시 읽음
+            self._trees = None
+        cutoff = time.time() - self.ttl_sec
+        stale = [(h, box) for h, box in cells if any(fetched.get((h, c), 0.0) < cutoff for c in categories)]
+        self.tile_hits += len(cells) - len(stale)
+        self.tile_misses += len(stale)
+        return stale
+
+    def covers(self, lat: float, lon: float, radius_m: float, categories: Sequence[str]) -> bool:
+        """반경 radius_m 원을 덮는 셀이 모두 TTL 안에 받아져 있는지"""
+        return not self.stale_cells(lat, lon, radius_m, categories)
+
+    def nearest(self, lat: float, lon: float, categories: Sequence[str], n: int = 5,
+                radius_m: Optional[float] = None) -> List[Dict]:
+        """categories 중 가장 가까운 POI n개 (distance: km, 같은 이름+좌표 중복 제거)"""
+        trees = self._load_trees()
+        q = _unit_vectors(np.array([lat]), np.array([lon]))[0]
+        bound = _km_to_chord(radius_m / 1000) if radius_m else np.inf
+        found: List[Tuple[float, Dict]] = []
+        for category in categories:
+            if category not in trees:
+                continue
+            tree, items = trees[category]
+            k = min(n * 2, len(items))  # 중복 제거 여유분
+            chords, idx = tree.query(q, k=k, distance_upper_bound=bound)
+            for chord, i in zip(np.atleast_1d(chords), np.atleast_1d(idx)):
+                if np.isfinite(chord):
+                    found.append((float(_chord_to_km(np.float64(chord))), items[i]))
+        found.sort(key=lambda t: (t[0], t[1]["name"]))
+        seen = set()
+        out: List[Dict] = []
+        for dist, item in found:
+            key = (item["name"], round(item["lat"], 5), round(item["lon"], 5))
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append({**item, "distance": dist})
+            if len(out) >= n:
+                break
+        return out
+
+    # ---- 좌표→주소 캐시 ----
+
+    def cached_addresses(self, points: Iterable[Tuple[float, float]],
+                         retry_sec: Optional[float] = None) -> Dict[Tuple[int, int], str]:
+        """캐시에 있는 좌표의 주소 (키: address_key). 빈 결과(주소 없음/실패)는 retry_sec 동안만 유효."""
+        if retry_sec is None:
+            retry_sec = float(os.getenv("ADDRESS_RETRY_SEC", "86400"))
+        keys = list({address_key(lat, lon) for lat, lon in points})
+        if not keys:
+            return {}
+        cutoff = time.time() - retry_sec
+        found: Dict[Tuple[int, int], str] = {}
+        with self._db() as conn:
+            for start in range(0, len(keys), 400):  # SQLite 바인딩 변수 수 제한
+                part = keys[start:start + 400]
+                where = " OR ".join("(lat_key = ? AND lon_key = ?)" for _ in part)
+                rows = conn.execute(
+                    f"SELECT lat_key, lon_key, address, fetched_at FROM addresses WHERE {where}",
+                    [v for key in part for v in key],
+                ).fetchall()
+                for lat_key, lon_key, address, fetched_at in rows:
+                    if address or fetched_at >= cutoff:
+                        found[(lat_key, lon_key)] = address
+        return found
+
+    def save_address(self, lat: float, lon: float, address: str) -> None:
+        """역지오코딩 결과를 캐시하고, 같은 좌표의 주소 없는 POI에도 기록합니다 (다음 트리 빌드에 반영)."""
+        lat_key, lon_key = address_key(lat, lon)
+        with self._lock, self._db() as conn:
+            conn.execute("INSERT OR REPLACE INTO addresses VALUES (?, ?, ?, ?)", (lat_key, lon_key, address, time.time()))
+            if address:
+                half = 0.5 / ADDRESS_KEY_SCALE
+                conn.execute(
+                    "UPDATE pois SET address = ? WHERE address = '' AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+                    (address, lat_key / ADDRESS_KEY_SCALE - half, lat_key / ADDRESS_KEY_SCALE + half,
+                     lon_key / ADDRESS_KEY_SCALE - half, lon_key / ADDRESS_KEY_SCALE + half),
+                )
+
+    def reserve_slot(self, name: str, interval_sec: float) -> float:
+        """name 외부 API의 다음 호출 시각을 예약해 반환합니다 (같은 DB를 쓰는 모든 워커/프로세스가 공유)."""
+        with self._lock, self._db() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # 읽고-쓰기 사이에 다른 프로세스가 끼어들지 못하게
+            row = conn.execute("SELECT next_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            slot = max(time.time(), row[0] if row else 0.0)
+            conn.execute("INSERT OR REPLACE INTO rate_limits VALUES (?, ?)", (name, slot + interval_sec))
+        return slot
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock, self._db() as conn:
+            counts = dict(conn.execute("SELECT category, COUNT(*) FROM pois GROUP BY category").fetchall())
+            tiles = conn.execute("SELECT COUNT(DISTINCT geohash) FROM tiles").fetchone()[0]
+            addresses = conn.execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
+        lookups = self.tile_hits + self.tile_misses
+        return {
+            **{c: counts.get(c, 0) for c in CATEGORIES},
+            "tiles": tiles,
+            "tile_hits": self.tile_hits,
+            "tile_misses": self.tile_misses,
+            "tile_hit_rate": round(self.tile_hits / lookups, 4) if lookups else 0.0,
+            "addresses": addresses,
+        }
+
+
+# 그룹 이름 → (카테고리들, 반경 m, 최대 개수)
+POIGroup = Tuple[Sequence[str], float, int]
+
+
+def nearby_poi_groups(
+    store: POIStore, lat: float, lon: float, groups: Dict[str, POIGroup],
+    fetch: Callable[[BBox, Sequence[str]], Optional[List[Element]]],
+) -> Dict[str, List[Dict]]:
+    """여러 카테고리 그룹(예: 병원/약국)을 Overpass 왕복 최대 한 번으로 조회합니다.
+
+    그룹별 반경을 덮는 셀 중 없거나 만료된 셀을 모아, 합친 bbox 하나에 모든 그룹의 카테고리를
+    한 질의로 받아 적재한 뒤 그룹마다 로컬 인덱스에서 최근접을 나눠 반환합니다.
+    fetch가 실패(None)하면 저장된 (오래된) 결과라도 반환합니다.
+    """
+    stale: Dict[str, BBox] = {}
+    categories: List[str] = []
+    for group_categories, radius_m, _ in groups.values():
+        categories += [c for c in group_categories if c not in categories]
+        stale.update(store.stale_cells(lat, lon, radius_m, group_categories))
+    if stale:
+        bbox = union_bbox(stale.values())
+        elements = fetch(bbox, categories)
+        if elements is not None:
+            store.ingest(elements, categories, bbox=bbox)
+    return {
+        name: store.nearest(lat, lon, group_categories, n=n, radius_m=radius_m)
+        for name, (group_categories, radius_m, n) in groups.items()
+    }
+
+
+def nearby_pois(
+    store: POIStore, lat: float, lon: float, categories: Sequence[str], radius_m: float, n: int,
+    fetch: Callable[[BBox, Sequence[str]], Optional[List[Element]]],
+) -> List[Dict]:
+    """로컬 저장소 우선 최근접 조회 (그룹 하나짜리 nearby_poi_groups)"""
+    return nearby_poi_groups(store, lat, lon, {"": (categories, radius_m, n)}, fetch)[""]
+
+
+class AddressWorker:
+    """주소 없는 POI를 백그라운드에서 역지오코딩해 저장소 주소 캐시에 채우는 단일 데몬 스레드.
+
+    resolve(lat, lon) -> 주소 문자열 (실패/없음은 "")
+    interval_sec: 호출 간 최소 간격 (NOMINATIM_MIN_INTERVAL_SEC, 기본 1초 — Nominatim 사용 정책)
+    max_pending: 대기열 상한 (ADDRESS_QUEUE_MAX, 기본 1000). 넘치면 버리고 다음 요청 때 다시 넣음
+    """
+
+    RATE_NAME = "nominatim"
+
+    def __init__(self, store: POIStore, resolve: Callable[[float, float], str],
+                 interval_sec: Optional[float] = None, max_pending: Optional[int] = None):
+        self.store = store
+        self.resolve = resolve
+        self.interval_sec = (
+            float(os.getenv("NOMINATIM_MIN_INTERVAL_SEC", "1.0")) if interval_sec is None else interval_sec
+        )
+        maxsize = int(os.getenv("ADDRESS_QUEUE_MAX", "1000")) if max_pending is None else max_pending
+        self._queue: "queue.Queue[Tuple[float, float]]" = queue.Queue(maxsize=maxsize)
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.resolved = 0
+        self.dropped = 0
+
+    def fill(self, items: List[Dict]) -> int:
+        """주소가 빈 항목을 캐시에서 채우고, 캐시에 없는 좌표는 대기열에 넣습니다 (네트워크 대기 없음).
+
+        대기열에 들어간(아직 주소 없는) 항목 수를 반환합니다.
+        """
+        missing = [item for item in items if not item.get("address")]
+        if not missing:
+            return 0
+        cached = self.store.cached_addresses((item["lat"], item["lon"]) for item in missing)
+        waiting = 0
+        for item in missing:
+            key = address_key(item["lat"], item["lon"])
+            if key in cached:
+                item["address"] = cached[key]
+            else:
+                waiting += 1
+                self._enqueue(key, item["lat"], item["lon"])
+        return waiting
+
+    def _enqueue(self, key: Tuple[int, int], lat: float, lon: float) -> None:
+        with self._lock:
+            if key in self._pending:
+                return
+            try:
+                self._queue.put_nowait((lat, lon))
+            except queue.Full:
+                self.dropped += 1
+                return
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reverse-geocode", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            lat, lon = self._queue.get()
+            try:
+                # 다른 워커가 이미 채웠으면 호출하지 않음
+                if address_key(lat, lon) not in self.store.cached_addresses([(lat, lon)]):
+                    delay = self.store.reserve_slot(self.RATE_NAME, self.interval_sec) - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.store.save_address(lat, lon, self.resolve(lat, lon) or "")
+                    self.resolved += 1
+            except Exception:
+                pass  # 실패한 좌표는 다음 요청 때 다시 대기열에 들어감
+            finally:
+                with self._lock:
+                    self._pending.discard(address_key(lat, lon))
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """대기열이 빌 때까지 기다립니다 (스크립트/테스트용). 시간 안에 비면 True."""
+        deadline = time.monotonic() + timeout
+        while self.pending():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+_POI_STORE: Optional[POIStore] = None
+_POI_STORE_LOCK = threading.Lock()
+
+
+def get_poi_store() -> POIStore:
+    """프로세스 전역 POI 저장소 (첫 사용 시 생성)"""
+    global _POI_STORE
+    with _POI_STORE_LOCK:
+        if _POI_STORE is None:
+            _POI_STORE = POIStore()
+        return _POI_STORE
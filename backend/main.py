@@ -5,15 +5,16 @@ from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import logging
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import concurrent.futures
 from io import BytesIO
 from PIL import Image
 import os
 import base64
 import numpy as np
-from backend.services_rag import GLOBAL_RAG
-from backend.services_geo import geocode_place, search_hospitals, search_pharmacies
+from backend.rag_result_cache import RAG_RESULT_CACHE
+import backend.services_rag  # noqa: F401  (임포트 시 첫 세대를 레지스트리에 게시)
+from backend.services_geo import geocode_place, search_nearby
 from backend.services_gen import generate_advice
 from backend.services_radar import radar_search_cached
 
@@ -327,18 +328,11 @@ def detect_emergency(symptoms_text: str, findings: List[str]) -> List[str]:
     return reasons
 
 
-def search_hospitals_jp(place: str) -> List[dict]:
+def search_nearby_jp(place: str) -> Tuple[List[dict], List[dict]]:
     geo = geocode_place(place or "Tokyo")
     if not geo:
-        return []
-    return search_hospitals(geo["lat"], geo["lon"], radius_m=3000)
-
-
-def search_pharmacies_jp(place: str) -> List[dict]:
-    geo = geocode_place(place or "Tokyo")
-    if not geo:
-        return []
-    return search_pharmacies(geo["lat"], geo["lon"], radius_m=3000)
+        return [], []
+    return search_nearby(geo["lat"], geo["lon"], hospital_radius_m=3000, pharmacy_radius_m=3000)
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -394,21 +388,16 @@ async def chat(
     pharmacies: List[dict] = []
     if not fast_mode:
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+            # 병원/약국은 한 번의 조회(Overpass 왕복 최대 1회)로 함께 받음
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
                 if lat is not None and lon is not None:
-                    fut_h = pool.submit(search_hospitals, lat, lon, 2000)
-                    fut_p = pool.submit(search_pharmacies, lat, lon, 1500)
+                    fut = pool.submit(search_nearby, lat, lon, 2000, 1500)
                 else:
-                    fut_h = pool.submit(search_hospitals_jp, location)
-                    fut_p = pool.submit(search_pharmacies_jp, location)
-                try:
-                    nearby = fut_h.result(timeout=7)
-                except Exception:
-                    nearby = []
+                    fut = pool.submit(search_nearby_jp, location)
                 try:
-                    pharmacies = fut_p.result(timeout=7)
+                    nearby, pharmacies = fut.result(timeout=7)
                 except Exception:
-                    pharmacies = []
+                    nearby, pharmacies = [], []
         except Exception:
             nearby, pharmacies = [], []
 
@@ -417,12 +406,16 @@ async def chat(
     gen_text = ""
     if not fast_mode:
         # 간단 RAG로 한두 문장 보강
-        hits = GLOBAL_RAG.search(symptoms, top_k=3)
-        passages = [h[0] for h in hits]
-        for txt, _ in hits:
-            # 첫 줄 또는 40자까지를 제목 대용으로 사용
-            first = (txt.strip().splitlines() or [""])[0].strip()
-            evidence_titles.append(first[:80] if first else "근거 문서")
+        # 결과는 패시지 id로 받아 본문과 메타데이터 제목만 조회
+        hits = RAG_RESULT_CACHE.search_batch(
+            [symptoms],
+            top_k=3,
+            resolve=lambda rag, per_query, _: [
+                (rag.passage_text(i), rag.metadata.title(i)) for i, _ in per_query[0]
+            ],
+        ) if symptoms else []
+        passages = [txt for txt, _ in hits]
+        evidence_titles = [title or "근거 문서" for _, title in hits]
         # Generate advice with timeout guard
         try:
             with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
@@ -0,0 +1,250 @@
+"""
+Dense 검색용 근사 최근접 이웃(ANN) 인덱스
+- ExactIndex: 원본(mmap) 행렬 내적 / 행 노름 + argpartition (소규모 코퍼스 기본값, 정확한 결과)
+- IVFIndex: 순수 NumPy 구현 (구면 k-means로 나눈 리스트 중 nprobe개만 탐색)
+- HNSWIndex: hnswlib가 설치된 경우에만 사용 (선택 의존성)
+- QuantizedIndex: fp16/int8(행별 스케일) 벡터로 1차 전수 검색 후 상위 후보만 float32로 재채점
+ExactIndex/QuantizedIndex는 행 노름으로 나누고, 나머지는 L2 정규화된 벡터를 저장하므로 점수 = 코사인 유사도
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .rag_topk import top_k_indices
+except ImportError:
+    from rag_topk import top_k_indices
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+class ExactIndex:
+    """전수 내적 검색 (기준/폴백)
+
+    정규화 사본을 만들지 않고 임베딩 배열(mmap 저장소 뷰)을 그대로 참조하며,
+    행 노름만 따로 두었다가 질의 시 점수를 나눠 코사인 유사도로 만듭니다.
+    """
+
+    name = "exact"
+
+    def __init__(self, embeddings: np.ndarray, chunk: int = 8192):
+        self.vectors = embeddings if getattr(embeddings, "dtype", None) == np.float32 else np.asarray(embeddings, dtype=np.float32)
+        n = self.vectors.shape[0]
+        self.norms = np.empty(n, dtype=np.float32)
+        for s in range(0, n, chunk):
+            self.norms[s:s + chunk] = np.linalg.norm(self.vectors[s:s + chunk], axis=1)
+        self.norms[self.norms == 0] = 1.0
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """질의별 상위 k개 (패시지 인덱스, 코사인 유사도)"""
+        scores = (_normalize(queries) @ self.vectors.T) / self.norms
+        return [[(int(i), float(row[i])) for i in top_k_indices(row, k)] for row in scores]
+
+
+class IVFIndex:
+    """역파일(IVF) 인덱스: 중심점과 가까운 nprobe개 리스트의 벡터만 정확히 점수 계산"""
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 10,
+        seed: int = 0,
+    ):
+        vectors = _normalize(embeddings)
+        n = vectors.shape[0]
+        self.nlist = max(1, min(n, nlist or int(np.sqrt(n))))
+        self.nprobe = max(1, min(self.nlist, nprobe))
+        self.centroids = self._train(vectors, n_iter, seed)
+        assign = self._assign(vectors)
+        # 리스트별로 벡터를 연속 배치 (탐색 시 메모리 지역성)
+        order = np.argsort(assign, kind="stable")
+        self.ids = order.astype(np.int64)
+        self.vectors = vectors[order]
+        self.list_ptr = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=self.nlist), out=self.list_ptr[1:])
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def _train(self, vectors: np.ndarray, n_iter: int, seed: int) -> np.ndarray:
+        """구면 k-means (학습 표본은 리스트당 최대 256개)"""
+        rng = np.random.default_rng(seed)
+        n = vectors.shape[0]
+        sample = vectors
+        if n > 256 * self.nlist:
+            sample = vectors[rng.choice(n, 256 * self.nlist, replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], self.nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=self.nlist) == 0
+            # 빈 리스트는 임의 표본으로 다시 시작
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            centroids = _normalize(sums)
+        return centroids
+
+    def _assign(self, vectors: np.ndarray, batch: int = 8192) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for s in range(0, vectors.shape[0], batch):
+            out[s:s + batch] = np.argmax(vectors[s:s + batch] @ self.centroids.T, axis=1)
+        return out
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        q = _normalize(queries)
+        centroid_scores = q @ self.centroids.T
+        results = []
+        for qi, row in enumerate(centroid_scores):
+            probes = top_k_indices(row, self.nprobe)
+            cand = np.concatenate([
+                np.arange(self.list_ptr[c], self.list_ptr[c + 1]) for c in probes
+            ])
+            if len(cand) < k:
+                # 탐색 리스트가 너무 작으면 전수 계산으로 보완
+                cand = np.arange(len(self.ids))
+            scores = self.vectors[cand] @ q[qi]
+            top = top_k_indices(scores, k)
+            results.append([(int(self.ids[cand[i]]), float(scores[i])) for i in top])
+        return results
+
+
+class HNSWIndex:
+    """hnswlib 그래프 인덱스 (설치된 경우에만)"""
+
+    name = "hnsw"
+
+    def __init__(self, embeddings: np.ndarray, m: int = 16, ef_construction: int = 200, ef: int = 64):
+        vectors = _normalize(embeddings)
+        self.size = vectors.shape[0]
+        self.ef = ef
+        self.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.index.init_index(max_elements=max(1, self.size), ef_construction=ef_construction, M=m)
+        self.index.add_items(vectors, np.arange(self.size))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        k = min(k, self.size)
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        self.index.set_ef(max(self.ef, k))
+        labels, distances = self.index.knn_query(_normalize(queries), k=k)
+        # hnswlib의 ip 거리는 1 - 내적
+        return [
+            [(int(i), float(1.0 - d)) for i, d in zip(row_l, row_d)]
+            for row_l, row_d in zip(labels, distances)
+        ]
+
+
+class QuantizedIndex:
+    """양자화 벡터 1차 검색 + float32 재채점
+
+    float32 원본은 참조만 유지하므로 mmap 저장소 배열을 넘기면 프로세스 메모리에는
+    양자화 벡터(int8: N*d 바이트 + 행별 스케일)만 상주하고, 재채점은 후보 행만 읽습니다.
+    """
+
+    def __init__(self, embeddings: np.ndarray, mode: str = "int8", rescore_factor: int = 4, chunk: int = 1024):
+        if mode not in ("fp16", "int8"):
+            raise ValueError(f"unknown quantization mode: {mode}")
+        self.name = f"exact-{mode}"
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        self.chunk = chunk
+        self.source = embeddings
+        n, dim = embeddings.shape
+        self.norms = np.empty(n, dtype=np.float32)
+        self.codes = np.empty((n, dim), dtype=np.float16 if mode == "fp16" else np.int8)
+        self.scales = np.ones(n, dtype=np.float32)
+        for s in range(0, n, chunk):
+            block = np.asarray(embeddings[s:s + chunk], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1)
+            norms[norms == 0] = 1.0
+            self.norms[s:s + chunk] = norms
+            block = block / norms[:, None]
+            if mode == "fp16":
+                self.codes[s:s + chunk] = block.astype(np.float16)
+            else:
+                scales = np.abs(block).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                self.scales[s:s + chunk] = scales
+                self.codes[s:s + chunk] = np.rint(block / scales[:, None]).astype(np.int8)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """상주 메모리 (양자화 벡터 + 스케일 + 노름)"""
+        return self.codes.nbytes + self.scales.nbytes + self.norms.nbytes
+
+    def _approx_scores(self, q: np.ndarray) -> np.ndarray:
+        """(질의 수, N) 근사 코사인 점수. 청크 단위로 float32 변환해 임시 메모리를 제한."""
+        out = np.empty((q.shape[0], len(self)), dtype=np.float32)
+        for s in range(0, len(self), self.chunk):
+            block = self.codes[s:s + self.chunk].astype(np.float32)
+            out[:, s:s + self.chunk] = (q @ block.T) * self.scales[s:s + self.chunk]
+        return out
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        q = _normalize(queries)
+        approx = self._approx_scores(q)
+        results = []
+        for qi, row in enumerate(approx):
+            # 후보만 float32 원본으로 정확히 재채점 (mmap에서 오름차순으로 읽도록 정렬)
+            cand = np.sort(top_k_indices(row, k * self.rescore_factor))
+            exact = (np.asarray(self.source[cand], dtype=np.float32) @ q[qi]) / self.norms[cand]
+            top = top_k_indices(exact, k)
+            results.append([(int(cand[i]), float(exact[i])) for i in top])
+        return results
+
+
+def build_dense_index(embeddings: np.ndarray, backend: Optional[str] = None):
+    """설정에 맞는 Dense 인덱스를 생성합니다.
+
+    RAG_ANN_BACKEND: auto(기본) | exact | ivf | hnsw
+    auto는 RAG_ANN_MIN_PASSAGES(기본 2000) 미만이면 전수 검색, 이상이면 hnswlib → IVF 순으로 선택
+    RAG_EMBED_QUANT: none(기본) | fp16 | int8 — 전수 검색을 양자화 1차 검색 + float32 재채점으로 수행
+    """
+    backend = (backend or os.getenv("RAG_ANN_BACKEND", "auto")).lower()
+    n = int(np.asarray(embeddings).shape[0])
+    if backend == "auto":
+        if n < int(os.getenv("RAG_ANN_MIN_PASSAGES", "2000")):
+            backend = "exact"
+        else:
+            backend = "hnsw" if HNSWLIB_AVAILABLE else "ivf"
+    if backend == "hnsw" and not HNSWLIB_AVAILABLE:
+        print("Warning: hnswlib not available, falling back to IVF index")
+        backend = "ivf"
+    if backend == "hnsw":
+        return HNSWIndex(embeddings)
+    quantization = os.getenv("RAG_EMBED_QUANT", "none").lower()
+    if backend == "exact" and quantization in ("fp16", "int8") and n > 0:
+        return QuantizedIndex(
+            embeddings, mode=quantization, rescore_factor=int(os.getenv("RAG_EMBED_RESCORE", "4"))
+        )
+    if backend == "ivf" and n > 0:
+        return IVFIndex(embeddings, nprobe=int(os.getenv("RAG_ANN_NPROBE", "8")))
+    return ExactIndex(embeddings)
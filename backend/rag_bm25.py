@@ -0,0 +1,192 @@
+"""
+역색인(term → postings) 기반 BM25 점수 계산
+- rank_bm25.BM25Okapi 와 동일한 IDF/점수 공식을 사용 (결과 동일)
+- 질의 토큰이 등장하는 문서만 갱신하므로 코퍼스 크기와 무관하게 매칭 문서 수에 비례
+- 스냅샷(mmap) 배열 위에서도 그대로 동작
+"""
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _okapi_idf(nd: Sequence[int], n_docs: int, epsilon: float) -> List[float]:
+    """BM25Okapi와 동일한 IDF (절반 이상 문서에 등장해 음수가 되면 epsilon * 평균 IDF로 하한)"""
+    idf = [math.log(n_docs - freq + 0.5) - math.log(freq + 0.5) for freq in nd]
+    if not idf:
+        return idf
+    eps = epsilon * (sum(idf) / len(idf))
+    return [eps if v < 0 else v for v in idf]
+
+
+def _collect_postings(
+    corpus: Sequence[Sequence[str]], term_ids: Dict[str, int], first_doc: int
+) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """문서별 용어 빈도를 (term id, doc id, tf) 행으로 펼칩니다. 새 용어는 term_ids에 추가."""
+    rows_t: List[int] = []
+    rows_d: List[int] = []
+    rows_f: List[int] = []
+    doc_len: List[int] = []
+    for d, document in enumerate(corpus, start=first_doc):
+        doc_len.append(len(document))
+        frequencies: Dict[str, int] = {}
+        for word in document:
+            frequencies[word] = frequencies.get(word, 0) + 1
+        for word, freq in frequencies.items():
+            t = term_ids.get(word)
+            if t is None:
+                t = term_ids[word] = len(term_ids)
+            rows_t.append(t)
+            rows_d.append(d)
+            rows_f.append(freq)
+    return rows_t, rows_d, rows_f, doc_len
+
+
+class PostingsBM25:
+    """CSR 형태(indptr/doc_ids/tfs)의 포스팅으로 BM25Okapi 점수를 계산"""
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        idf: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        self.terms = list(terms)
+        self.term_index: Dict[str, int] = {t: i for i, t in enumerate(self.terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.corpus_size = int(len(doc_len))
+        # rank_bm25와 동일하게 전체 토큰 수 / 문서 수
+        self.avgdl = float(doc_len.sum()) / self.corpus_size if self.corpus_size else 0.0
+        # 문서 길이 정규화 항은 질의와 무관하므로 미리 계산
+        if self.avgdl:
+            self._norm = k1 * (1 - b + b * doc_len / self.avgdl)
+        else:
+            self._norm = np.full(self.corpus_size, k1, dtype=np.float64)
+
+    @classmethod
+    def from_tokenized(
+        cls, corpus: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25
+    ) -> "PostingsBM25":
+        """토큰화된 코퍼스로 포스팅을 빌드합니다 (BM25Okapi와 동일한 IDF 하한 처리)."""
+        term_ids: Dict[str, int] = {}
+        rows_t, rows_d, rows_f, doc_len = _collect_postings(corpus, term_ids, 0)
+        nd = np.bincount(np.asarray(rows_t, dtype=np.int64), minlength=len(term_ids))
+        t_arr = np.asarray(rows_t, dtype=np.int64)
+        # 안정 정렬로 포스팅 내부는 문서 id 오름차순 유지
+        order = np.argsort(t_arr, kind="stable")
+        indptr = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(nd, out=indptr[1:])
+        return cls(
+            list(term_ids.keys()),
+            indptr,
+            np.asarray(rows_d, dtype=np.int32)[order],
+            np.asarray(rows_f, dtype=np.int32)[order],
+            np.asarray(_okapi_idf(nd.tolist(), len(doc_len), epsilon), dtype=np.float64),
+            np.asarray(doc_len, dtype=np.int64),
+            k1=k1,
+            b=b,
+            epsilon=epsilon,
+        )
+
+    def append_documents(self, corpus: Sequence[Sequence[str]]) -> "PostingsBM25":
+        """문서를 뒤에 추가한 새 인덱스를 반환합니다 (기존 인덱스는 변경하지 않음).
+
+        새 문서 id는 기존보다 크므로 각 포스팅 끝에 이어 붙이면 정렬이 유지됩니다.
+        IDF/평균 문서 길이는 문서 빈도 배열에서 다시 계산합니다 (전체 재토큰화 없음).
+        """
+        if not corpus:
+            return self
+        term_ids = dict(self.term_index)
+        n_old_docs = self.corpus_size
+        rows_t, rows_d, rows_f, new_len = _collect_postings(corpus, term_ids, n_old_docs)
+        n_terms = len(term_ids)
+        n_old_terms = len(self.terms)
+
+        old_counts = np.zeros(n_terms, dtype=np.int64)
+        old_counts[:n_old_terms] = np.diff(np.asarray(self.indptr))
+        t_arr = np.asarray(rows_t, dtype=np.int64)
+        counts = old_counts + np.bincount(t_arr, minlength=n_terms)
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        doc_ids = np.empty(int(indptr[-1]), dtype=np.int32)
+        tfs = np.empty(int(indptr[-1]), dtype=np.int32)
+        # 기존 포스팅: 용어별 시작 위치 이동량만큼 평행 이동
+        shift = np.repeat(indptr[:n_old_terms] - np.asarray(self.indptr[:-1]), old_counts[:n_old_terms])
+        old_pos = np.arange(len(self.doc_ids), dtype=np.int64) + shift
+        doc_ids[old_pos] = self.doc_ids
+        tfs[old_pos] = self.tfs
+        # 새 포스팅: 용어별로 기존 포스팅 바로 뒤에 배치
+        order = np.argsort(t_arr, kind="stable")
+        t_sorted = t_arr[order]
+        rank = np.arange(len(t_sorted)) - np.searchsorted(t_sorted, t_sorted, side="left")
+        new_pos = indptr[t_sorted] + old_counts[t_sorted] + rank
+        doc_ids[new_pos] = np.asarray(rows_d, dtype=np.int32)[order]
+        tfs[new_pos] = np.asarray(rows_f, dtype=np.int32)[order]
+
+        doc_len = np.concatenate([np.asarray(self.doc_len), np.asarray(new_len, dtype=np.int64)])
+        idf = _okapi_idf(counts.tolist(), len(doc_len), self.epsilon)
+        return PostingsBM25(
+            list(term_ids.keys()),
+            indptr,
+            doc_ids,
+            tfs,
+            np.asarray(idf, dtype=np.float64),
+            doc_len,
+            k1=self.k1,
+            b=self.b,
+            epsilon=self.epsilon,
+        )
+
+    def postings(self, term: str):
+        """용어의 (term id, 문서 id, 빈도) 배열을 반환합니다. 없으면 None."""
+        t = self.term_index.get(term)
+        if t is None:
+            return None
+        s, e = int(self.indptr[t]), int(self.indptr[t + 1])
+        return t, self.doc_ids[s:e], self.tfs[s:e]
+
+    def _contributions(self, t: int, docs: np.ndarray, tf: np.ndarray) -> np.ndarray:
+        return self.idf[t] * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """BM25Okapi.get_scores 호환: 전체 문서 점수 벡터"""
+        scores = np.zeros(self.corpus_size)
+        for q in query:
+            hit = self.postings(q)
+            if hit is None:
+                continue
+            t, docs, tf = hit
+            scores[docs] += self._contributions(t, docs, tf)
+        return scores
+
+    def get_scores_range(self, query: List[str], start: int, end: int) -> np.ndarray:
+        """문서 id [start, end) 구간의 점수 벡터 (샤드 검색용; 포스팅은 문서 id 순이라 이진 탐색으로 자름)"""
+        if start == 0 and end >= self.corpus_size:
+            return self.get_scores(query)[:end]
+        scores = np.zeros(end - start)
+        for q in query:
+            hit = self.postings(q)
+            if hit is None:
+                continue
+            t, docs, tf = hit
+            lo, hi = np.searchsorted(docs, [start, end])
+            if lo == hi:
+                continue
+            docs, tf = docs[lo:hi], tf[lo:hi]
+            scores[docs - start] += self._contributions(t, docs, tf)
+        return scores
@@ -0,0 +1,80 @@
+"""
+문장 단위 패시지 청커
+- 페이지 텍스트 스트림 (페이지 번호, 텍스트)을 받아 청크를 하나씩 생성 — 버퍼는 청크 크기로 제한
+- 문장 경계: 일본어/전각 문장부호(。．！？), 공백이 뒤따르는 마침표, 줄바꿈
+- 이전 청크 끝 문장 일부를 다음 청크 앞에 겹쳐 문맥을 유지하고, 청크마다 시작/끝 페이지를 기록
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, Iterator, Tuple
+
+# 청크 규칙이 바뀌면 올려서 PDF 패시지가 들어간 인덱스 스냅샷을 무효화
+CHUNKER_VERSION = 1
+
+# 문장부호(닫는 괄호/따옴표 포함) 또는 줄바꿈까지를 한 문장으로 봄. "37.5度" 같은 소수점은 끊지 않음
+_SENTENCE = re.compile(r".+?(?:[。．！？!?]+[」』）)\"']*|\.(?=\s)|\n|$)", re.S)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+
+    @property
+    def page_label(self) -> str:
+        """인용용 페이지 표기: "3" 또는 "3-4" """
+        if self.page_start == self.page_end:
+            return str(self.page_start)
+        return f"{self.page_start}-{self.page_end}"
+
+
+def split_sentences(text: str) -> Iterator[str]:
+    """구분자를 포함한 문장을 순서대로 생성합니다 (공백뿐인 조각은 건너뜀)."""
+    for m in _SENTENCE.finditer(text or ""):
+        if m.group().strip():
+            yield m.group()
+
+
+def _pieces(sentence: str, max_chars: int) -> Iterator[str]:
+    # 청크보다 긴 문장(표/목록 덤프 등)은 글자 수로 잘라 버퍼 상한을 지킴
+    for start in range(0, len(sentence), max_chars):
+        yield sentence[start:start + max_chars]
+
+
+def chunk_pages(
+    pages: Iterable[Tuple[int, str]], max_chars: int = 1000, overlap: int = 150
+) -> Iterator[Chunk]:
+    """페이지 스트림을 최대 max_chars 글자 청크로 나눕니다.
+
+    청크 사이에는 직전 청크 끝 문장들(최대 overlap 글자)을 겹칩니다.
+    """
+    overlap = max(0, min(overlap, max_chars // 2))
+    buf: Deque[Tuple[str, int]] = deque()
+    size = 0
+    fresh = False  # 마지막 청크 이후 새 문장이 들어왔는지 (겹침 문장만 남은 버퍼는 내보내지 않음)
+
+    def emit() -> Chunk:
+        text = "".join(s for s, _ in buf).strip()
+        return Chunk(text, min(p for _, p in buf), max(p for _, p in buf))
+
+    for page, text in pages:
+        if text and not text.endswith("\n"):
+            text += "\n"  # 페이지 경계는 문장 경계
+        for sentence in split_sentences(text):
+            for piece in _pieces(sentence, max_chars):
+                if buf and size + len(piece) > max_chars:
+                    if fresh:
+                        yield emit()
+                        fresh = False
+                    # 겹침 꼬리만 남기되, 새 조각이 들어갈 자리는 확보
+                    keep = min(overlap, max_chars - len(piece))
+                    while buf and size > keep:
+                        size -= len(buf.popleft()[0])
+                buf.append((piece, page))
+                size += len(piece)
+                fresh = True
+    if buf and fresh:
+        yield emit()
@@ -0,0 +1,160 @@
+"""
+패시지 근접 중복 탐지 인덱스 (MinHash + LSH)
+- 정규화한 본문의 문자 5-gram 집합으로 MinHash 서명(기본 64개 해시)을 만들고, 16밴드 x 4행 LSH 버킷에 등록
+- 조회는 같은 버킷에 걸린 후보만 서명 일치율(자카드 추정치)로 확인 — 기존 파일을 다시 읽지 않음
+- 서명은 .npz로 저장해 재시작 후에도 재사용 (키 = 파일명 등 호출자가 정하는 식별자)
+"""
+
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_SHINGLE = 5
+_SHINGLE_BASE = np.uint64(1000003)
+# 청크/크롤링 결과마다 달라지는 머리글 줄은 비교에서 제외
+_VOLATILE_LINE = re.compile(r"^(\[PDF: .*\]|# 크롤링 시간: .*)$", re.M)
+_SPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    text = _VOLATILE_LINE.sub("", unicodedata.normalize("NFKC", text or ""))
+    return _SPACE.sub("", text).lower()
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """문자 5-gram 다항식 해시 (코드포인트 배열에서 벡터화, 파이썬 루프 없음)"""
+    codes = np.frombuffer(_normalize(text).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < _SHINGLE:
+        codes = np.concatenate([codes, np.zeros(_SHINGLE - len(codes), dtype=np.uint64)])
+    n = len(codes) - _SHINGLE + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for k in range(_SHINGLE):  # uint64 오버플로(mod 2^64)는 의도된 동작
+        h = h * _SHINGLE_BASE + codes[k:k + n]
+    return np.unique(h)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH 근접 중복 인덱스.
+
+    threshold: 이 이상 추정 자카드 유사도면 중복으로 봄 (RAG_DEDUP_THRESHOLD, 기본 0.8)
+    밴드 수 x 행 수 = 서명 길이. 16x4는 유사도 0.8 쌍을 거의 항상 후보로 잡음.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: Optional[float] = None, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8")) if threshold is None else threshold
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # 홀수 a의 곱셈-시프트 해시: (a*x + b) mod 2^64의 상위 32비트
+        self._a = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        x = _shingle_hashes(text)
+        hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(b, sig[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def keys(self) -> List[str]:
+        return list(self._signatures)
+
+    def add(self, key: str, text: Optional[str] = None, signature: Optional[np.ndarray] = None) -> None:
+        sig = self.signature(text) if signature is None else np.asarray(signature, dtype=np.uint32)
+        self.remove(key)
+        self._signatures[key] = sig
+        for band_key in self._band_keys(sig):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band_key in self._band_keys(sig):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, text: Optional[str] = None, signature: Optional[np.ndarray] = None,
+              exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """가장 비슷한 (키, 추정 유사도). threshold 미만이면 None."""
+        sig = self.signature(text) if signature is None else signature
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(sig):
+            candidates |= self._buckets.get(band_key, set())
+        candidates.discard(exclude)
+        best = None
+        for key in candidates:
+            sim = float(np.mean(self._signatures[key] == sig))
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (key, sim)
+        return best
+
+    def add_unique(self, key: str, text: str) -> Optional[str]:
+        """중복이 아니면 등록하고 None, 중복이면 등록하지 않고 기존 키를 반환합니다."""
+        sig = self.signature(text)
+        hit = self.query(signature=sig, exclude=key)
+        if hit is not None:
+            return hit[0]
+        self.add(key, signature=sig)
+        return None
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        keys = list(self._signatures)
+        sigs = np.stack([self._signatures[k] for k in keys]) if keys else np.zeros((0, self.num_perm), np.uint32)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.npz")
+        np.savez(tmp, keys=np.asarray(keys, dtype=str), signatures=sigs,
+                 params=np.asarray([self.num_perm, self.bands, self.seed], dtype=np.int64))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, threshold: Optional[float] = None) -> Optional["NearDuplicateIndex"]:
+        """저장된 서명으로 인덱스를 복원합니다. 없거나 손상되면 None."""
+        try:
+            with np.load(Path(path)) as data:
+                num_perm, bands, seed = (int(v) for v in data["params"])
+                keys, sigs = data["keys"].tolist(), data["signatures"]
+        except (OSError, ValueError, KeyError):
+            return None
+        index = cls(num_perm=num_perm, bands=bands, threshold=threshold, seed=seed)
+        for key, sig in zip(keys, sigs):
+            index.add(key, signature=sig)
+        return index
+
+
+def dedupe_passages(
+    passages: Iterable[str], sources: Iterable[str], index: Optional[NearDuplicateIndex] = None
+) -> Tuple[List[str], List[str], int]:
+    """index(없으면 새로 만듦)에 대해 근접 중복인 패시지를 걸러 (패시지, 출처, 제거 수)를 반환합니다."""
+    index = NearDuplicateIndex() if index is None else index
+    kept: List[str] = []
+    kept_sources: List[str] = []
+    dropped = 0
+    for i, (passage, source) in enumerate(zip(passages, sources)):
+        if index.add_unique(f"{source}#{i}", passage) is not None:
+            dropped += 1
+            continue
+        kept.append(passage)
+        kept_sources.append(source)
+    return kept, kept_sources, dropped
@@ -0,0 +1,156 @@
+"""
+패시지 임베딩 저장소 (내용 주소 기반)
+- 키: sha1(모델 이름 + 패시지 텍스트) → 재시작/일부 패시지 변경 시에도 재사용 (프로세스 무관)
+- 저장: 모델별 디렉토리에 샤드 단위 .npy (벡터) + 키 배열, np.load(mmap_mode='r')로 무복사 로드
+- 새로 추가/변경된 패시지만 인코딩해 새 샤드로 기록, 샤드가 많아지면 한 샤드로 병합
+- 샤드 기록/병합은 디렉토리 잠금(fcntl.flock) 안에서 — 여러 워커가 같은 샤드 번호를 쓰거나
+  다른 워커가 읽는 중인 샤드를 지우지 않음
+"""
+
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 개발 환경만 가정
+    fcntl = None  # type: ignore
+
+SHARD_PREFIX = "shard-"
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """모델+텍스트의 안정적인 내용 해시 (Python hash()와 달리 프로세스마다 같음)"""
+    h = hashlib.sha1()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingStore:
+    """모델 하나의 임베딩 샤드 모음"""
+
+    def __init__(self, root: Path, model_name: str, max_shards: int = 8):
+        self.model_name = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.directory = Path(root) / slug
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_shards = max_shards
+        self._shards: Dict[int, np.ndarray] = {}
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._load_shards()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """디렉토리 단위 배타 잠금 (프로세스/스레드 모두 — flock은 열린 파일마다 따로 잠김)"""
+        with open(self.directory / ".lock", "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            yield  # 파일을 닫으면 잠금 해제
+
+    def _shard_ids(self) -> List[int]:
+        ids = []
+        for p in self.directory.glob(f"{SHARD_PREFIX}*.keys.npy"):
+            try:
+                ids.append(int(p.name[len(SHARD_PREFIX):].split(".")[0]))
+            except ValueError:
+                continue
+        return sorted(ids)
+
+    def _load_shards(self) -> None:
+        self._shards.clear()
+        self._index.clear()
+        for sid in self._shard_ids():
+            try:
+                keys = np.load(self.directory / f"{SHARD_PREFIX}{sid:05d}.keys.npy")
+                vecs = np.load(self.directory / f"{SHARD_PREFIX}{sid:05d}.npy", mmap_mode="r")
+            except Exception as e:
+                print(f"임베딩 샤드 로드 실패 ({sid}): {e}")
+                continue
+            if len(keys) != vecs.shape[0]:
+                continue
+            self._shards[sid] = vecs
+            for row, key in enumerate(keys):
+                self._index[key.decode("ascii")] = (sid, row)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def _write_shard(self, keys: Sequence[str], vectors: np.ndarray) -> int:
+        """벡터를 먼저, 키 파일을 마지막에 rename으로 게시 (키 파일이 있으면 완전한 샤드).
+
+        _locked() 안에서만 호출 — 샤드 번호(max+1) 선택과 게시가 다른 워커와 겹치지 않도록.
+        """
+        sid = (max(self._shard_ids(), default=-1)) + 1
+        base = self.directory / f"{SHARD_PREFIX}{sid:05d}"
+        tmp_vec = self.directory / f".{base.name}.tmp-{os.getpid()}.npy"
+        tmp_keys = self.directory / f".{base.name}.keys.tmp-{os.getpid()}.npy"
+        np.save(tmp_vec, np.ascontiguousarray(vectors, dtype=np.float32))
+        np.save(tmp_keys, np.asarray([k.encode("ascii") for k in keys], dtype="S40"))
+        os.replace(tmp_vec, base.with_name(base.name + ".npy"))
+        os.replace(tmp_keys, base.with_name(base.name + ".keys.npy"))
+        return sid
+
+    def get_or_encode(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """texts 순서의 임베딩 행렬. 저장소에 없는 텍스트만 encode로 계산해 새 샤드에 기록.
+
+        모든 행이 한 샤드의 연속 구간이면 mmap 뷰를 그대로 반환합니다 (무복사).
+        """
+        keys = [embedding_key(self.model_name, t) for t in texts]
+        if any(key not in self._index for key in keys):
+            with self._locked():
+                # 잠금을 기다리는 동안 다른 워커가 같은 패시지를 기록했을 수 있으므로 다시 읽고 판단
+                self._load_shards()
+                missing: Dict[str, str] = {}
+                for key, text in zip(keys, texts):
+                    if key not in self._index and key not in missing:
+                        missing[key] = text
+                if missing:
+                    print(f"Encoding {len(missing)} new passages with {self.model_name}...")
+                    vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+                    self._write_shard(list(missing.keys()), vectors)
+                    self._load_shards()
+                if self.shard_count > self.max_shards:
+                    self._compact(keys)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        locations = [self._index[k] for k in keys]
+        sid0, row0 = locations[0]
+        if all(sid == sid0 and row == row0 + i for i, (sid, row) in enumerate(locations)):
+            return self._shards[sid0][row0:row0 + len(keys)]
+        return np.vstack([self._shards[sid][row] for sid, row in locations])
+
+    def compact(self, keep: Sequence[str]) -> None:
+        """샤드를 현재 코퍼스(keep) 순서의 한 샤드로 병합합니다.
+
+        다음 로드가 무복사 경로를 타고, 더 이상 쓰이지 않는 임베딩은 정리됩니다.
+        지워진 샤드를 이미 mmap한 다른 워커는 그 매핑을 계속 읽을 수 있고, 다음 조회 때 잠금 안에서 다시 읽습니다.
+        """
+        with self._locked():
+            self._compact(keep)
+
+    def _compact(self, keep: Sequence[str]) -> None:
+        self._load_shards()
+        keys = list(dict.fromkeys(k for k in keep if k in self._index))
+        vectors = np.vstack([self._shards[self._index[k][0]][self._index[k][1]] for k in keys])
+        old_ids = self._shard_ids()
+        self._shards.clear()
+        self._write_shard(keys, vectors)
+        for sid in old_ids:
+            for suffix in (".keys.npy", ".npy"):
+                try:
+                    (self.directory / f"{SHARD_PREFIX}{sid:05d}{suffix}").unlink()
+                except OSError:
+                    pass
+        self._load_shards()
@@ -0,0 +1,322 @@
+"""
+패시지 메타데이터 (열 지향 사이드카)
+- 패시지별 출처 파일, 출처 도메인, 제목, 청크 번호, 권위 가중치, 본문 바이트 오프셋
+- 문자열 열은 중복 제거 테이블 + int32 id, 제목은 UTF-8 blob + 오프셋으로 보관해 스냅샷에 mmap으로 저장
+- 검색 결과는 패시지 id만 주고받고, 필요한 필드는 이 저장소에서 조회
+- PassageStore: 본문을 UTF-8 blob 하나 + 오프셋으로 보관 (스냅샷/디스크에서 mmap), 조회된 행만 디코딩
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+import numpy as np
+
+# load_pdf_passages가 청크 앞에 붙이는 머리글: [PDF: 파일명, 페이지: p[-q]/n, 청크: k]
+# (이전 형식 [PDF: 파일명, 페이지: i/n]의 i는 청크 번호)
+_PDF_HEADER = re.compile(
+    r"^\[PDF: (?P<file>.+?), 페이지: (?P<page>\d+)(?:-\d+)?/\d+(?:, 청크: (?P<chunk>\d+))?\]"
+)
+_URL = re.compile(r"https?://[^\s)>\]]+")
+TITLE_MAX_CHARS = 80
+
+
+@dataclass(frozen=True)
+class PassageRecord:
+    """패시지 한 개의 메타데이터"""
+
+    id: int
+    source_file: str
+    source_domain: str
+    title: str
+    chunk_index: int
+    authority_weight: float
+    byte_start: int
+    byte_end: int
+
+
+class PassageStore:
+    """지연 디코딩 패시지 본문 시퀀스
+
+    blob/offsets는 스냅샷 mmap 배열을 그대로 받을 수 있어, 워커는 OS 페이지 캐시를 공유하고
+    검색 결과로 읽힌 패시지만 str로 디코딩합니다. apply_delta로 추가된 패시지는 blob을
+    복사하지 않도록 뒤에 str 목록으로 이어 붙입니다 (다음 스냅샷/컴팩션 때 blob에 합쳐짐).
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, tail: Sequence[str] = ()):
+        self.blob = blob
+        self.offsets = offsets
+        self.tail = list(tail)
+        self._n_base = len(offsets) - 1
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "PassageStore":
+        blob, offsets = _pack(texts)
+        return cls(blob, offsets)
+
+    @classmethod
+    def open(cls, directory: Path, name: str) -> Optional["PassageStore"]:
+        """save()로 기록한 blob/오프셋을 mmap으로 엽니다. 없으면 None."""
+        try:
+            blob = np.load(Path(directory) / f"{name}.blob.npy", mmap_mode="r")
+            offsets = np.load(Path(directory) / f"{name}.offsets.npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return cls(blob, offsets)
+
+    def save(self, directory: Path, name: str) -> None:
+        """blob/오프셋을 .npy로 기록합니다 (임시 파일 → rename)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        blob, offsets = self.to_arrays()
+        for suffix, arr in (("blob", blob), ("offsets", offsets)):
+            tmp = directory / f".{name}.{suffix}.{os.getpid()}.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, directory / f"{name}.{suffix}.npy")
+
+    def __len__(self) -> int:
+        return self._n_base + len(self.tail)
+
+    def _decode(self, i: int) -> str:
+        if i >= self._n_base:
+            return self.tail[i - self._n_base]
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self._decode(j) for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("passage index out of range")
+        return self._decode(i)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self._decode(i)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (PassageStore, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def append(self, texts: Sequence[str]) -> "PassageStore":
+        """texts를 뒤에 붙인 새 시퀀스 (기존 blob 공유)"""
+        return PassageStore(self.blob, self.offsets, self.tail + list(texts))
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(blob, offsets) — 뒤에 붙은 패시지까지 하나의 blob으로 합침"""
+        if not self.tail:
+            return self.blob, self.offsets
+        tail_blob, tail_offsets = _pack(self.tail)
+        blob = np.concatenate([np.asarray(self.blob), tail_blob])
+        offsets = np.concatenate([np.asarray(self.offsets), tail_offsets[1:] + self.offsets[-1]])
+        return blob, offsets
+
+
+def authority_weight(passage: str) -> float:
+    """권위 있는 출처에 가중치 적용"""
+    text = (passage or "")
+    w = 1.0
+    # 기관/도메인 기반 가중치
+    if any(k in text for k in ["fdma.go.jp", "消防庁", "binran", "handbook"]):
+        w *= 1.25
+    if any(k in text for k in ["mhlw.go.jp", "厚生労働省", "0000"]):
+        w *= 1.25
+    if any(k in text for k in ["pmda.go.jp", "PMDA", "患者向け医薬品"]):
+        w *= 1.20
+    if any(k in text for k in ["rad-ar.or.jp", "くすりのしおり"]):
+        w *= 1.15
+    if any(k in text for k in ["日本赤十字", "赤十字", "救護規則"]):
+        w *= 1.10
+    # 응급 핵심 키워드 보정
+    if any(k in text for k in ["応急手当", "救急", "救急受診", "止血", "やけど", "アナフィラキシー"]):
+        w *= 1.05
+    # OTC 관련 키워드 보정
+    if any(k in text for k in ["解熱剤", "鎮痛剤", "解熱鎮痛剤", "健胃消化薬", "制酸薬", "鎮咳薬", "去痰薬", "抗ヒスタミン", "一般用医薬品", "第一類医薬品", "第二類医薬品"]):
+        w *= 1.10
+    return w
+
+
+def describe_passage(passage: str, source_file: str = "") -> Tuple[str, str, str, int]:
+    """(출처 파일, 출처 도메인, 제목, 청크 번호)를 본문에서 추출합니다."""
+    lines = [ln.strip() for ln in (passage or "").splitlines() if ln.strip()]
+    chunk_index = 0
+    header = _PDF_HEADER.match(lines[0]) if lines else None
+    if header:
+        source_file = source_file or header.group("file")
+        chunk_index = int(header.group("chunk") or header.group("page")) - 1
+        lines = lines[1:]
+    title = lines[0].lstrip("#").strip() if lines else ""
+    url = _URL.search(passage or "")
+    domain = urlparse(url.group()).netloc if url else ""
+    return source_file, domain, title[:TITLE_MAX_CHARS], chunk_index
+
+
+def _intern(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    table: Dict[str, int] = {}
+    ids = np.asarray([table.setdefault(v, len(table)) for v in values], dtype=np.int32)
+    return list(table), ids
+
+
+def _pack(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class PassageMetadata:
+    """패시지 메타데이터 열 저장소 (행 = 패시지 id)"""
+
+    def __init__(
+        self,
+        sources: List[str],
+        domains: List[str],
+        source_ids: np.ndarray,
+        domain_ids: np.ndarray,
+        chunk_index: np.ndarray,
+        authority: np.ndarray,
+        title_blob: np.ndarray,
+        title_offsets: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.sources = sources
+        self.domains = domains
+        self.source_ids = source_ids
+        self.domain_ids = domain_ids
+        self.chunk_index = chunk_index
+        self.authority = authority
+        self.title_blob = title_blob
+        self.title_offsets = title_offsets
+        # 패시지 본문 UTF-8 blob의 바이트 오프셋 (n + 1개)
+        self.offsets = offsets
+
+    @classmethod
+    def from_passages(cls, passages: Sequence[str], source_files: Optional[Sequence[str]] = None) -> "PassageMetadata":
+        source_files = list(source_files) if source_files is not None else [""] * len(passages)
+        rows = [describe_passage(p, s) for p, s in zip(passages, source_files)]
+        sources, source_ids = _intern([r[0] for r in rows])
+        domains, domain_ids = _intern([r[1] for r in rows])
+        title_blob, title_offsets = _pack([r[2] for r in rows])
+        offsets = np.zeros(len(passages) + 1, dtype=np.int64)
+        np.cumsum([len(p.encode("utf-8")) for p in passages], out=offsets[1:])
+        return cls(
+            sources,
+            domains,
+            source_ids,
+            domain_ids,
+            np.asarray([r[3] for r in rows], dtype=np.int32),
+            np.asarray([authority_weight(p) for p in passages], dtype=np.float64),
+            title_blob,
+            title_offsets,
+            offsets,
+        )
+
+    def __len__(self) -> int:
+        return len(self.source_ids)
+
+    def source_file(self, i: int) -> str:
+        return self.sources[int(self.source_ids[i])]
+
+    def title(self, i: int) -> str:
+        return bytes(self.title_blob[self.title_offsets[i]:self.title_offsets[i + 1]]).decode("utf-8")
+
+    def record(self, i: int) -> PassageRecord:
+        i = int(i)
+        return PassageRecord(
+            id=i,
+            source_file=self.source_file(i),
+            source_domain=self.domains[int(self.domain_ids[i])],
+            title=self.title(i),
+            chunk_index=int(self.chunk_index[i]),
+            authority_weight=float(self.authority[i]),
+            byte_start=int(self.offsets[i]),
+            byte_end=int(self.offsets[i + 1]),
+        )
+
+    def rows_for_sources(self, names: Iterable[str]) -> Dict[str, np.ndarray]:
+        """출처 파일명 → 그 파일에서 온 행 id 배열 (본문을 읽지 않고 출처 id 열만 비교)"""
+        table = {name: sid for sid, name in enumerate(self.sources)}
+        source_ids = np.asarray(self.source_ids)
+        return {
+            name: np.flatnonzero(source_ids == table[name]) if name in table else np.zeros(0, dtype=np.int64)
+            for name in names
+        }
+
+    def _columns(self, rows: Sequence[int]) -> Tuple[List[str], List[str], List[str]]:
+        return (
+            [self.source_file(i) for i in rows],
+            [self.domains[int(self.domain_ids[i])] for i in rows],
+            [self.title(i) for i in rows],
+        )
+
+    def _rebuild(self, parts: Sequence[Tuple["PassageMetadata", Sequence[int]]], lengths: np.ndarray) -> "PassageMetadata":
+        srcs: List[str] = []
+        doms: List[str] = []
+        titles: List[str] = []
+        chunk: List[np.ndarray] = []
+        auth: List[np.ndarray] = []
+        for meta, rows in parts:
+            s, d, t = meta._columns(rows)
+            srcs += s
+            doms += d
+            titles += t
+            chunk.append(np.asarray(meta.chunk_index)[list(rows)])
+            auth.append(np.asarray(meta.authority)[list(rows)])
+        sources, source_ids = _intern(srcs)
+        domains, domain_ids = _intern(doms)
+        title_blob, title_offsets = _pack(titles)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return PassageMetadata(
+            sources,
+            domains,
+            source_ids,
+            domain_ids,
+            np.concatenate(chunk).astype(np.int32) if chunk else np.zeros(0, dtype=np.int32),
+            np.concatenate(auth).astype(np.float64) if auth else np.zeros(0),
+            title_blob,
+            title_offsets,
+            offsets,
+        )
+
+    def append(self, other: "PassageMetadata") -> "PassageMetadata":
+        """other의 행을 뒤에 붙인 새 저장소 (본문 오프셋은 이어서 계산)"""
+        if not len(other):
+            return self
+        lengths = np.concatenate([np.diff(self.offsets), np.diff(other.offsets)])
+        return self._rebuild([(self, range(len(self))), (other, range(len(other)))], lengths)
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """스냅샷 저장용 (배열, meta.json 항목)"""
+        arrays = {
+            "meta_source_ids": self.source_ids,
+            "meta_domain_ids": self.domain_ids,
+            "meta_chunk_index": self.chunk_index,
+            "meta_authority": np.asarray(self.authority, dtype=np.float64),
+            "meta_title_blob": self.title_blob,
+            "meta_title_offsets": self.title_offsets,
+            "passage_offsets": self.offsets,
+        }
+        return arrays, {"meta_sources": self.sources, "meta_domains": self.domains}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict) -> "PassageMetadata":
+        return cls(
+            list(meta["meta_sources"]),
+            list(meta["meta_domains"]),
+            arrays["meta_source_ids"],
+            arrays["meta_domain_ids"],
+            arrays["meta_chunk_index"],
+            arrays["meta_authority"],
+            arrays["meta_title_blob"],
+            arrays["meta_title_offsets"],
+            arrays["passage_offsets"],
+        )
@@ -0,0 +1,111 @@
+"""
+질의 확장 (한국어 → 일본어 의료 용어)
+- 확장 사전은 data/query_expansion.json 에 두고 코드 수정 없이 확장
+- 모든 한국어 키를 Aho-Corasick 오토마톤 하나로 컴파일해 질의를 한 번만 훑어 매칭
+  (키 수와 무관하게 질의 길이 + 매칭 수에 비례)
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_EXPANSION_PATH = Path(__file__).resolve().parents[1] / "data" / "query_expansion.json"
+
+
+class AhoCorasick:
+    """다중 패턴 부분 문자열 매처 (순수 파이썬)"""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        # 노드별 전이 테이블 / 실패 링크 / 해당 노드에서 끝나는 패턴 id
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pid)
+        self._build_fail_links()
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                # 실패 링크 쪽에서 끝나는 패턴도 함께 출력
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_ids(self, text: str) -> set:
+        """text에 등장하는 패턴 id 집합 (한 번의 선형 스캔)"""
+        found = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class QueryExpander:
+    """복합 문구 → 단일 용어 순으로 매칭된 일본어 용어를 질의 뒤에 덧붙입니다."""
+
+    def __init__(self, composite: Dict[str, List[str]], terms: Dict[str, List[str]]):
+        self.composite = dict(composite)
+        self.terms = dict(terms)
+        # 복합 문구를 먼저 두어 id 순서 = 기존 확장 순서(복합 → 단일, 사전 순서)
+        self._entries: List[Tuple[str, List[str]]] = list(self.composite.items()) + list(self.terms.items())
+        self._matcher = AhoCorasick([k for k, _ in self._entries])
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None) -> "QueryExpander":
+        path = Path(path or os.getenv("RAG_QUERY_EXPANSION_PATH", str(DEFAULT_EXPANSION_PATH)))
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("composite", {}), data.get("terms", {}))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def expansion_terms(self, query: str) -> List[str]:
+        terms: List[str] = []
+        for pid in sorted(self._matcher.find_ids(query)):
+            terms.extend(self._entries[pid][1])
+        return terms
+
+    def expand(self, query: str) -> str:
+        """원본 질의와 확장 용어를 결합한 문자열"""
+        terms = self.expansion_terms(query)
+        if terms:
+            return query + " " + " ".join(terms)
+        return query
+
+
+_DEFAULT_EXPANDER: Optional[QueryExpander] = None
+
+
+def get_default_expander() -> QueryExpander:
+    """프로세스 전역 확장기 (사전 파일은 한 번만 읽고 컴파일)"""
+    global _DEFAULT_EXPANDER
+    if _DEFAULT_EXPANDER is None:
+        _DEFAULT_EXPANDER = QueryExpander.from_file()
+    return _DEFAULT_EXPANDER
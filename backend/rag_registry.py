@@ -0,0 +1,170 @@
+"""
+RAG 인덱스 레지스트리 (세대 교체)
+- 새 인덱스는 요청 경로 밖(백그라운드 스레드)에서 빌드하고, 참조 하나를 바꿔 게시
+- 검색 요청은 reader()로 현재 세대를 잡고 사용 (빌드/교체 동안 대기하지 않음)
+- 세대별 reader를 추적해, 교체된 이전 세대는 마지막 reader가 끝나면 참조를 놓아 해제
+- main.py / backend.* 두 경로로 임포트되어도 같은 레지스트리를 공유
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# backend 패키지/단독 모듈 두 경로로 임포트되어도 한 모듈(한 레지스트리)만 존재하도록 별칭 등록
+for _alias in ("rag_registry", "backend.rag_registry"):
+    sys.modules.setdefault(_alias, sys.modules[__name__])
+
+
+class IndexGeneration:
+    """게시된 인덱스 한 세대와 그 reader 목록"""
+
+    def __init__(self, index: Any, generation: int):
+        self.index = index
+        self.generation = generation
+        self.published_at = time.time()
+        # reader 토큰 집합: set.add/discard는 GIL 하에서 원자적이라 잠금 없이 참조 수를 셀 수 있음
+        self.readers: Set[object] = set()
+        self.retired = False
+
+
+class IndexRegistry:
+    """현재 세대 참조를 원자적으로 교체하는 인덱스 레지스트리"""
+
+    def __init__(self, name: str):
+        self.name = name
+        # 현재 세대는 참조 하나로만 보관 → 읽기는 속성 조회 한 번
+        self._current: Optional[IndexGeneration] = None
+        self._next_generation = 1
+        # 게시(쓰기)끼리만 직렬화. 검색(reader)은 이 잠금을 잡지 않음
+        self._publish_lock = threading.Lock()
+        self._draining: List[IndexGeneration] = []
+        self._drained_count = 0
+        self._build_thread: Optional[threading.Thread] = None
+        self.last_build_error: Optional[str] = None
+        # 게시 직후 호출되는 콜백 (결과 캐시 무효화 등), 인자는 새 세대 번호
+        self._publish_listeners: List[Callable[[int], None]] = []
+
+    @property
+    def generation(self) -> int:
+        """현재 세대 번호 (게시된 인덱스가 없으면 0)"""
+        current = self._current
+        return current.generation if current is not None else 0
+
+    def current(self) -> Optional[Any]:
+        """현재 인덱스 (reader로 등록하지 않음: 통계/존재 확인용)"""
+        current = self._current
+        return current.index if current is not None else None
+
+    def publish(self, index: Any, expected: Optional[Any] = None) -> int:
+        """새 세대를 게시하고 세대 번호를 반환합니다.
+
+        expected가 주어지면 현재 인덱스가 그것일 때만 교체합니다 (아니면 0 반환).
+        """
+        with self._publish_lock:
+            old = self._current
+            if expected is not None and (old is None or old.index is not expected):
+                return 0
+            gen = IndexGeneration(index, self._next_generation)
+            self._next_generation += 1
+            # 참조 하나의 대입으로 게시 → 이후 reader는 새 세대를 봄
+            self._current = gen
+        if old is not None:
+            old.retired = True
+            self._draining.append(old)
+            if not old.readers:
+                self._try_drain(old)
+        for listener in list(self._publish_listeners):
+            try:
+                listener(gen.generation)
+            except Exception as e:
+                print(f"[{self.name}] 게시 리스너 오류: {e}")
+        return gen.generation
+
+    def add_publish_listener(self, listener: Callable[[int], None]) -> None:
+        """새 세대가 게시될 때마다 listener(세대 번호)를 호출합니다."""
+        self._publish_listeners.append(listener)
+
+    @contextmanager
+    def reader(self) -> Iterator[Optional[Any]]:
+        """현재 세대를 잡고 인덱스를 넘겨줍니다. 블록이 끝나면 reader 등록을 해제합니다."""
+        with self.generation_reader() as (_, index):
+            yield index
+
+    @contextmanager
+    def generation_reader(self) -> Iterator[Tuple[int, Optional[Any]]]:
+        """reader()와 같되 (세대 번호, 인덱스)를 넘겨줍니다. 게시된 인덱스가 없으면 (0, None)."""
+        token = object()
+        while True:
+            gen = self._current
+            if gen is None:
+                yield 0, None
+                return
+            gen.readers.add(token)
+            index = gen.index
+            if index is not None:
+                break
+            # 등록 직전에 해제된 세대 → 새 현재 세대로 재시도
+            gen.readers.discard(token)
+        try:
+            yield gen.generation, index
+        finally:
+            gen.readers.discard(token)
+            if gen.retired and not gen.readers:
+                self._try_drain(gen)
+
+    def _try_drain(self, gen: IndexGeneration) -> None:
+        """reader가 모두 끝난 이전 세대의 참조를 놓아 메모리를 해제합니다 (한 번만 수행)."""
+        try:
+            # list.remove는 원자적이라 동시에 호출돼도 한 쪽만 성공
+            self._draining.remove(gen)
+        except ValueError:
+            return
+        gen.index = None
+        self._drained_count += 1
+
+    def rebuild_async(self, builder: Callable[[], Any]) -> bool:
+        """백그라운드 스레드에서 builder()로 새 세대를 빌드해 게시합니다.
+
+        이미 빌드 중이면 False. 빌드가 실패하면 현재 세대를 그대로 유지합니다.
+        """
+        with self._publish_lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return False
+
+            def _run():
+                try:
+                    index = builder()
+                except Exception as e:
+                    self.last_build_error = str(e)
+                    print(f"[{self.name}] 인덱스 빌드 실패: {e}")
+                    return
+                self.last_build_error = None
+                generation = self.publish(index)
+                print(f"[{self.name}] 세대 {generation} 게시")
+
+            self._build_thread = threading.Thread(target=_run, name=f"{self.name}-build", daemon=True)
+            self._build_thread.start()
+            return True
+
+    def is_building(self) -> bool:
+        thread = self._build_thread
+        return thread is not None and thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        """헬스 체크/관리용 상태 요약"""
+        current = self._current
+        return {
+            "generation": current.generation if current is not None else 0,
+            "published_at": current.published_at if current is not None else None,
+            "active_readers": len(current.readers) if current is not None else 0,
+            "draining_generations": [g.generation for g in list(self._draining)],
+            "drained_generations": self._drained_count,
+            "building": self.is_building(),
+            "last_build_error": self.last_build_error,
+        }
+
+
+# 프로세스 전역 HybridRAG 레지스트리
+RAG_REGISTRY = IndexRegistry("hybrid_rag")
@@ -0,0 +1,258 @@
+"""
+RAG 검색 결과 캐시 (RAG_REGISTRY 앞단)
+- 키: 정규화된 질의(NFKC/소문자/공백 정리) + top_k, 값은 현재 인덱스 세대의 (패시지 id, 점수) 목록
+- 크기(LRU)와 TTL로 만료, 선택적으로 문자 3-gram 서명의 Jaccard 유사도로 근사 중복 질의도 적중
+- 레지스트리에 새 세대가 게시되면(핫스왑/증분 반영/컴팩션) 자동으로 전체 무효화
+- main.py / backend.* 두 경로로 임포트되어도 같은 캐시를 공유
+"""
+
+import os
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+try:
+    from .rag_registry import RAG_REGISTRY, IndexRegistry
+    from .rag_topk import merge_hit_lists
+except ImportError:
+    from rag_registry import RAG_REGISTRY, IndexRegistry
+    from rag_topk import merge_hit_lists
+
+for _alias in ("rag_result_cache", "backend.rag_result_cache"):
+    sys.modules.setdefault(_alias, sys.modules[__name__])
+
+Hits = List[Tuple[int, float]]
+# resolve(인덱스, 질의별 id 결과, 통합 id 결과): reader 안에서 id를 본문/메타데이터로 변환
+Resolver = Callable[[Any, List[Hits], Hits], Any]
+
+
+def resolve_texts(rag: Any, per_query: List[Hits], merged: Hits) -> Tuple[List[List[Tuple[str, float]]], List[Tuple[str, float]]]:
+    """HybridRAG.search_batch와 같은 (패시지 본문, 점수) 형식으로 변환"""
+    return (
+        [[(rag.passage_text(i), s) for i, s in hits] for hits in per_query],
+        [(rag.passage_text(i), s) for i, s in merged],
+    )
+
+
+def normalize_query(text: str) -> str:
+    """전각/반각, 대소문자, 공백 차이는 같은 질의로 취급"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").lower().split())
+
+
+def ngram_signature(text: str, n: int = 3) -> FrozenSet[str]:
+    """공백을 뺀 정규화 질의의 문자 n-gram 집합 (짧은 질의는 전체 문자열 하나)"""
+    compact = text.replace(" ", "")
+    if len(compact) <= n:
+        return frozenset([compact]) if compact else frozenset()
+    return frozenset(compact[i:i + n] for i in range(len(compact) - n + 1))
+
+
+class _Entry:
+    __slots__ = ("hits", "expires_at", "signature")
+
+    def __init__(self, hits: Tuple[Tuple[int, float], ...], expires_at: float, signature: FrozenSet[str]):
+        self.hits = hits
+        self.expires_at = expires_at
+        self.signature = signature
+
+
+class SearchResultCache:
+    """인덱스 세대별 질의 결과 캐시
+
+    RAG_RESULT_CACHE_SIZE: 최대 항목 수 (기본 1024, 0이면 캐시 끔)
+    RAG_RESULT_CACHE_TTL_SEC: 항목 수명 (기본 600초)
+    RAG_RESULT_CACHE_NEAR_DUP: 근사 중복 적중 Jaccard 임계값 (기본 0 = 끔, 예: 0.85)
+    """
+
+    def __init__(
+        self,
+        registry: IndexRegistry,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        near_dup_threshold: Optional[float] = None,
+    ):
+        self.registry = registry
+        self.maxsize = int(os.getenv("RAG_RESULT_CACHE_SIZE", "1024")) if maxsize is None else maxsize
+        self.ttl = float(os.getenv("RAG_RESULT_CACHE_TTL_SEC", "600")) if ttl is None else ttl
+        self.near_dup_threshold = (
+            float(os.getenv("RAG_RESULT_CACHE_NEAR_DUP", "0")) if near_dup_threshold is None else near_dup_threshold
+        )
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Tuple[str, int], _Entry]" = OrderedDict()
+        # 근사 중복 탐색용 역색인: n-gram → 키 집합
+        self._grams: Dict[str, Set[Tuple[str, int]]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # 호출 단위 지연: 모든 질의가 적중한 호출 / 검색이 필요했던 호출
+        self._hit_calls = 0
+        self._miss_calls = 0
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+        registry.add_publish_listener(self.invalidate)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def invalidate(self, generation: int = 0) -> None:
+        """모든 항목을 버리고 새 세대 기준으로 다시 채웁니다 (게시 리스너)."""
+        with self._lock:
+            self._items.clear()
+            self._grams.clear()
+            # 리스너는 게시 잠금 밖에서 호출되므로 늦게 도착한 이전 세대 번호로 되돌아가지 않도록
+            self._generation = max(self._generation, generation)
+            self.invalidations += 1
+
+    def _remove(self, key: Tuple[str, int]) -> None:
+        entry = self._items.pop(key)
+        for g in entry.signature:
+            keys = self._grams.get(g)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[g]
+
+    def _lookup(self, key: Tuple[str, int], now: float) -> Tuple[Optional[_Entry], bool]:
+        """(항목, 근사 적중 여부). 잠금을 잡은 상태로 호출."""
+        entry = self._items.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._items.move_to_end(key)
+                return entry, False
+            self._remove(key)
+            self.expirations += 1
+        if self.near_dup_threshold <= 0:
+            return None, False
+        signature = ngram_signature(key[0])
+        if not signature:
+            return None, False
+        overlaps: Counter = Counter()
+        for g in signature:
+            for other in self._grams.get(g, ()):
+                if other[1] == key[1]:
+                    overlaps[other] += 1
+        best, best_sim = None, self.near_dup_threshold
+        for other, overlap in overlaps.items():
+            cand = self._items[other]
+            sim = overlap / (len(signature) + len(cand.signature) - overlap)
+            if sim >= best_sim and cand.expires_at > now:
+                best, best_sim = other, sim
+        if best is None:
+            return None, False
+        self._items.move_to_end(best)
+        return self._items[best], True
+
+    def _store(self, key: Tuple[str, int], hits: Hits, generation: int, now: float) -> None:
+        with self._lock:
+            # 검색 도중 새 세대가 게시됐다면 이전 세대 결과는 저장하지 않음
+            if generation != self._generation:
+                return
+            if key in self._items:
+                self._remove(key)
+            signature = ngram_signature(key[0]) if self.near_dup_threshold > 0 else frozenset()
+            self._items[key] = _Entry(tuple(hits), now + self.ttl, signature)
+            for g in signature:
+                self._grams.setdefault(g, set()).add(key)
+            while len(self._items) > self.maxsize:
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+
+    def search_batch(self, queries: List[str], top_k: int = 2, resolve: Optional[Resolver] = None) -> Any:
+        """(질의별 결과, 통합 상위 top_k)를 resolve로 변환해 반환합니다. 캐시에 없는 질의만 검색.
+
+        캐시는 패시지 id만 보관하며, 기본 resolve는 HybridRAG.search_batch와 같은 (본문, 점수) 형식입니다.
+        """
+        resolve = resolve or resolve_texts
+        with self.registry.generation_reader() as (generation, rag):
+            if rag is None:
+                return resolve(rag, [[] for _ in queries], [])
+            if not self.enabled:
+                return resolve(rag, *rag.search_batch_ids(queries, top_k=top_k))
+            start = time.perf_counter()
+            now = time.time()
+            keys = [(normalize_query(q), top_k) for q in queries]
+            per_query: List[Optional[Hits]] = [None] * len(queries)
+            with self._lock:
+                if generation > self._generation:
+                    # 리스너보다 먼저 새 세대를 본 경우 (또는 첫 사용)
+                    self._items.clear()
+                    self._grams.clear()
+                    self._generation = generation
+                # 교체 직전 세대를 잡은 요청은 캐시를 건너뜀 (_store도 세대 불일치로 저장하지 않음)
+                if generation == self._generation:
+                    for i, key in enumerate(keys):
+                        if not key[0]:
+                            per_query[i] = []
+                            continue
+                        entry, near = self._lookup(key, now)
+                        if entry is not None:
+                            per_query[i] = list(entry.hits)
+                            self.hits += 1
+                            self.near_hits += int(near)
+            # 캐시 키는 정규화 질의, 검색은 키별 첫 원문 질의로 (HybridRAG.search와 같은 결과)
+            originals: Dict[str, str] = {}
+            for (key, _), query, result in zip(keys, queries, per_query):
+                if result is None:
+                    originals.setdefault(key, query)
+            missing = list(originals)
+            if missing:
+                results, _ = rag.search_batch_ids([originals[k] for k in missing], top_k=top_k)
+                fresh = dict(zip(missing, results))
+                for key, result in fresh.items():
+                    self._store((key, top_k), result, generation, now)
+                for i, key in enumerate(keys):
+                    if per_query[i] is None:
+                        per_query[i] = list(fresh[key[0]])
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if missing:
+                    self.misses += len(missing)
+                    self._miss_calls += 1
+                    self._miss_seconds += elapsed
+                else:
+                    self._hit_calls += 1
+                    self._hit_seconds += elapsed
+            return resolve(rag, per_query, merge_hit_lists(per_query, top_k))
+
+    def search(self, query: str, top_k: int = 2) -> List[Tuple[str, float]]:
+        if not query:
+            return []
+        per_query, _ = self.search_batch([query], top_k=top_k)
+        return per_query[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """관리 화면용 적중/미스/지연 통계"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "generation": self._generation,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl,
+                "near_dup_threshold": self.near_dup_threshold,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_latency_ms": self._hit_seconds * 1000 / max(1, self._hit_calls),
+                "miss_latency_ms": self._miss_seconds * 1000 / max(1, self._miss_calls),
+            }
+
+
+# 프로세스 전역 HybridRAG 결과 캐시
+RAG_RESULT_CACHE = SearchResultCache(RAG_REGISTRY)
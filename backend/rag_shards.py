@@ -0,0 +1,69 @@
+"""
+HybridRAG 샤드 병렬 검색 유틸리티
+- 패시지를 연속 구간 N개로 나눠 샤드별로 BM25 + TF-IDF 점수/상위 k개를 계산하고 k-way 병합
+- 샤드는 CSR 행 구간 뷰(데이터/인덱스 배열 복사 없음, mmap 스냅샷에도 그대로 사용)
+- 스레드 풀에서 실행: SciPy 희소 행렬곱과 NumPy 연산은 GIL을 놓으므로 코어 여러 개를 사용
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_WORKERS = 0  # 현재 _POOL의 스레드 수
+_POOL_LOCK = threading.Lock()
+
+
+def configured_shards(n_passages: int) -> int:
+    """사용할 샤드 수.
+
+    RAG_SEARCH_SHARDS: 1(기본, 단일 경로) | N | auto(CPU 코어 수)
+    RAG_SHARD_MIN_PASSAGES: 이보다 작은 코퍼스는 스레드 전환 비용이 더 커서 단일 경로 (기본 20000)
+    """
+    raw = os.getenv("RAG_SEARCH_SHARDS", "1").strip().lower()
+    if raw == "auto":
+        shards = os.cpu_count() or 1
+    else:
+        try:
+            shards = int(raw)
+        except ValueError:
+            print(f"Warning: invalid RAG_SEARCH_SHARDS={raw!r}, falling back to 1 shard")
+            shards = 1
+    if n_passages < int(os.getenv("RAG_SHARD_MIN_PASSAGES", "20000")):
+        return 1
+    return max(1, min(shards, n_passages))
+
+
+def shard_bounds(n: int, n_shards: int) -> List[Tuple[int, int]]:
+    """[0, n)을 크기가 거의 같은 연속 구간 n_shards개로 나눕니다."""
+    edges = np.linspace(0, n, max(1, n_shards) + 1).astype(np.int64)
+    return [(int(s), int(e)) for s, e in zip(edges[:-1], edges[1:]) if e > s]
+
+
+def csr_row_view(matrix: csr_matrix, start: int, end: int) -> csr_matrix:
+    """CSR 행 [start, end) 구간 뷰. data/indices는 원본 배열의 슬라이스라 복사하지 않습니다."""
+    indptr = np.asarray(matrix.indptr[start:end + 1])
+    lo, hi = int(indptr[0]), int(indptr[-1])
+    return csr_matrix(
+        (matrix.data[lo:hi], matrix.indices[lo:hi], indptr - lo),
+        shape=(end - start, matrix.shape[1]),
+        copy=False,
+    )
+
+
+def get_shard_pool(workers: int) -> ThreadPoolExecutor:
+    """프로세스 전역 샤드 스레드 풀 (더 많은 샤드가 필요하면 더 큰 풀로 교체)
+
+    이전 풀은 shutdown하지 않습니다 — 이미 풀을 받아 간 검색이 제출 중일 수 있으므로,
+    남은 작업을 마친 뒤 참조가 모두 사라지면 스레드가 스스로 종료됩니다.
+    """
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS < workers:
+            _POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-shard")
+            _POOL_WORKERS = workers
+        return _POOL
@@ -0,0 +1,107 @@
+"""
+RAG 인덱스 스냅샷 저장소
+- 인덱스를 한 번 빌드해 .npy 배열 + meta.json 으로 디스크에 기록
+- 워커는 np.load(mmap_mode='r')로 열어 OS 페이지 캐시를 공유 (부팅 시 재학습 없음)
+- 패시지 원본 파일의 지문(fingerprint)을 디렉토리 이름으로 사용하여 유효성 판단
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 포맷이 바뀌면 올려서 기존 스냅샷을 무효화
+SNAPSHOT_VERSION = 4
+META_FILE = "meta.json"
+
+
+def fingerprint_sources(files: Iterable[Path], extra: Optional[Dict] = None) -> str:
+    """패시지 원본 파일 목록(이름/크기/수정시각)과 설정값으로 지문을 계산합니다."""
+    h = hashlib.sha1()
+    h.update(f"snapshot-v{SNAPSHOT_VERSION}\n".encode("utf-8"))
+    h.update(json.dumps(extra or {}, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        h.update(f"{p.parent.name}/{p.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def write_snapshot(
+    root: Path, fingerprint: str, arrays: Dict[str, np.ndarray], meta: Dict, overwrite: bool = False
+) -> Path:
+    """임시 디렉토리에 기록한 뒤 rename으로 게시합니다 (여러 워커가 동시에 빌드해도 안전).
+
+    overwrite=True면 같은 지문의 기존 스냅샷을 교체합니다 (증분 반영/컴팩션 결과 저장용).
+    기존 파일을 mmap 중인 워커는 삭제된 inode를 계속 읽으므로 영향이 없습니다.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / fingerprint
+    tmp = root / f".{fingerprint}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+    full_meta = dict(meta)
+    full_meta["version"] = SNAPSHOT_VERSION
+    full_meta["fingerprint"] = fingerprint
+    full_meta["arrays"] = sorted(arrays.keys())
+    with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(full_meta, f, ensure_ascii=False)
+
+    if overwrite and target.exists():
+        old = root / f".{fingerprint}.old-{os.getpid()}"
+        try:
+            os.rename(target, old)
+        except OSError:
+            pass
+        else:
+            shutil.rmtree(old, ignore_errors=True)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # 다른 워커가 먼저 게시한 경우 그 결과를 사용
+        shutil.rmtree(tmp, ignore_errors=True)
+    prune_snapshots(root, keep=fingerprint)
+    return target
+
+
+def read_snapshot(root: Path, fingerprint: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    """지문이 일치하는 스냅샷을 mmap으로 엽니다. 없거나 손상되면 None."""
+    directory = Path(root) / fingerprint
+    meta_path = directory / META_FILE
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION or meta.get("fingerprint") != fingerprint:
+            return None
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r")
+            for name in meta.get("arrays", [])
+        }
+        return arrays, meta
+    except Exception as e:
+        print(f"스냅샷 로드 실패 ({directory}): {e}")
+        return None
+
+
+def prune_snapshots(root: Path, keep: str) -> None:
+    """현재 지문 외의 오래된 스냅샷 디렉토리를 정리합니다."""
+    root = Path(root)
+    if not root.exists():
+        return
+    for child in root.iterdir():
+        if not child.is_dir() or child.name == keep or child.name.startswith("."):
+            continue
+        shutil.rmtree(child, ignore_errors=True)
@@ -0,0 +1,165 @@
+"""
+RAG 공용 토크나이저
+- 컴파일된 패턴 하나로 한 번만 스캔하며 (종류, 토큰)을 생성: 한/일 단어, 영어 단어, 숫자
+- 인덱스 빌드 시 패시지 토큰을 id 배열(CSR: ids + offsets)로 저장해 검색 경로에서 재토큰화하지 않음
+- BM25용 분석기 선택(RAG_BM25_ANALYZER): cjk-ngram(기본) | regex | dict
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 분리된 세 번의 findall(한/일, 영어, 숫자)과 같은 토큰을 한 번의 스캔으로 추출
+# (문자 클래스가 서로 겹치지 않으므로 각 토큰의 매칭 조건은 그대로)
+TOKEN_PATTERN = re.compile(
+    r"(?P<cjk>[가-힣あ-んア-ン一-龯]+)"
+    r"|(?P<latin>\b[a-zA-Z]+\b)"
+    r"|(?P<num>\d+)"
+)
+# AdvancedRAG용 단어 토큰 (유니코드 \w 연속)
+WORD_PATTERN = re.compile(r"\b\w+\b")
+
+
+def iter_typed_tokens(text: str) -> Iterator[Tuple[str, str]]:
+    """(종류, 토큰)을 등장 순서대로 생성합니다. 종류: cjk | latin | num"""
+    for m in TOKEN_PATTERN.finditer(text):
+        kind = m.lastgroup
+        token = m.group()
+        yield kind, token if kind == "num" else token.lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """HybridRAG BM25용 다국어 토큰 목록"""
+    return [token for _, token in iter_typed_tokens(text)]
+
+
+def word_tokenize(text: str) -> List[str]:
+    """소문자 단어 토큰 목록 (AdvancedRAG)"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+# 일본어 가나/한자 연속 구간 (사전 분석기 대상)
+_JAPANESE_RUN = re.compile(r"[あ-んア-ン一-龯]+")
+
+
+def cjk_ngrams(run: str, sizes: Sequence[int] = (2, 3)) -> List[str]:
+    """CJK 연속 구간을 문자 n-gram으로 분해합니다. 가장 짧은 n보다 짧은 구간은 그대로."""
+    if len(run) < min(sizes):
+        return [run]
+    return [run[i:i + n] for n in sizes for i in range(len(run) - n + 1)]
+
+
+def ngram_tokenize(text: str) -> List[str]:
+    """CJK 구간은 2/3-gram, 영어/숫자는 regex 토큰 그대로"""
+    tokens: List[str] = []
+    for kind, token in iter_typed_tokens(text):
+        if kind == "cjk":
+            tokens.extend(cjk_ngrams(token))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+@lru_cache(maxsize=1)
+def _load_segmenter() -> Optional[Callable[[str], List[str]]]:
+    """설치된 일본어 형태소 분석기(fugashi → janome)를 반환합니다. 없으면 None (사전 로딩은 프로세스당 한 번)."""
+    try:
+        import fugashi
+
+        tagger = fugashi.Tagger()
+        return lambda run: [w.surface for w in tagger(run)]
+    except Exception:
+        pass
+    try:
+        from janome.tokenizer import Tokenizer
+
+        tokenizer = Tokenizer()
+        return lambda run: list(tokenizer.tokenize(run, wakati=True))
+    except Exception:
+        return None
+
+
+def make_dictionary_tokenize(segment: Callable[[str], List[str]]) -> Callable[[str], List[str]]:
+    """일본어 구간은 형태소 단위, 한글 구간은 2/3-gram, 영어/숫자는 regex 토큰"""
+
+    def dictionary_tokenize(text: str) -> List[str]:
+        tokens: List[str] = []
+        for kind, token in iter_typed_tokens(text):
+            if kind != "cjk":
+                tokens.append(token)
+                continue
+            pos = 0
+            for m in _JAPANESE_RUN.finditer(token):
+                if m.start() > pos:
+                    tokens.extend(cjk_ngrams(token[pos:m.start()]))
+                tokens.extend(w for w in segment(m.group()) if w.strip())
+                pos = m.end()
+            if pos < len(token):
+                tokens.extend(cjk_ngrams(token[pos:]))
+        return tokens
+
+    return dictionary_tokenize
+
+
+ANALYZERS = ("regex", "cjk-ngram", "dict")
+
+
+def get_analyzer(name: Optional[str] = None) -> Tuple[str, Callable[[str], List[str]]]:
+    """BM25 분석기 (실제 사용된 이름, 토큰화 함수).
+
+    RAG_BM25_ANALYZER: cjk-ngram(기본, 2/3-gram) | regex(공백 단위 CJK 덩어리) | dict(형태소, 선택 의존성)
+    dict는 fugashi/janome이 없으면 cjk-ngram으로 대체합니다.
+    """
+    name = (name or os.getenv("RAG_BM25_ANALYZER", "cjk-ngram")).lower()
+    if name == "dict":
+        segment = _load_segmenter()
+        if segment is not None:
+            return name, make_dictionary_tokenize(segment)
+        print("Warning: no Japanese segmenter (fugashi/janome) available, falling back to cjk-ngram analyzer")
+        name = "cjk-ngram"
+    if name == "cjk-ngram":
+        return name, ngram_tokenize
+    if name != "regex":
+        raise ValueError(f"unknown BM25 analyzer: {name}")
+    return name, tokenize
+
+
+class TokenVocabulary:
+    """토큰 ↔ id 매핑"""
+
+    def __init__(self, tokens: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        for token in tokens:
+            self.ids.setdefault(token, len(self.ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, tokens: Iterable[str]) -> np.ndarray:
+        """토큰을 id 배열로 변환하며 새 토큰은 어휘에 추가합니다."""
+        ids = self.ids
+        return np.asarray([ids.setdefault(t, len(ids)) for t in tokens], dtype=np.int32)
+
+    def lookup(self, tokens: Iterable[str]) -> np.ndarray:
+        """어휘에 있는 토큰만 id 배열로 변환합니다 (질의용, 어휘를 바꾸지 않음)."""
+        ids = self.ids
+        return np.asarray([ids[t] for t in tokens if t in ids], dtype=np.int32)
+
+
+def build_token_arrays(
+    corpus: Sequence[Sequence[str]], vocab: TokenVocabulary, unique: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """문서별 토큰을 (ids, offsets) CSR 배열로 만듭니다. unique=True면 문서별 정렬된 고유 id."""
+    chunks: List[np.ndarray] = []
+    offsets = np.zeros(len(corpus) + 1, dtype=np.int64)
+    for i, tokens in enumerate(corpus):
+        ids = vocab.add(tokens)
+        if unique:
+            ids = np.unique(ids)
+        chunks.append(ids)
+        offsets[i + 1] = offsets[i] + len(ids)
+    ids = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    return ids.astype(np.int32, copy=False), offsets
@@ -0,0 +1,58 @@
+"""
+상위 k개 선택 유틸리티
+- 점수 벡터에서 상위 k개 인덱스 선택 (argpartition, O(N) 선택 + O(k log k) 정렬)
+- 다중 질의 결과 병합 (late merge)
+- 샤드별 정렬된 상위 k개 결과의 k-way 병합
+"""
+
+import heapq
+from itertools import islice
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 내림차순 상위 k개 인덱스.
+
+    동점은 인덱스 오름차순으로 정렬하여 list.sort(reverse=True)의 안정 정렬 결과와 동일합니다.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= n:
+        idx = np.arange(n)
+    else:
+        part = np.argpartition(-scores, k - 1)[:k]
+        kth = scores[part].min()
+        above = np.flatnonzero(scores > kth)
+        # 경계 동점은 앞쪽 인덱스부터 채움
+        ties = np.flatnonzero(scores == kth)[: k - len(above)]
+        idx = np.concatenate([above, ties])
+    order = np.lexsort((idx, -scores[idx]))
+    return idx[order]
+
+
+def merge_hit_lists(hit_lists: List[List[Tuple[int, float]]], k: int) -> List[Tuple[int, float]]:
+    """여러 질의의 (패시지 인덱스, 점수) 결과를 합쳐 상위 k개를 반환합니다.
+
+    같은 패시지가 여러 질의에서 나오면 가장 높은 점수 하나만 남깁니다.
+    """
+    best: Dict[int, float] = {}
+    for hits in hit_lists:
+        for idx, score in hits:
+            if idx not in best or score > best[idx]:
+                best[idx] = score
+    merged = sorted(best.items(), key=lambda x: x[1], reverse=True)
+    return merged[:k]
+
+
+def kway_merge_hits(shard_hits: Sequence[List[Tuple[int, float]]], k: int) -> List[Tuple[int, float]]:
+    """샤드별 (전역 인덱스, 점수) 상위 k개 목록을 합쳐 전체 상위 k개를 반환합니다.
+
+    각 목록이 top_k_indices 순서(점수 내림차순, 동점은 인덱스 오름차순)이면
+    단일 점수 벡터에서 top_k_indices로 고른 결과와 같습니다.
+    """
+    merged = heapq.merge(*shard_hits, key=lambda h: (-h[1], h[0]))
+    return list(islice(merged, max(0, k)))
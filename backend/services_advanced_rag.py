@@ -5,20 +5,35 @@
 - 쿼리 확장 및 리랭킹
 """
 
+import hashlib
 import numpy as np
-import pickle
 import os
 from typing import List, Tuple, Dict, Optional
 from pathlib import Path
-import re
 import time
+import threading
+import unicodedata
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
-# 기존 RAG 시스템
-from rank_bm25 import BM25Okapi
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+try:
+    from .rag_ann import build_dense_index
+    from .rag_bm25 import PostingsBM25
+    from .rag_embedding_store import EmbeddingStore
+    from .rag_passages import PassageStore
+    from .rag_tokenizer import TokenVocabulary, build_token_arrays, word_tokenize
+    from .rag_topk import merge_hit_lists
+except ImportError:
+    from rag_ann import build_dense_index
+    from rag_bm25 import PostingsBM25
+    from rag_embedding_store import EmbeddingStore
+    from rag_passages import PassageStore
+    from rag_tokenizer import TokenVocabulary, build_token_arrays, word_tokenize
+    from rag_topk import merge_hit_lists
+
 # Sentence-BERT 임베딩
 try:
     from sentence_transformers import SentenceTransformer
@@ -37,6 +52,59 @@ except ImportError:
     print("Warning: NLTK not available. Install with: pip install nltk")
 
 
+class QueryEmbeddingCache:
+    """정규화된 질의 텍스트 → 임베딩 LRU 캐시 (미스만 한 번에 배치 인코딩)"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # 전각/반각, 대소문자, 공백 차이는 같은 질의로 취급
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    def encode(self, model, texts: List[str]) -> np.ndarray:
+        """texts 순서대로 임베딩 행렬을 반환합니다. 캐시에 없는 질의만 모델로 인코딩.
+
+        캐시 키만 정규화하고, 모델에는 키별 첫 원문을 그대로 넘깁니다 (대소문자 구분 모델 보존).
+        """
+        keys = [self.normalize(t) for t in texts]
+        originals: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            originals.setdefault(key, text)
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in originals:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    found[key] = self._items[key]
+            missing = [k for k in originals if k not in found]
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += len(missing)
+        if missing:
+            encoded = np.asarray(model.encode([originals[k] for k in missing]))
+            with self._lock:
+                for key, emb in zip(missing, encoded):
+                    found[key] = emb
+                    self._items[key] = emb
+                    self._items.move_to_end(key)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return np.vstack([found[k] for k in keys])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
 class AdvancedRAG:
     """고도화된 RAG 시스템"""
     
@@ -51,19 +119,33 @@ class AdvancedRAG:
             self.embedding_model = None
             print("Warning: Using fallback embedding model")
         
+        # 질의 임베딩 LRU (검색/리랭킹에서 같은 질의를 반복 인코딩하지 않도록)
+        self.query_cache = QueryEmbeddingCache(int(os.getenv("RAG_QUERY_EMBED_CACHE", "1024")))
+        
         # 캐시 디렉토리 설정
-        self.cache_dir = Path("data/cache/embeddings")
+        self.cache_dir = Path(os.getenv("RAG_EMBED_CACHE_DIR", "data/cache/embeddings"))
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.embedding_store: Optional[EmbeddingStore] = None
         
         # 임베딩 로드 또는 생성
         self.passage_embeddings = self._load_or_create_embeddings()
+        # Dense 검색 인덱스 (소규모는 전수 검색, 대규모는 ANN; RAG_ANN_BACKEND로 선택)
+        self.dense_index = (
+            build_dense_index(self.passage_embeddings) if self.embedding_model is not None else None
+        )
         
         # Sparse 검색 초기화 (기존 시스템)
-        self.tokenized = [self._tokenize(p) for p in passages]
-        self.bm25 = BM25Okapi(self.tokenized)
+        tokenized = [self._tokenize(p) for p in passages]
+        self.bm25 = PostingsBM25.from_tokenized(tokenized)
+        # 리랭킹 키워드 보너스용 패시지별 고유 토큰 id (BM25 어휘와 같은 id, 검색 시 재토큰화하지 않음)
+        self.vocab = TokenVocabulary(self.bm25.terms)
+        self.token_ids, self.token_offsets = build_token_arrays(tokenized, self.vocab, unique=True)
         self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=8000)
         self.tfidf = self.vectorizer.fit_transform(passages)
         
+        # 빌드가 끝나면 본문은 디스크 blob(mmap)으로 교체 — 검색 결과로 읽히는 패시지만 디코딩
+        self.passages = self._open_passage_store(passages)
+        
         # 쿼리 확장 초기화
         if NLTK_AVAILABLE:
             self._init_nltk()
@@ -75,53 +157,39 @@ class AdvancedRAG:
         except LookupError:
             nltk.download('wordnet', quiet=True)
     
+    def _open_passage_store(self, passages: List[str]) -> PassageStore:
+        """패시지 본문을 cache_dir/passages/<내용 해시>에 기록하고 mmap으로 엽니다."""
+        store = PassageStore.from_texts(passages)
+        digest = hashlib.sha1(np.asarray(store.blob).tobytes()).hexdigest()[:16]
+        directory = self.cache_dir / "passages"
+        opened = PassageStore.open(directory, digest)
+        if opened is not None and len(opened) == len(store):
+            return opened
+        try:
+            store.save(directory, digest)
+        except OSError as e:
+            print(f"패시지 본문 저장 실패 (메모리 사용): {e}")
+            return store
+        return PassageStore.open(directory, digest) or store
+    
     def _tokenize(self, text: str) -> List[str]:
         """텍스트 토큰화"""
-        tokens = re.findall(r'\b\w+\b', text.lower())
-        return tokens
-    
-    def _get_cache_path(self) -> Path:
-        """임베딩 캐시 파일 경로"""
-        passages_hash = hash(tuple(self.passages))
-        return self.cache_dir / f"embeddings_{self.model_name}_{passages_hash}.pkl"
+        return word_tokenize(text)
     
     def _load_or_create_embeddings(self) -> np.ndarray:
         """임베딩 로드 또는 생성"""
-        cache_path = self._get_cache_path()
-        
-        # 캐시에서 로드 시도
-        if cache_path.exists():
-            try:
-                with open(cache_path, 'rb') as f:
-                    embeddings = pickle.load(f)
-                print(f"Loaded embeddings from cache: {cache_path}")
-                return embeddings
-            except Exception as e:
-                print(f"Failed to load cache: {e}")
-        
-        # 임베딩 생성
         if self.embedding_model is None:
-            # Fallback: TF-IDF 벡터 사용
+            # Fallback: TF-IDF 벡터 사용 (코퍼스 전체로 학습하므로 패시지 단위 캐시 대상 아님)
             print("Using TF-IDF as fallback embedding")
             tfidf_matrix = TfidfVectorizer(max_features=512).fit_transform(self.passages)
-            embeddings = tfidf_matrix.toarray()
-        else:
-            print(f"Creating embeddings with {self.model_name}...")
-            embeddings = self.embedding_model.encode(
-                self.passages, 
-                show_progress_bar=True,
-                batch_size=32
-            )
-        
-        # 캐시에 저장
-        try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(embeddings, f)
-            print(f"Saved embeddings to cache: {cache_path}")
-        except Exception as e:
-            print(f"Failed to save cache: {e}")
+            return tfidf_matrix.toarray()
         
-        return embeddings
+        # 패시지 내용 해시 단위 저장소: 새로 추가/변경된 패시지만 인코딩, 나머지는 mmap으로 재사용
+        self.embedding_store = EmbeddingStore(self.cache_dir, self.model_name)
+        return self.embedding_store.get_or_encode(
+            self.passages,
+            lambda texts: self.embedding_model.encode(texts, show_progress_bar=True, batch_size=32),
+        )
     
     def _expand_query(self, query: str) -> List[str]:
         """쿼리 확장"""
@@ -167,65 +235,75 @@ class AdvancedRAG:
     
     def _dense_search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
         """Dense 검색 (임베딩 기반)"""
+        return self._dense_search_batch([query], top_k)[0]
+    
+    def _dense_search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """Dense 검색 배치: 모든 질의를 한 번에 인코딩/점수 계산"""
         if self.embedding_model is None:
             # Fallback: TF-IDF 기반 검색
-            q_vec = self.vectorizer.transform([query])
-            scores = cosine_similarity(q_vec, self.tfidf)[0]
+            q_vecs = self.vectorizer.transform(queries)
+            scores = cosine_similarity(q_vecs, self.tfidf)
         else:
-            # Sentence-BERT 임베딩 기반 검색
-            query_embedding = self.embedding_model.encode([query])
-            scores = cosine_similarity(query_embedding, self.passage_embeddings)[0]
+            # Sentence-BERT 임베딩 기반 검색 (ANN/전수 인덱스가 상위 k개까지 선택)
+            query_embeddings = self.query_cache.encode(self.embedding_model, queries)
+            return self.dense_index.search(query_embeddings, top_k)
         
-        # 상위 k개 선택
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        return [(idx, float(scores[idx])) for idx in top_indices]
+        # 질의별 상위 k개 선택
+        results = []
+        for row in scores:
+            top_indices = np.argsort(row)[::-1][:top_k]
+            results.append([(idx, float(row[idx])) for idx in top_indices])
+        return results
     
     def _sparse_search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
         """Sparse 검색 (BM25 + TF-IDF)"""
-        q_tokens = self._tokenize(query)
-        bm_scores = self.bm25.get_scores(q_tokens)
-        q_vec = self.vectorizer.transform([query])
-        tf_scores = cosine_similarity(q_vec, self.tfidf)[0]
-        
-        # BM25와 TF-IDF 결합
-        combined_scores = 0.6 * bm_scores + 0.4 * tf_scores
+        return self._sparse_search_batch([query], top_k)[0]
+    
+    def _sparse_search_batch(self, queries: List[str], top_k: int = 10) -> List[List[Tuple[int, float]]]:
+        """Sparse 검색 배치: TF-IDF는 질의 행렬 하나로 한 번에 계산"""
+        q_vecs = self.vectorizer.transform(queries)
+        tf_scores = cosine_similarity(q_vecs, self.tfidf)
         
-        # 상위 k개 선택
-        top_indices = np.argsort(combined_scores)[::-1][:top_k]
-        return [(idx, float(combined_scores[idx])) for idx in top_indices]
+        results = []
+        for query, tf_row in zip(queries, tf_scores):
+            bm_scores = self.bm25.get_scores(self._tokenize(query))
+            # BM25와 TF-IDF 결합
+            combined_scores = 0.6 * bm_scores + 0.4 * tf_row
+            
+            # 상위 k개 선택
+            top_indices = np.argsort(combined_scores)[::-1][:top_k]
+            results.append([(idx, float(combined_scores[idx])) for idx in top_indices])
+        return results
     
     def _rerank_results(self, query: str, candidates: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
         """결과 리랭킹"""
         if len(candidates) <= 1:
             return candidates
         
-        # 쿼리 확장
-        expanded_queries = self._expand_query(query)
+        # 쿼리 확장 (원본 쿼리 제외)
+        expanded_queries = [q for q in self._expand_query(query) if q != query]
         
-        # 각 후보에 대해 확장된 쿼리들과의 유사도 계산
-        reranked_scores = []
-        for idx, original_score in candidates:
-            passage = self.passages[idx]
-            
-            # 확장된 쿼리들과의 유사도 계산
-            max_similarity = original_score
-            for expanded_query in expanded_queries[1:]:  # 원본 쿼리 제외
-                if self.embedding_model:
-                    query_emb = self.embedding_model.encode([expanded_query])
-                    passage_emb = self.passage_embeddings[idx:idx+1]
-                    similarity = cosine_similarity(query_emb, passage_emb)[0][0]
-                    max_similarity = max(max_similarity, similarity)
-            
-            # 키워드 매칭 보너스
-            query_words = set(self._tokenize(query))
-            passage_words = set(self._tokenize(passage))
-            keyword_bonus = len(query_words.intersection(passage_words)) / len(query_words)
-            
-            # 최종 점수 계산
-            final_score = 0.7 * max_similarity + 0.3 * keyword_bonus
-            reranked_scores.append((idx, final_score))
+        ids = np.asarray([idx for idx, _ in candidates], dtype=np.int64)
+        max_similarity = np.asarray([score for _, score in candidates], dtype=np.float64)
+        if self.embedding_model and expanded_queries:
+            # 확장 쿼리는 한 번에 배치 인코딩(LRU 캐시)하고, 후보 임베딩과 행렬곱 한 번으로 유사도 계산
+            query_embs = self.query_cache.encode(self.embedding_model, expanded_queries)
+            passage_embs = np.asarray(self.passage_embeddings[ids])
+            similarity = cosine_similarity(passage_embs, query_embs)  # (후보 수, 확장 쿼리 수)
+            max_similarity = np.maximum(max_similarity, similarity.max(axis=1))
+        
+        # 키워드 매칭 보너스
+        query_words = set(self._tokenize(query))
+        keyword_bonus = np.zeros(len(ids))
+        if query_words:
+            query_ids = self.vocab.lookup(query_words)
+            for i, idx in enumerate(ids):
+                passage_ids = self.token_ids[self.token_offsets[idx]:self.token_offsets[idx + 1]]
+                keyword_bonus[i] = np.isin(passage_ids, query_ids).sum() / len(query_words)
         
-        # 점수순 정렬
+        # 최종 점수 계산 후 점수순 정렬
+        final_scores = 0.7 * max_similarity + 0.3 * keyword_bonus
+        reranked_scores = [(int(idx), float(score)) for idx, score in zip(ids, final_scores)]
         reranked_scores.sort(key=lambda x: x[1], reverse=True)
         return reranked_scores
     
@@ -233,44 +311,61 @@ class AdvancedRAG:
         """통합 검색"""
         if not query:
             return []
+        per_query, _ = self.search_batch([query], top_k=top_k, use_reranking=use_reranking)
+        return per_query[0]
+    
+    def search_batch(
+        self, queries: List[str], top_k: int = 5, use_reranking: bool = True
+    ) -> Tuple[List[List[Tuple[str, float]]], List[Tuple[str, float]]]:
+        """다중 질의 통합 검색: (질의별 결과, 중복 제거된 통합 상위 top_k)"""
+        if not queries:
+            return [], []
         
-        # 1. Dense 검색
-        dense_results = self._dense_search(query, top_k * 2)
-        
-        # 2. Sparse 검색
-        sparse_results = self._sparse_search(query, top_k * 2)
-        
-        # 3. 결과 결합 (Reciprocal Rank Fusion)
-        combined_scores = {}
-        for rank, (idx, score) in enumerate(dense_results):
-            rrf_score = 1.0 / (60 + rank + 1)  # Dense 검색 가중치
-            combined_scores[idx] = combined_scores.get(idx, 0) + rrf_score
-        
-        for rank, (idx, score) in enumerate(sparse_results):
-            rrf_score = 1.0 / (60 + rank + 1)  # Sparse 검색 가중치
-            combined_scores[idx] = combined_scores.get(idx, 0) + rrf_score
+        # 1. Dense 검색 (배치 인코딩)
+        dense_batch = self._dense_search_batch(queries, top_k * 2)
         
-        # 4. 상위 후보 선택
-        candidates = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:top_k * 2]
-        candidates = [(idx, score) for idx, score in candidates]
+        # 2. Sparse 검색 (배치 변환)
+        sparse_batch = self._sparse_search_batch(queries, top_k * 2)
         
-        # 5. 리랭킹 (선택적)
-        if use_reranking and len(candidates) > 1:
-            candidates = self._rerank_results(query, candidates)
+        hit_lists: List[List[Tuple[int, float]]] = []
+        for query, dense_results, sparse_results in zip(queries, dense_batch, sparse_batch):
+            if not query:
+                hit_lists.append([])
+                continue
+            
+            # 3. 결과 결합 (Reciprocal Rank Fusion)
+            combined_scores = {}
+            for rank, (idx, score) in enumerate(dense_results):
+                rrf_score = 1.0 / (60 + rank + 1)  # Dense 검색 가중치
+                combined_scores[idx] = combined_scores.get(idx, 0) + rrf_score
+            
+            for rank, (idx, score) in enumerate(sparse_results):
+                rrf_score = 1.0 / (60 + rank + 1)  # Sparse 검색 가중치
+                combined_scores[idx] = combined_scores.get(idx, 0) + rrf_score
+            
+            # 4. 상위 후보 선택
+            candidates = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:top_k * 2]
+            candidates = [(idx, score) for idx, score in candidates]
+            
+            # 5. 리랭킹 (선택적)
+            if use_reranking and len(candidates) > 1:
+                candidates = self._rerank_results(query, candidates)
+            
+            hit_lists.append(candidates[:top_k])
         
         # 6. 최종 결과 반환
-        final_results = []
-        for idx, score in candidates[:top_k]:
-            final_results.append((self.passages[idx], score))
-        
-        return final_results
+        per_query = [[(self.passages[idx], score) for idx, score in hits] for hits in hit_lists]
+        merged = [(self.passages[idx], score) for idx, score in merge_hit_lists(hit_lists, top_k)]
+        return per_query, merged
     
     def get_search_stats(self) -> Dict:
         """검색 통계 정보"""
         return {
             "total_passages": len(self.passages),
             "embedding_model": self.model_name if self.embedding_model else "TF-IDF Fallback",
-            "cache_available": self._get_cache_path().exists(),
+            "cache_available": self.embedding_store is not None and len(self.embedding_store) > 0,
+            "dense_index": self.dense_index.name if self.dense_index is not None else "tfidf",
+            "query_cache": self.query_cache.stats(),
             "nltk_available": NLTK_AVAILABLE,
             "sentence_transformers_available": SENTENCE_TRANSFORMERS_AVAILABLE
         }
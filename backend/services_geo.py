@@ -1,8 +1,16 @@
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 import os
+import threading
 import requests
 from requests import Timeout, RequestException
 
+try:
+    from .geo_mirrors import MirrorPool
+    from .geo_poi_store import AddressWorker, BBox, POIGroup, build_address_from_tags, get_poi_store, nearby_poi_groups
+except ImportError:
+    from geo_mirrors import MirrorPool
+    from geo_poi_store import AddressWorker, BBox, POIGroup, build_address_from_tags, get_poi_store, nearby_poi_groups
+
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 OVERPASS_URLS = [
@@ -11,6 +19,8 @@ OVERPASS_URLS = [
     "https://overpass.kumi.systems/api/interpreter",
 ]
 REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+# 미러별 지연/오류율을 공유하는 프로세스 전역 헤징 클라이언트
+OVERPASS_MIRRORS = MirrorPool(OVERPASS_URLS)
 
 
 def _headers() -> Dict[str, str]:
@@ -66,113 +76,74 @@ def reverse_geocode(lat: float, lon: float) -> str:
         return ""
 
 
-def build_address_from_tags(tags: Dict[str, str]) -> str:
-    parts: List[str] = []
-    # Common OSM address tags in Japan
-    for key in [
-        "addr:prefecture",
-        "addr:city",
-        "addr:ward",
-        "addr:district",
-        "addr:suburb",
-        "addr:neighbourhood",
-        "addr:street",
-        "addr:block",
-        "addr:housenumber",
-        "addr:postcode",
-    ]:
-        val = tags.get(key)
-        if val:
-            parts.append(val)
-    if not parts:
-        # fallback single fields
-        for key in ["addr:full", "addr:place", "addr:hamlet"]:
-            val = tags.get(key)
-            if val:
-                parts.append(val)
-                break
-    return " ".join(parts)
-
+def fetch_overpass_pois(bbox: BBox, categories: Sequence[str]) -> Optional[List[Dict]]:
+    """bbox 안의 categories(amenity) POI를 Overpass에서 받아옵니다. 모든 미러 실패/시간 초과 시 None.
 
-def search_hospitals(lat: float, lon: float, radius_m: int = 2000) -> List[Dict]:
+    가장 건강한 미러부터 요청하고 p50 지연이 지나도 응답이 없으면 다음 미러에도 겹쳐 보냅니다.
+    """
+    south, west, north, east = bbox
+    timeout = int(os.getenv("POI_TIMEOUT_SEC", "7"))
     query = f"""
-    [out:json][timeout:6];
-    (
-      node["amenity"~"hospital|clinic"](around:{radius_m},{lat},{lon});
-      way["amenity"~"hospital|clinic"](around:{radius_m},{lat},{lon});
-      relation["amenity"~"hospital|clinic"](around:{radius_m},{lat},{lon});
-    );
-    out center 20;
+    [out:json][timeout:{timeout}];
+    nwr["amenity"~"^({'|'.join(categories)})$"]({south:.6f},{west:.6f},{north:.6f},{east:.6f});
+    out center;
     """
-    r = None
-    for endpoint in OVERPASS_URLS:
-        try:
-            r = requests.post(endpoint, data={"data": query}, timeout=7)
-            if r.ok:
-                break
-        except (Timeout, RequestException):
-            r = None
-            continue
-    if r is None:
-        return []
-    results: List[Dict] = []
-    if r.ok:
+
+    def send(endpoint: str) -> List[Dict]:
+        r = requests.post(endpoint, data={"data": query}, headers=_headers(), timeout=timeout)
+        r.raise_for_status()  # 429/504 등 과부하 응답도 미러 실패로 기록
         data = r.json()
-        for el in data.get("elements", [])[:20]:
-            tags = el.get("tags", {})
-            name = tags.get("name") or tags.get("name:en") or tags.get("name:ja") or "Unknown"
-            lat_out = el.get("lat") or (el.get("center") or {}).get("lat")
-            lon_out = el.get("lon") or (el.get("center") or {}).get("lon")
-            addr = build_address_from_tags(tags)
-            if (not addr) and lat_out and lon_out:
-                addr = reverse_geocode(lat_out, lon_out)
-            results.append({
-                "name": name,
-                "address": addr,
-                "lat": lat_out,
-                "lon": lon_out,
-            })
-    return results
+        if data.get("remark"):
+            # 시간 초과/메모리 초과는 200 + remark("runtime error: ...")와 빈/부분 elements로 옴
+            raise ValueError(f"Overpass remark: {data['remark']}")
+        return data.get("elements", [])
 
+    return OVERPASS_MIRRORS.request(send, timeout=timeout)
 
-def search_pharmacies(lat: float, lon: float, radius_m: int = 1500) -> List[Dict]:
-    query = f"""
-    [out:json][timeout:7];
-    (
-      node["amenity"="pharmacy"](around:{radius_m},{lat},{lon});
-      way["amenity"="pharmacy"](around:{radius_m},{lat},{lon});
-      relation["amenity"="pharmacy"](around:{radius_m},{lat},{lon});
-    );
-    out center 30;
-    """
-    r = None
-    for endpoint in OVERPASS_URLS:
-        try:
-            r = requests.post(endpoint, data={"data": query}, timeout=7)
-            if r.ok:
-                break
-        except (Timeout, RequestException):
-            r = None
-            continue
-    if r is None:
-        return []
-    results: List[Dict] = []
-    if r.ok:
-        data = r.json()
-        for el in data.get("elements", [])[:30]:
-            tags = el.get("tags", {})
-            name = tags.get("name") or tags.get("name:en") or tags.get("name:ja") or "Unknown"
-            lat_out = el.get("lat") or (el.get("center") or {}).get("lat")
-            lon_out = el.get("lon") or (el.get("center") or {}).get("lon")
-            addr = build_address_from_tags(tags)
-            if (not addr) and lat_out and lon_out:
-                addr = reverse_geocode(lat_out, lon_out)
-            results.append({
-                "name": name,
-                "address": addr,
-                "lat": lat_out,
-                "lon": lon_out,
-            })
+
+_ADDRESS_WORKER: Optional[AddressWorker] = None
+_ADDRESS_WORKER_LOCK = threading.Lock()
+
+
+def get_address_worker() -> AddressWorker:
+    """프로세스 전역 역지오코딩 워커 (POI 저장소의 주소 캐시를 채움)"""
+    global _ADDRESS_WORKER
+    with _ADDRESS_WORKER_LOCK:
+        if _ADDRESS_WORKER is None:
+            _ADDRESS_WORKER = AddressWorker(get_poi_store(), reverse_geocode)
+        return _ADDRESS_WORKER
+
+
+def _search_groups(lat: float, lon: float, groups: Dict[str, POIGroup]) -> Dict[str, List[Dict]]:
+    # 로컬 POI 인덱스에서 최근접 조회 (해당 영역이 없거나 오래됐을 때만 Overpass로, 모든 그룹을 한 질의로 갱신)
+    results = nearby_poi_groups(get_poi_store(), lat, lon, groups, fetch_overpass_pois)
+    # 주소 태그가 없으면 캐시된 주소만 채우고, 나머지는 백그라운드에서 역지오코딩 (좌표는 그대로 반환)
+    get_address_worker().fill([item for items in results.values() for item in items])
     return results
 
 
+def _hospital_group(radius_m: int) -> POIGroup:
+    return ("hospital", "clinic"), radius_m, 20
+
+
+def _pharmacy_group(radius_m: int) -> POIGroup:
+    return ("pharmacy",), radius_m, 30
+
+
+def search_nearby(
+    lat: float, lon: float, hospital_radius_m: int = 2000, pharmacy_radius_m: int = 1500
+) -> Tuple[List[Dict], List[Dict]]:
+    """(병원/의원, 약국)을 함께 조회합니다. 갱신이 필요해도 Overpass 왕복은 한 번."""
+    results = _search_groups(lat, lon, {
+        "hospitals": _hospital_group(hospital_radius_m),
+        "pharmacies": _pharmacy_group(pharmacy_radius_m),
+    })
+    return results["hospitals"], results["pharmacies"]
+
+
+def search_hospitals(lat: float, lon: float, radius_m: int = 2000) -> List[Dict]:
+    return _search_groups(lat, lon, {"hospitals": _hospital_group(radius_m)})["hospitals"]
+
+
+def search_pharmacies(lat: float, lon: float, radius_m: int = 1500) -> List[Dict]:
+    return _search_groups(lat, lon, {"pharmacies": _pharmacy_group(radius_m)})["pharmacies"]
@@ -1,15 +1,25 @@
 """
 PDF 파일 처리 및 텍스트 추출 모듈
+- 파일마다 PDF를 한 번만 열고, 성공한 추출기(PyMuPDF → pdfplumber → PyPDF2)를 함께 기록
+- 추출 결과는 파일 내용 해시 단위로 캐시 (RAG_PDF_CACHE_DIR) — 재부팅은 캐시 읽기만
+- 캐시에 없는 파일은 프로세스 풀에서 병렬 추출 (RAG_PDF_WORKERS)
+- 페이지 단위 스트리밍 → 문장 단위 청커(rag_chunker) → 패시지: 메모리는 PDF 크기와 무관하게 일정
+- PDF 라이브러리(PyMuPDF/pdfplumber/PyPDF2)는 추출기 안에서 임포트 — 없는 라이브러리는 그 추출기만 실패
 """
 
+import hashlib
+import json
 import os
 import pathlib
-from typing import List, Optional, Dict
-import PyPDF2
-import pdfplumber
-import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Dict, Tuple
 from pathlib import Path
 
+try:
+    from .rag_chunker import CHUNKER_VERSION, chunk_pages
+except ImportError:
+    from rag_chunker import CHUNKER_VERSION, chunk_pages
+
 
 class PDFProcessor:
     """PDF 파일에서 텍스트를 추출하는 클래스"""
@@ -17,66 +27,90 @@ class PDFProcessor:
     def __init__(self):
         self.supported_formats = ['.pdf']
     
-    def extract_text_pymupdf(self, pdf_path: str) -> str:
-        """PyMuPDF를 사용한 텍스트 추출 (가장 빠름)"""
+    def iter_pages_pymupdf(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """PyMuPDF로 (페이지 번호, 텍스트)를 한 페이지씩 생성 (가장 빠름)"""
         try:
+            import fitz  # PyMuPDF
+
             # URL인지 로컬 파일인지 확인
             if pdf_path.startswith(('http://', 'https://')):
                 doc = fitz.open(stream=pdf_path, filetype="pdf")
             else:
                 doc = fitz.open(pdf_path)
-            
-            text = ""
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += page.get_text() + "\n"
-            doc.close()
-            return text.strip()
+            try:
+                for page_num in range(doc.page_count):
+                    yield page_num + 1, doc[page_num].get_text()
+            finally:
+                doc.close()
         except Exception as e:
             print(f"PyMuPDF로 텍스트 추출 실패: {e}")
-            return ""
     
-    def extract_text_pypdf2(self, pdf_path: str) -> str:
-        """PyPDF2를 사용한 텍스트 추출"""
+    def iter_pages_pypdf2(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """PyPDF2로 (페이지 번호, 텍스트)를 한 페이지씩 생성"""
         try:
+            import PyPDF2
+
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
+                for page_num, page in enumerate(pdf_reader.pages, 1):
+                    yield page_num, page.extract_text() or ""
         except Exception as e:
             print(f"PyPDF2로 텍스트 추출 실패: {e}")
-            return ""
     
-    def extract_text_pdfplumber(self, pdf_path: str) -> str:
-        """pdfplumber를 사용한 텍스트 추출 (더 정확함)"""
+    def iter_pages_pdfplumber(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """pdfplumber로 (페이지 번호, 텍스트)를 한 페이지씩 생성 (더 정확함)"""
         try:
-            text = ""
+            import pdfplumber
+
             with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text.strip()
+                for page_num, page in enumerate(pdf.pages, 1):
+                    yield page_num, page.extract_text() or ""
         except Exception as e:
             print(f"pdfplumber로 텍스트 추출 실패: {e}")
-            return ""
+    
+    def extract_text_pymupdf(self, pdf_path: str) -> str:
+        """PyMuPDF를 사용한 텍스트 추출 (가장 빠름)"""
+        return "\n".join(text for _, text in self.iter_pages_pymupdf(pdf_path)).strip()
+    
+    def extract_text_pypdf2(self, pdf_path: str) -> str:
+        """PyPDF2를 사용한 텍스트 추출"""
+        return "\n".join(text for _, text in self.iter_pages_pypdf2(pdf_path)).strip()
+    
+    def extract_text_pdfplumber(self, pdf_path: str) -> str:
+        """pdfplumber를 사용한 텍스트 추출 (더 정확함)"""
+        return "\n".join(text for _, text in self.iter_pages_pdfplumber(pdf_path) if text).strip()
+    
+    def page_extractors(self) -> List[Tuple[str, Callable[[str], Iterator[Tuple[int, str]]], int]]:
+        """(추출 방법, 페이지 생성기, 최소 글자 수) — 앞의 추출기 결과가 부족할 때만 다음으로 넘어감"""
+        return [
+            ("PyMuPDF (빠름)", self.iter_pages_pymupdf, 10),
+            ("pdfplumber (정확함)", self.iter_pages_pdfplumber, 10),
+            ("PyPDF2 (fallback)", self.iter_pages_pypdf2, 1),
+        ]
     
     def extract_text(self, pdf_path: str) -> str:
         """PDF에서 텍스트 추출 (PyMuPDF 우선, fallback 지원)"""
-        # PyMuPDF 시도 (가장 빠름)
-        text = self.extract_text_pymupdf(pdf_path)
-        
-        # PyMuPDF가 실패하면 pdfplumber 시도
-        if not text or len(text.strip()) < 10:
-            text = self.extract_text_pdfplumber(pdf_path)
-        
-        # pdfplumber도 실패하면 PyPDF2 시도
-        if not text or len(text.strip()) < 10:
-            text = self.extract_text_pypdf2(pdf_path)
+        return self.extract(pdf_path)[0]
+    
+    def extract(self, pdf_path: str) -> Tuple[str, str, int]:
+        """PDF에서 (텍스트, 추출 방법, 페이지 수)를 한 번에 추출
         
-        return text
+        추출기마다 문서를 한 번만 열고, 텍스트가 부족할 때만 다음 추출기로 넘어갑니다.
+        페이지 목록을 따로 만들지 않고 생성기에서 바로 이어 붙입니다.
+        """
+        for method, iter_pages, min_chars in self.page_extractors():
+            pages = 0
+
+            def texts(iter_pages=iter_pages) -> Iterator[str]:
+                nonlocal pages
+                for _, page_text in iter_pages(pdf_path):
+                    pages += 1
+                    yield page_text
+
+            text = "\n".join(texts()).strip()
+            if len(text) >= min_chars:
+                return text, method, pages
+        return "", "실패", 0
     
     def process_pdf_file(self, pdf_path: str) -> Dict[str, str]:
         """PDF 파일을 처리하고 메타데이터와 함께 반환"""
@@ -88,8 +122,8 @@ class PDFProcessor:
             if file_path.suffix.lower() != '.pdf':
                 return {"error": "PDF 파일이 아닙니다."}
             
-            # 텍스트 추출
-            text = self.extract_text(str(file_path))
+            # 텍스트 추출 (문서는 한 번만 열고 페이지 수/추출 방법을 함께 기록)
+            text, method, pages = self.extract(str(file_path))
             
             if not text:
                 return {"error": "텍스트를 추출할 수 없습니다."}
@@ -99,8 +133,8 @@ class PDFProcessor:
                 "filename": file_path.name,
                 "size": file_path.stat().st_size,
                 "text": text,
-                "pages": self._count_pages(str(file_path)),
-                "extraction_method": self._get_extraction_method(text, pdf_path)
+                "pages": pages,
+                "extraction_method": method
             }
             
             return file_info
@@ -108,108 +142,174 @@ class PDFProcessor:
         except Exception as e:
             return {"error": f"PDF 처리 중 오류 발생: {str(e)}"}
     
-    def _count_pages(self, pdf_path: str) -> int:
-        """PDF 페이지 수 계산 (PyMuPDF 사용)"""
-        try:
-            doc = fitz.open(pdf_path)
-            page_count = doc.page_count
-            doc.close()
-            return page_count
-        except:
-            return 0
-    
-    def _get_extraction_method(self, text: str, pdf_path: str) -> str:
-        """사용된 추출 방법 확인"""
-        if not text:
-            return "실패"
-        
-        # PyMuPDF로 시도해보고 성공하면 PyMuPDF
-        try:
-            pymupdf_text = self.extract_text_pymupdf(pdf_path)
-            if pymupdf_text and len(pymupdf_text.strip()) > 10:
-                return "PyMuPDF (빠름)"
-        except:
-            pass
-        
-        # pdfplumber로 시도해보고 성공하면 pdfplumber
-        try:
-            pdfplumber_text = self.extract_text_pdfplumber(pdf_path)
-            if pdfplumber_text and len(pdfplumber_text.strip()) > 10:
-                return "pdfplumber (정확함)"
-        except:
-            pass
-        
-        return "PyPDF2 (fallback)"
-    
     def batch_process_pdfs(self, directory: str) -> List[Dict[str, str]]:
         """디렉토리의 모든 PDF 파일을 일괄 처리"""
-        results = []
-        pdf_dir = Path(directory)
-        
-        if not pdf_dir.exists():
-            return results
-        
-        for pdf_file in pdf_dir.glob("*.pdf"):
-            result = self.process_pdf_file(str(pdf_file))
-            if "error" not in result:
-                results.append(result)
-        
-        return results
+        return [r for r in extract_pdf_directory(directory) if "error" not in r]
 
 
-def load_pdf_passages(directory: str = "data/rag_data") -> List[str]:
-    """PDF 파일들에서 텍스트를 추출하여 passages 리스트로 반환"""
+# 추출 로직/캐시 형식이 바뀌면 올려서 기존 캐시를 무효화 (청커 규칙 버전도 머리글에 함께 기록)
+# v2: 머리글(<sha1>.json) + 페이지별 JSON Lines(<sha1>.pages.jsonl)
+PDF_CACHE_VERSION = 2
+
+
+def _pdf_cache_dir() -> Path:
+    default = Path(__file__).resolve().parents[1] / "data" / "cache" / "pdf_text"
+    return Path(os.getenv("RAG_PDF_CACHE_DIR", str(default)))
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_cached_header(cache_dir: Path, digest: str) -> Optional[Dict]:
+    try:
+        with open(cache_dir / f"{digest}.json", "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != PDF_CACHE_VERSION or cached.get("chunker") != CHUNKER_VERSION:
+        return None
+    if not (cache_dir / f"{digest}.pages.jsonl").exists():
+        return None
+    return cached
+
+
+def _iter_cached_pages(cache_dir: Path, digest: str) -> Iterator[Tuple[int, str]]:
+    """캐시된 페이지를 한 줄(한 페이지)씩 읽어 생성"""
+    with open(cache_dir / f"{digest}.pages.jsonl", "r", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            yield row["page"], row["text"]
+
+
+def _extract_pdf_worker(pdf_path: str, cache_dir: str, digest: str) -> Dict[str, str]:
+    """프로세스 풀 작업 단위: 페이지를 추출하는 즉시 캐시 파일에 기록하고 머리글만 반환
+    
+    본문은 프로세스 간에 전달하지 않고, 한 번에 한 페이지만 메모리에 둡니다.
+    """
     processor = PDFProcessor()
-    pdf_dir = Path(directory)
+    file_path = Path(pdf_path)
+    directory = Path(cache_dir)
+    tmp = directory / f".{digest}.{os.getpid()}.pages.jsonl"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        for method, iter_pages, min_chars in processor.page_extractors():
+            chars = pages = 0
+            with open(tmp, "w", encoding="utf-8") as f:
+                for page_num, text in iter_pages(pdf_path):
+                    f.write(json.dumps({"page": page_num, "text": text}, ensure_ascii=False) + "\n")
+                    chars += len(text.strip())
+                    pages += 1
+            if chars >= min_chars:
+                break
+        else:
+            return {"error": "텍스트를 추출할 수 없습니다.", "filename": file_path.name}
+        os.replace(tmp, directory / f"{digest}.pages.jsonl")
+        header = {
+            "version": PDF_CACHE_VERSION,
+            "chunker": CHUNKER_VERSION,
+            "filename": file_path.name,
+            "size": file_path.stat().st_size,
+            "pages": pages,
+            "extraction_method": method,
+        }
+        header_tmp = directory / f".{digest}.{os.getpid()}.json"
+        with open(header_tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False)
+        os.replace(header_tmp, directory / f"{digest}.json")
+        return header
+    except Exception as e:
+        return {"error": f"PDF 처리 중 오류 발생: {str(e)}", "filename": file_path.name}
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def iter_pdf_documents(
+    directory: str, workers: Optional[int] = None
+) -> Iterator[Tuple[Dict[str, str], Iterator[Tuple[int, str]]]]:
+    """디렉토리의 PDF를 파일명 순으로 (머리글, 페이지 생성기)로 생성 (내용 해시 캐시 + 프로세스 풀)
     
+    캐시에 없는 파일만 RAG_PDF_WORKERS(기본: CPU 수)개 프로세스로 추출해 캐시에 기록하고,
+    페이지는 캐시 파일에서 한 줄씩 읽습니다. 실패한 파일은 경고만 남기고 건너뜁니다.
+    """
+    pdf_dir = Path(directory)
     if not pdf_dir.exists():
-        return []
-    
-    passages = []
+        return
     
-    # PDF 파일들 처리
-    for pdf_file in pdf_dir.glob("*.pdf"):
+    cache_dir = _pdf_cache_dir()
+    files = sorted(pdf_dir.glob("*.pdf"))
+    entries: List[Tuple[Path, str, Optional[Dict]]] = []
+    missing = []
+    for pdf_file in files:
         try:
-            result = processor.process_pdf_file(str(pdf_file))
-            if "error" not in result and result.get("text"):
-                # 텍스트를 청크로 나누기 (너무 긴 텍스트는 여러 개로 분할)
-                text = result["text"]
-                chunks = _split_text_into_chunks(text, max_chunk_size=1000)
-                
-                for i, chunk in enumerate(chunks):
-                    if chunk.strip():
-                        # 청크에 메타데이터 추가
-                        chunk_with_meta = f"[PDF: {result['filename']}, 페이지: {i+1}/{len(chunks)}]\n{chunk}"
-                        passages.append(chunk_with_meta)
-                        
-        except Exception as e:
-            print(f"PDF 파일 처리 실패 {pdf_file}: {e}")
+            digest = _file_sha1(pdf_file)
+        except OSError as e:
+            print(f"PDF 파일 읽기 실패 {pdf_file}: {e}")
             continue
+        header = _read_cached_header(cache_dir, digest)
+        if header is None:
+            missing.append(len(entries))
+        entries.append((pdf_file, digest, header))
     
-    return passages
+    def extracted_headers() -> Iterator[Dict[str, str]]:
+        """캐시 미스 파일의 머리글을 파일 순서대로, 끝나는 대로 하나씩 (전체 완료를 기다리지 않음)"""
+        nonlocal workers
+        if not missing:
+            return
+        if workers is None:
+            workers = int(os.getenv("RAG_PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+        workers = max(1, min(workers, len(missing)))
+        args = [(str(entries[i][0]), str(cache_dir), entries[i][1]) for i in missing]
+        print(f"PDF 텍스트 추출: {len(missing)}/{len(files)}개 파일 (캐시 미스, 프로세스 {workers}개)")
+        if workers == 1:
+            for a in args:
+                yield _extract_pdf_worker(*a)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_extract_pdf_worker, *zip(*args))
 
+    extracted = extracted_headers()
+    try:
+        for pdf_file, digest, header in entries:
+            if header is None:
+                header = next(extracted)
+            if "error" in header:
+                print(f"PDF 파일 처리 실패 {pdf_file}: {header['error']}")
+                continue
+            # 같은 내용의 파일이 이름만 바뀐 경우에도 현재 파일명을 사용
+            yield {**header, "filename": pdf_file.name}, _iter_cached_pages(cache_dir, digest)
+    finally:
+        extracted.close()
 
-def _split_text_into_chunks(text: str, max_chunk_size: int = 1000) -> List[str]:
-    """긴 텍스트를 적절한 크기의 청크로 분할"""
-    if len(text) <= max_chunk_size:
-        return [text]
-    
-    chunks = []
-    sentences = text.split('. ')
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk + sentence) <= max_chunk_size:
-            current_chunk += sentence + ". "
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + ". "
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+
+def extract_pdf_directory(directory: str, workers: Optional[int] = None) -> List[Dict[str, str]]:
+    """디렉토리의 PDF를 파일명 순으로 추출해 process_pdf_file과 같은 형식으로 반환"""
+    results = []
+    for header, pages in iter_pdf_documents(directory, workers):
+        text = "\n".join(t for _, t in pages).strip()
+        results.append({**header, "text": text})
+    return results
+
+
+def iter_pdf_passages(
+    directory: str = "data/rag_data", max_chunk_size: int = 1000, overlap: int = 150
+) -> Iterator[str]:
+    """PDF 페이지를 스트리밍으로 문장 단위 청크에 넣어 패시지를 하나씩 생성
     
-    return chunks
+    머리글: [PDF: 파일명, 페이지: 시작[-끝]/전체 페이지, 청크: 번호] (인용 시 페이지 표기에 사용)
+    """
+    for header, pages in iter_pdf_documents(directory):
+        for i, chunk in enumerate(chunk_pages(pages, max_chars=max_chunk_size, overlap=overlap), 1):
+            yield f"[PDF: {header['filename']}, 페이지: {chunk.page_label}/{header['pages']}, 청크: {i}]\n{chunk.text}"
+
+
+def load_pdf_passages(directory: str = "data/rag_data") -> List[str]:
+    """PDF 파일들에서 텍스트를 추출하여 passages 리스트로 반환"""
+    return list(iter_pdf_passages(directory))
 
 
 def load_pdf_from_url(url: str) -> Dict[str, str]:
@@ -222,12 +322,11 @@ def load_pdf_from_url(url: str) -> Dict[str, str]:
         response.raise_for_status()
         
         # PDF 문서 열기
+        import fitz  # PyMuPDF
+
         doc = fitz.open(stream=response.content, filetype="pdf")
         page_count = doc.page_count  # 문서 닫기 전에 페이지 수 저장
-        text = ""
-        for page_num in range(page_count):
-            page = doc[page_num]
-            text += page.get_text() + "\n"
+        text = "\n".join(doc[page_num].get_text() for page_num in range(page_count))
         doc.close()
         
         if not text.strip():
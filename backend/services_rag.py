@@ -1,214 +1,336 @@
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
+import hashlib
 import pathlib
-import re
 import os
-from rank_bm25 import BM25Okapi
+import copy
+import numpy as np
+from scipy.sparse import csr_matrix, vstack as sparse_vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from functools import lru_cache
+
+try:
+    from .rag_bm25 import PostingsBM25
+    from .rag_chunker import CHUNKER_VERSION
+    from .rag_dedup import NearDuplicateIndex, dedupe_passages
+    from .rag_passages import PassageMetadata, PassageStore
+    from .rag_query_expansion import get_default_expander
+    from .rag_registry import RAG_REGISTRY
+    from .rag_shards import configured_shards, csr_row_view, get_shard_pool, shard_bounds
+    from .rag_snapshot import fingerprint_sources, read_snapshot, write_snapshot
+    from .rag_tokenizer import get_analyzer
+    from .rag_topk import kway_merge_hits, merge_hit_lists, top_k_indices
+except ImportError:
+    # backend 디렉토리를 sys.path에 추가해 단독 모듈로 임포트한 경우
+    from rag_bm25 import PostingsBM25
+    from rag_chunker import CHUNKER_VERSION
+    from rag_dedup import NearDuplicateIndex, dedupe_passages
+    from rag_passages import PassageMetadata, PassageStore
+    from rag_query_expansion import get_default_expander
+    from rag_registry import RAG_REGISTRY
+    from rag_shards import configured_shards, csr_row_view, get_shard_pool, shard_bounds
+    from rag_snapshot import fingerprint_sources, read_snapshot, write_snapshot
+    from rag_tokenizer import get_analyzer
+    from rag_topk import kway_merge_hits, merge_hit_lists, top_k_indices
 
 
 class HybridRAG:
-    def __init__(self, passages: List[str]):
-        self.passages = passages
-        self.tokenized = [self._tokenize(p) for p in passages]
-        self.bm25 = BM25Okapi(self.tokenized)
+    def __init__(self, passages: List[str], analyzer: Optional[str] = None, sources: Optional[Sequence[str]] = None):
+        # 본문은 UTF-8 blob + 오프셋으로 보관하고 검색 결과로 읽히는 패시지만 디코딩
+        self.passages = PassageStore.from_texts(passages)
+        # 패시지 메타데이터(출처/제목/청크/권위 가중치/바이트 오프셋) 열 저장소
+        # 출처 가중치는 질의와 무관하므로 빌드 시 한 번만 계산해 여기에 보관
+        self.metadata = PassageMetadata.from_passages(passages, sources)
+        # BM25 분석기 (RAG_BM25_ANALYZER) — 포스팅과 질의 토큰화가 같은 분석기를 써야 함
+        self.analyzer, self._analyze = get_analyzer(analyzer)
+        # rank_bm25.BM25Okapi와 동일한 점수, 매칭 문서만 갱신하는 역색인 구현
+        # 패시지 토큰은 빌드 시 한 번만 만들어 포스팅(term id 배열)으로 보관하고 목록은 버림
+        self.bm25 = PostingsBM25.from_tokenized([self._tokenize(p) for p in passages])
         # CJK(한/일) 교차언어 매칭 강화를 위해 문자 n-gram TF-IDF 사용
         max_feats = int(os.getenv("RAG_TFIDF_MAX_FEATURES", "10000"))
         self.vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(2, 5), max_features=max_feats)
         self.tfidf = self.vectorizer.fit_transform(passages)
-        
-        # 한국어-일본어 의료 용어 매핑
-        self.korean_japanese_mapping = {
-            # 증상 일반
-            '벌레 물림': ['虫刺され', '虫に刺された', '虫刺症'],
-            '말벌 쏘임': ['蜂に刺された', '蜂刺症', 'ハチ刺し'],
-            '모기 물림': ['蚊に刺された', '蚊刺症', '蚊刺され'],
-            '발열': ['発熱', '熱', '体温上昇'],
-            '어지러움': ['めまい', '眩暈', '立ちくらみ'],
-            '두통': ['頭痛', '頭が痛い'],
-            '복통': ['腹痛', 'お腹が痛い', '腹部痛'],
-            '구토': ['嘔吐', '吐く', '吐き気'],
-            '설사': ['下痢', '下痢症'],
-            '변비': ['便秘'],
-            '코피': ['鼻血', '鼻出血'],
-            '손목': ['手首', '手関節'],
-            '발진': ['発疹', '皮疹', '湿疹'],
-            '가려움': ['かゆみ', '掻痒', '痒み'],
-            '붓기': ['腫れ', '浮腫'],
-            '마비': ['麻痺', 'しびれ', '感覚麻痺'],
-            '목 아픔': ['首の痛み', '頸部痛', '首痛'],
-            '목이 아파요': ['喉の痛み', '咽頭痛', 'のどの痛み'],
-            '가슴 답답': ['胸苦しい', '胸の圧迫感', '胸部不快感'],
-            '호흡곤란': ['呼吸困難', '息切れ', '呼吸が苦しい'],
-            '알레르기': ['アレルギー', '過敏症'],
-            '응급처치': ['応急処置', '救急処置', '応急手当'],
-            '눈이 부어': ['目の腫れ', '眼瞼浮腫', '眼の腫脹'],
-            '눈 부어': ['目の腫れ', '眼瞼浮腫', '眼の腫脹'],
-            '눈이 가려워요': ['目のかゆみ', '眼のかゆみ', 'アレルギー性結膜炎'],
-            '목소리': ['声', '音声', '発声'],
-            '목소리가 나오지': ['声が出ない', '失声', '音声障害'],
-            '손발이 차가워': ['手足が冷たい', '四肢冷感', '末梢循環不全'],
-            '손발 차가워': ['手足が冷たい', '四肢冷感', '末梢循環不全'],
-            '배가 아프고': ['お腹が痛くて', '腹痛と', '腹部痛と'],
-            '머리가 아프고': ['頭が痛くて', '頭痛と', '頭部痛と'],
-            '가슴이 두근거리고': ['胸がドキドキして', '動悸と', '心拍数増加と'],
-            '숨이 차요': ['息切れ', '呼吸困難', '呼吸が苦しい'],
-            '숨이 차': ['息切れ', '呼吸困難', '呼吸が苦しい'],
-            '열': ['熱', '発熱', '体温上昇'],
-            '기침': ['咳', '咳嗽'],
-            '코막힘': ['鼻づまり', '鼻閉'],
-            '인후통': ['喉の痛み', '咽頭痛'],
-            '치통': ['歯痛', '歯の痛み'],
-            '상처': ['傷', '外傷', '切り傷'],
-            '출혈': ['出血', '流血'],
-            '탈수': ['脱水', '脱水症状'],
-            '경련': ['痙攣', 'けいれん'],
-            '의식 잃음': ['意識喪失', '失神'],
-            '호흡 정지': ['呼吸停止', '無呼吸'],
-            '심정지': ['心停止', '心臓停止'],
-
-            # 약/OTC 관련 (쿼리 확장)
-            '해열제': ['解熱剤', '解熱薬', '熱さまし'],
-            '진통제': ['鎮痛剤', '鎮痛薬'],
-            '해열진통제': ['解熱鎮痛剤', '総合感冒薬'],
-            '소화제': ['消化薬', '健胃消化薬', '制酸薬', '胃薬'],
-            '기침약': ['鎮咳薬', '去痰薬', '咳止め'],
-            '콧물약': ['鼻炎用内服薬', '鼻みず', '抗ヒスタミン'],
-            '스테로이드 연고': ['ステロイド外用', '外用ステロイド'],
-            '항히스타민': ['抗ヒスタミン', 'アレルギー用薬'],
-
-            # 성분/제품명 (일부 대표 매핑)
-            '아세트아미노펜': ['アセトアミノフェン', 'タイレノール'],
-            '이부프로펜': ['イブプロフェン'],
-            '로키소닌': ['ロキソニン', 'ロキソプロフェン'],
-            '코데인': ['コデイン'],
-            '히드로코르티손': ['ヒドロコルチゾン'],
-            '로페라마이드': ['ロペラミド'],
-            '세티리진': ['セチリジン'],
-            '페키소페나딘': ['フェキソフェナジン']
-        }
+        # 삭제된 패시지(톰스톤)와 마지막 재학습 이후 누적된 증분 변경 수
+        self.deleted = np.zeros(len(passages), dtype=bool)
+        self.n_deleted = 0
+        self.pending_delta = 0
+        self._init_query_expansion()
+
+    def _init_query_expansion(self) -> None:
+        # 한국어-일본어 의료 용어 매핑 (data/query_expansion.json, Aho-Corasick으로 컴파일된 공유 확장기)
+        self.query_expander = get_default_expander()
+
+    @property
+    def source_weights(self) -> np.ndarray:
+        return self.metadata.authority
 
-        # 복합 증상 문구 전용 확장 (문장 전체에 포함될 때 강제 주입)
-        self.composite_query_boosts = {
-            '어지러움과 구토': ['めまい', '嘔吐', '吐き気'],
-            '가슴이 답답하고 숨이 차': ['胸苦しい', '呼吸困難', '息切れ'],
-            '관절이 부어오르고 통증': ['関節', '腫れ', '痛み']
+    def passage_text(self, i: int) -> str:
+        return self.passages[i]
+
+    def apply_delta(
+        self, added: List[str], deleted: Sequence[int] = (), sources: Optional[Sequence[str]] = None
+    ) -> "HybridRAG":
+        """패시지 추가/삭제를 반영한 새 인덱스를 반환합니다 (기존 인덱스는 변경하지 않음).
+
+        - 추가: 기존 어휘/IDF로 TF-IDF 행만 변환해 붙이고, BM25 포스팅 끝에 이어 붙임
+        - 삭제: 톰스톤으로 검색에서 제외 (문서 빈도/어휘는 compact() 때 정리)
+        검색 중인 요청은 이전 객체를 계속 사용하므로 교체 시점에 잠금이 필요 없습니다.
+        """
+        added = list(added)
+        new = copy.copy(self)
+        n_old = len(self.passages)
+        tokens = [self._tokenize(p) for p in added]
+        new.passages = self.passages.append(added)
+        new.bm25 = self.bm25.append_documents(tokens)
+        if added:
+            new.tfidf = sparse_vstack([self.tfidf, self.vectorizer.transform(added)], format="csr")
+        new.metadata = self.metadata.append(PassageMetadata.from_passages(added, sources))
+        mask = np.zeros(len(new.passages), dtype=bool)
+        mask[:n_old] = self.deleted
+        removed = [i for i in deleted if 0 <= i < n_old and not mask[i]]
+        mask[removed] = True
+        new.deleted = mask
+        new.n_deleted = int(mask.sum())
+        new.pending_delta = self.pending_delta + len(added) + len(removed)
+        return new
+
+    def compact(self) -> "HybridRAG":
+        """삭제되지 않은 패시지로 어휘/IDF를 다시 학습한 새 인덱스를 반환합니다."""
+        live = np.flatnonzero(~np.asarray(self.deleted, dtype=bool))
+        return HybridRAG(
+            [self.passages[i] for i in live],
+            analyzer=self.analyzer,
+            sources=[self.metadata.source_file(i) for i in live],
+        )
+
+    def save(self, root: pathlib.Path, fingerprint: str, overwrite: bool = False) -> pathlib.Path:
+        """인덱스를 mmap 가능한 스냅샷으로 기록합니다."""
+        bm25 = self.bm25
+        # 본문은 하나의 UTF-8 blob, 바이트 오프셋은 메타데이터 사이드카(passage_offsets)에 보관
+        blob, _ = self.passages.to_arrays()
+        meta_arrays, meta_tables = self.metadata.to_arrays()
+        tfidf = self.tfidf.tocsr()
+        vocab = sorted(self.vectorizer.vocabulary_.items(), key=lambda kv: kv[1])
+        arrays = {
+            "passages_blob": blob,
+            **meta_arrays,
+            "tfidf_data": tfidf.data,
+            "tfidf_indices": tfidf.indices,
+            "tfidf_indptr": tfidf.indptr,
+            "tfidf_idf": np.asarray(self.vectorizer.idf_, dtype=np.float64),
+            "bm25_indptr": bm25.indptr,
+            "bm25_doc_ids": bm25.doc_ids,
+            "bm25_tfs": bm25.tfs,
+            "bm25_idf": bm25.idf,
+            "bm25_doc_len": bm25.doc_len,
+            "deleted": np.asarray(self.deleted, dtype=bool),
+        }
+        meta = {
+            "n_passages": len(self.passages),
+            "tfidf_shape": list(tfidf.shape),
+            "tfidf_params": {
+                "analyzer": self.vectorizer.analyzer,
+                "ngram_range": list(self.vectorizer.ngram_range),
+                "max_features": self.vectorizer.max_features,
+            },
+            "tfidf_vocabulary": [t for t, _ in vocab],
+            "bm25_terms": list(bm25.terms),
+            "bm25_analyzer": self.analyzer,
+            "pending_delta": self.pending_delta,
+            **meta_tables,
         }
+        return write_snapshot(root, fingerprint, arrays, meta, overwrite=overwrite)
 
-    def _source_weight(self, passage: str) -> float:
-        """권위 있는 출처에 가중치 적용"""
-        text = (passage or "")
-        w = 1.0
-        # 기관/도메인 기반 가중치
-        if any(k in text for k in ["fdma.go.jp", "消防庁", "binran", "handbook"]):
-            w *= 1.25
-        if any(k in text for k in ["mhlw.go.jp", "厚生労働省", "0000"]):
-            w *= 1.25
-        if any(k in text for k in ["pmda.go.jp", "PMDA", "患者向け医薬品"]):
-            w *= 1.20
-        if any(k in text for k in ["rad-ar.or.jp", "くすりのしおり"]):
-            w *= 1.15
-        if any(k in text for k in ["日本赤十字", "赤十字", "救護規則"]):
-            w *= 1.10
-        # 응급 핵심 키워드 보정
-        if any(k in text for k in ["応急手当", "救急", "救急受診", "止血", "やけど", "アナフィラキシー"]):
-            w *= 1.05
-        # OTC 관련 키워드 보정
-        if any(k in text for k in ["解熱剤", "鎮痛剤", "解熱鎮痛剤", "健胃消化薬", "制酸薬", "鎮咳薬", "去痰薬", "抗ヒスタミン", "一般用医薬品", "第一類医薬品", "第二類医薬品"]):
-            w *= 1.10
-        return w
+    @classmethod
+    def load(cls, root: pathlib.Path, fingerprint: str) -> Optional["HybridRAG"]:
+        """스냅샷을 mmap으로 열어 재학습 없이 인덱스를 구성합니다. 없으면 None."""
+        snap = read_snapshot(root, fingerprint)
+        if snap is None:
+            return None
+        arrays, meta = snap
+        self = cls.__new__(cls)
+        # 본문은 mmap blob 그대로 사용 (워커 간 페이지 캐시 공유, 조회 시점에 디코딩)
+        self.passages = PassageStore(arrays["passages_blob"], arrays["passage_offsets"])
+        # 스냅샷에는 토큰 목록 대신 포스팅만 보관 (포스팅을 만든 분석기로 질의도 토큰화)
+        built_with = meta.get("bm25_analyzer", "regex")
+        self.analyzer, self._analyze = get_analyzer(built_with)
+        if self.analyzer != built_with:
+            # 예: dict로 만든 포스팅인데 이 프로세스엔 fugashi/janome이 없어 cjk-ngram으로 대체됨
+            # → 질의 토큰이 포스팅과 맞지 않아 BM25 재현율이 무너지므로 호환되지 않는 스냅샷으로 보고 재빌드
+            print(f"RAG 스냅샷 분석기 불일치: {built_with} → {self.analyzer}, 재빌드합니다")
+            return None
+        self.bm25 = PostingsBM25(
+            meta["bm25_terms"],
+            arrays["bm25_indptr"],
+            arrays["bm25_doc_ids"],
+            arrays["bm25_tfs"],
+            arrays["bm25_idf"],
+            arrays["bm25_doc_len"],
+        )
+        params = meta["tfidf_params"]
+        self.vectorizer = TfidfVectorizer(
+            analyzer=params["analyzer"],
+            ngram_range=tuple(params["ngram_range"]),
+            max_features=params["max_features"],
+        )
+        self.vectorizer.vocabulary_ = {t: i for i, t in enumerate(meta["tfidf_vocabulary"])}
+        self.vectorizer.idf_ = np.asarray(arrays["tfidf_idf"])
+        self.tfidf = csr_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=tuple(meta["tfidf_shape"]),
+            copy=False,
+        )
+        self.metadata = PassageMetadata.from_arrays(arrays, meta)
+        self.deleted = np.asarray(arrays["deleted"], dtype=bool)
+        self.n_deleted = int(self.deleted.sum())
+        self.pending_delta = int(meta.get("pending_delta", 0))
+        self._init_query_expansion()
+        return self
 
     def _tokenize(self, text: str) -> List[str]:
-        # 다국어 토큰화 (한국어, 일본어, 영어 모두 지원)
-        # 한국어와 일본어는 공백으로 분리, 영어는 단어 경계로 분리
-        tokens = []
-        
-        # 한국어/일본어 단어 (공백으로 분리)
-        korean_japanese_words = re.findall(r'[가-힣あ-んア-ン一-龯]+', text)
-        tokens.extend([word.lower() for word in korean_japanese_words])
-        
-        # 영어 단어 (단어 경계로 분리)
-        english_words = re.findall(r'\b[a-zA-Z]+\b', text)
-        tokens.extend([word.lower() for word in english_words])
-        
-        # 숫자
-        numbers = re.findall(r'\d+', text)
-        tokens.extend(numbers)
-        
-        return tokens
+        # 다국어 토큰화 (설정된 BM25 분석기: 기본은 CJK 구간 2/3-gram + 영어 단어 + 숫자)
+        return self._analyze(text)
 
-    @lru_cache(maxsize=1000)
     def _translate_korean_to_japanese(self, query: str) -> str:
-        """한국어 쿼리를 일본어로 변환합니다."""
-        translated_terms = []
-        
-        # 복합 문구 우선 매칭
-        for phrase, jp_terms in self.composite_query_boosts.items():
-            if phrase in query:
-                translated_terms.extend(jp_terms)
-
-        # 한국어 키워드 매핑
-        for korean, japanese_terms in self.korean_japanese_mapping.items():
-            if korean in query:
-                translated_terms.extend(japanese_terms)
-        
-        # 원본 쿼리와 번역된 용어들을 결합
-        if translated_terms:
-            return query + " " + " ".join(translated_terms)
-        return query
+        """한국어 쿼리를 일본어로 변환합니다 (복합 문구 → 단일 용어 순, 질의 한 번 스캔)."""
+        return self.query_expander.expand(query)
 
     def search(self, query: str, top_k: int = 2) -> List[Tuple[str, float]]:  # 기본값을 2로 더 줄여서 속도 개선
         if not query:
             return []
-        
+        per_query, _ = self.search_batch([query], top_k=top_k)
+        return per_query[0]
+
+    def search_batch(
+        self, queries: List[str], top_k: int = 2
+    ) -> Tuple[List[List[Tuple[str, float]]], List[Tuple[str, float]]]:
+        """여러 질의(다중 증상)를 한 번에 검색합니다.
+
+        (질의별 결과, 패시지 중복을 제거한 통합 상위 top_k) 를 (패시지 본문, 점수)로 반환합니다.
+        """
+        hit_lists, merged = self.search_batch_ids(queries, top_k=top_k)
+        per_query = [[(self.passage_text(i), s) for i, s in hits] for hits in hit_lists]
+        return per_query, [(self.passage_text(i), s) for i, s in merged]
+
+    def search_batch_ids(
+        self, queries: List[str], top_k: int = 2
+    ) -> Tuple[List[List[Tuple[int, float]]], List[Tuple[int, float]]]:
+        """search_batch와 같되 결과를 (패시지 id, 점수)로 반환합니다 (본문/메타데이터는 id로 조회).
+
+        모든 질의를 하나의 희소 행렬로 변환해 한 번의 행렬곱으로 TF-IDF 점수를 계산합니다.
+        대규모 코퍼스는 RAG_SEARCH_SHARDS 개 구간으로 나눠 병렬 계산합니다 (결과는 단일 경로와 동일).
+        """
+        if not queries:
+            return [], []
         # 한국어 쿼리를 일본어로 변환
-        enhanced_query = self._translate_korean_to_japanese(query)
-        
-        # 변환된 쿼리로 검색
-        q_tokens = self._tokenize(enhanced_query)
-        bm_scores = self.bm25.get_scores(q_tokens)
-        q_vec = self.vectorizer.transform([enhanced_query])
-        tf_scores = cosine_similarity(q_vec, self.tfidf)[0]
+        enhanced = [self._translate_korean_to_japanese(q) if q else "" for q in queries]
         
-        # 간단한 late fusion + 출처 가중치
-        scores = []
-        for i in range(len(self.passages)):
-            # BM25는 일본어 토큰화 한계로 약하고, 문자 n-gram TF-IDF는 교차언어에 강함
-            base = 0.2 * bm_scores[i] + 0.8 * tf_scores[i]
-            weight = self._source_weight(self.passages[i])
-            scores.append((i, base * weight))
-        scores.sort(key=lambda x: x[1], reverse=True)
-        idxs = [i for i, _ in scores[:top_k]]
-        return [(self.passages[i], float(scores[j][1])) for j, i in enumerate(idxs)]
+        # 변환된 쿼리로 검색 (질의 토큰화/벡터화는 한 번만, 점수 계산은 샤드별)
+        query_tokens = [self._tokenize(q) for q in enhanced]
+        q_mat = self.vectorizer.transform(enhanced)
+        shards = self._shard_views(configured_shards(len(self.passages)))
+        if len(shards) == 1:
+            shard_hits = [self._search_shard(0, len(self.passages), self.tfidf, query_tokens, q_mat, top_k)]
+        else:
+            # 샤드별 BM25 + TF-IDF + 상위 k개를 스레드 풀에서 병렬 계산 후 질의별 k-way 병합
+            pool = get_shard_pool(len(shards))
+            futures = [
+                pool.submit(self._search_shard, start, end, view, query_tokens, q_mat, top_k)
+                for start, end, view in shards
+            ]
+            shard_hits = [f.result() for f in futures]
+        hit_lists: List[List[Tuple[int, float]]] = []
+        for qi, q in enumerate(queries):
+            if not q:
+                hit_lists.append([])
+                continue
+            hit_lists.append(kway_merge_hits([hits[qi] for hits in shard_hits], top_k))
+        return hit_lists, merge_hit_lists(hit_lists, top_k)
 
 
-def load_disk_passages() -> list[str]:
+    def _shard_views(self, n_shards: int) -> List[Tuple[int, int, csr_matrix]]:
+        """(시작, 끝, TF-IDF 행 구간 뷰) 목록. 같은 TF-IDF 행렬/샤드 수에 대해 한 번만 만듦."""
+        if n_shards <= 1:
+            return [(0, len(self.passages), self.tfidf)]
+        cached = getattr(self, "_shard_cache", None)
+        if cached is None or cached[0] is not self.tfidf or len(cached[1]) != n_shards:
+            views = [(s, e, csr_row_view(self.tfidf, s, e)) for s, e in shard_bounds(len(self.passages), n_shards)]
+            cached = (self.tfidf, views)
+            self._shard_cache = cached
+        return cached[1]
+
+    def _search_shard(
+        self, start: int, end: int, tfidf: csr_matrix, query_tokens: List[List[str]], q_mat, top_k: int
+    ) -> List[List[Tuple[int, float]]]:
+        """패시지 [start, end) 구간의 질의별 상위 top_k (전역 인덱스, 점수)"""
+        bm_scores = np.vstack([self.bm25.get_scores_range(t, start, end) for t in query_tokens])
+        # 패시지/질의 벡터 모두 L2 정규화되어 있으므로 내적이 곧 코사인 유사도
+        # (패시지 행렬 쪽을 CSR 그대로 두어야 mmap 스냅샷을 복사하지 않음)
+        tf_scores = (tfidf @ q_mat.T).toarray().T
+
+        # 간단한 late fusion + 출처 가중치 (NumPy 벡터 연산)
+        # BM25는 CJK 2/3-gram 분석기로 재현율을 보강했지만 가중치는 유지하고, 문자 n-gram TF-IDF는 교차언어에 강함
+        scores = (0.2 * bm_scores + 0.8 * tf_scores) * self.source_weights[start:end]
+        if self.n_deleted:
+            scores[:, self.deleted[start:end]] = -np.inf
+        out: List[List[Tuple[int, float]]] = []
+        for row in scores:
+            hits = [(start + int(i), float(row[i])) for i in top_k_indices(row, top_k)]
+            out.append([h for h in hits if h[1] != -np.inf])
+        return out
+
+
+def _disk_passage_files() -> list[pathlib.Path]:
     root = pathlib.Path(__file__).resolve().parents[1]
     pdir = root / "data" / "passages" / "jp"
     if not pdir.exists():
         return []
-    out: list[str] = []
     limit = int(os.getenv("RAG_MAX_PASSAGES", "1000"))
-    for p in sorted(pdir.glob("*.txt"))[:limit]:
+    return sorted(pdir.glob("*.txt"))[:limit]
+
+
+def _rag_data_enabled() -> bool:
+    return os.getenv("RAG_USE_RAG_DATA", "0").lower() in ("1", "true", "on", "yes")
+
+
+def _rag_data_files() -> list[pathlib.Path]:
+    """스냅샷 지문 계산용: RAG 데이터 디렉토리에서 로드 대상이 되는 파일 목록"""
+    if not _rag_data_enabled():
+        return []
+    rag_dir = pathlib.Path(__file__).resolve().parents[1] / "data" / "rag_data"
+    if not rag_dir.exists():
+        return []
+    limit = int(os.getenv("RAG_MAX_PASSAGES", "1000"))
+    return sorted(rag_dir.glob("*.txt"))[:limit] + sorted(rag_dir.glob("*.pdf"))
+
+
+def load_disk_passages_with_sources() -> Tuple[list[str], list[str]]:
+    """(패시지 본문 목록, 출처 파일명 목록)"""
+    out: list[str] = []
+    sources: list[str] = []
+    for p in _disk_passage_files():
         try:
             out.append(p.read_text(encoding="utf-8"))
+            sources.append(p.name)
         except Exception:
             continue
-    return out
+    return out, sources
 
 
-def load_rag_data_passages() -> list[str]:
-    """RAG 데이터 디렉토리에서 텍스트와 PDF 파일들을 로드"""
-    if os.getenv("RAG_USE_RAG_DATA", "0").lower() not in ("1", "true", "on", "yes"):
-        return []
+def load_disk_passages() -> list[str]:
+    return load_disk_passages_with_sources()[0]
+
+
+def load_rag_data_passages_with_sources() -> Tuple[list[str], list[str]]:
+    """RAG 데이터 디렉토리에서 텍스트와 PDF 파일들을 로드 (PDF 청크의 출처는 청크 머리글에서 추출)"""
+    if not _rag_data_enabled():
+        return [], []
     root = pathlib.Path(__file__).resolve().parents[1]
     rag_dir = root / "data" / "rag_data"
     
     if not rag_dir.exists():
-        return []
+        return [], []
     
     passages = []
+    sources = []
     
     # 텍스트 파일들 로드 (상한 적용)
     limit = int(os.getenv("RAG_MAX_PASSAGES", "1000"))
@@ -217,6 +339,7 @@ def load_rag_data_passages() -> list[str]:
             text = txt_file.read_text(encoding="utf-8")
             if text.strip():
                 passages.append(text)
+                sources.append(txt_file.name)
         except Exception:
             continue
     
@@ -226,6 +349,7 @@ def load_rag_data_passages() -> list[str]:
         # PDF는 메모리 사용량이 크므로 비활성화 기본값(RAG_USE_RAG_DATA=0)
         pdf_passages = load_pdf_passages(str(rag_dir))
         passages.extend(pdf_passages)
+        sources.extend([""] * len(pdf_passages))
         print(f"PDF 파일에서 {len(pdf_passages)}개 패시지 로드됨")
     except ImportError as e:
         print(f"PDF 처리 모듈을 찾을 수 없습니다: {e}")
@@ -233,7 +357,12 @@ def load_rag_data_passages() -> list[str]:
     except Exception as e:
         print(f"PDF 파일 처리 중 오류: {e}")
     
-    return passages
+    return passages, sources
+
+
+def load_rag_data_passages() -> list[str]:
+    """RAG 데이터 디렉토리에서 텍스트와 PDF 파일들을 로드"""
+    return load_rag_data_passages_with_sources()[0]
 
 
 DEFAULT_PASSAGES = [
@@ -266,9 +395,100 @@ DEFAULT_PASSAGES = [
     "骨折の疑いがある場合は患部を動かさず、添え木で固定して医療機関を受診してください。",
     "意識がない場合は気道を確保し、呼吸を確認します。呼吸がない場合は心肺蘇生を行ってください。",
 ]
-_disk = load_disk_passages()
-_rag_data = load_rag_data_passages()
-_all_passages = _disk + _rag_data + DEFAULT_PASSAGES
-GLOBAL_RAG = HybridRAG(_all_passages)
+
+
+def load_all_passages_with_sources() -> Tuple[list[str], list[str]]:
+    """(전체 패시지, 패시지별 출처 파일) — 메타데이터 사이드카 빌드용"""
+    disk, disk_sources = load_disk_passages_with_sources()
+    rag_data, rag_data_sources = load_rag_data_passages_with_sources()
+    if rag_data:
+        # PDF 청크/RAG 데이터는 크롤링 패시지 및 서로에 대해 근접 중복을 걸러서 인덱스에 넣음
+        seen = NearDuplicateIndex()
+        for name, passage in zip(disk_sources, disk):
+            seen.add(name, passage)
+        rag_data, rag_data_sources, dropped = dedupe_passages(rag_data, rag_data_sources, seen)
+        if dropped:
+            print(f"RAG 데이터 근접 중복 {dropped}개 제외")
+    return (
+        disk + rag_data + DEFAULT_PASSAGES,
+        disk_sources + rag_data_sources + ["default"] * len(DEFAULT_PASSAGES),
+    )
+
+
+def load_all_passages() -> list[str]:
+    return load_all_passages_with_sources()[0]
+
+
+def _build_global_rag() -> HybridRAG:
+    passages, sources = load_all_passages_with_sources()
+    return HybridRAG(passages, sources=sources)
+
+
+def _snapshot_enabled() -> bool:
+    return os.getenv("RAG_INDEX_SNAPSHOT", "1").lower() in ("1", "true", "on", "yes")
+
+
+def _snapshot_root() -> pathlib.Path:
+    default = pathlib.Path(__file__).resolve().parents[1] / "data" / "cache" / "rag_index"
+    return pathlib.Path(os.getenv("RAG_INDEX_DIR", str(default)))
+
+
+def passages_fingerprint() -> str:
+    """패시지 원본 파일과 인덱스 설정의 지문 (스냅샷 유효성 판단용)"""
+    defaults = hashlib.sha1("\n".join(DEFAULT_PASSAGES).encode("utf-8")).hexdigest()
+    extra = {
+        "tfidf_max_features": int(os.getenv("RAG_TFIDF_MAX_FEATURES", "10000")),
+        "bm25_analyzer": os.getenv("RAG_BM25_ANALYZER", "cjk-ngram").lower(),
+        "default_passages": defaults,
+        "pdf_chunker": CHUNKER_VERSION,
+        "dedup_threshold": float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8")),
+    }
+    return fingerprint_sources(_disk_passage_files() + _rag_data_files(), extra=extra)
+
+
+def save_global_snapshot(rag: HybridRAG) -> None:
+    """증분 반영/컴팩션된 인덱스를 현재 지문의 스냅샷으로 덮어씁니다 (다른 워커 재부팅 시 재사용)."""
+    if not _snapshot_enabled():
+        return
+    root = _snapshot_root()
+    fingerprint = passages_fingerprint()
+    try:
+        rag.save(root, fingerprint, overwrite=True)
+    except Exception as e:
+        print(f"RAG 인덱스 스냅샷 저장 실패: {e}")
+
+
+def load_global_rag() -> HybridRAG:
+    """스냅샷이 유효하면 mmap으로 열고, 아니면 전체 빌드 후 스냅샷을 기록합니다."""
+    if not _snapshot_enabled():
+        return _build_global_rag()
+    root = _snapshot_root()
+    fingerprint = passages_fingerprint()
+    rag = HybridRAG.load(root, fingerprint)
+    if rag is not None:
+        print(f"RAG 인덱스 스냅샷 로드: {fingerprint} ({len(rag.passages)}개 패시지)")
+        return rag
+    rag = _build_global_rag()
+    try:
+        rag.save(root, fingerprint)
+        print(f"RAG 인덱스 스냅샷 저장: {root / fingerprint}")
+    except Exception as e:
+        print(f"RAG 인덱스 스냅샷 저장 실패: {e}")
+        return rag
+    # 방금 기록한 스냅샷을 다시 mmap으로 열어 첫 부팅 워커도 본문/행렬을 힙에 두지 않음
+    return HybridRAG.load(root, fingerprint) or rag
+
+
+# 인덱스는 레지스트리에 세대로 게시. 두 임포트 경로(services_rag / backend.services_rag)가
+# 같은 레지스트리를 공유하므로 이미 게시된 세대가 있으면 다시 빌드하지 않음
+if RAG_REGISTRY.current() is None:
+    RAG_REGISTRY.publish(load_global_rag())
+
+
+def __getattr__(name: str):
+    # 하위 호환: GLOBAL_RAG는 항상 현재 세대를 가리킴 (임포트 시점 바인딩 대신 조회 시점)
+    if name == "GLOBAL_RAG":
+        return RAG_REGISTRY.current()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
@@ -3,23 +3,34 @@ RAG 데이터 자동 업데이트 시스템
 새로 크롤링된 데이터를 RAG 시스템에 자동으로 통합합니다.
 """
 
+import hashlib
 import os
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional
 
 try:
-    from .services_rag import HybridRAG, load_disk_passages
+    from .rag_dedup import NearDuplicateIndex
+    from .services_rag import HybridRAG, load_global_rag, save_global_snapshot
+    from .rag_registry import RAG_REGISTRY
     from .services_logging import symptom_logger
 except ImportError:
     # Streamlit Cloud에서 상대 import가 실패할 경우를 대비
     import sys
     import os
     sys.path.append(os.path.dirname(__file__))
-    from services_rag import HybridRAG, load_disk_passages
+    from rag_dedup import NearDuplicateIndex
+    from services_rag import HybridRAG, load_global_rag, save_global_snapshot
+    from rag_registry import RAG_REGISTRY
     from services_logging import symptom_logger
 
+def _text_hash(text: str) -> str:
+    """패시지 텍스트 해시 (인덱스 내 패시지와 파일 내용을 대응시키는 데 사용)"""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
 class RAGUpdater:
     """RAG 데이터 업데이트 클래스"""
     
@@ -31,9 +42,24 @@ class RAGUpdater:
         self.backup_dir = Path("data/passages_backup")
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         
+        # 근접 중복으로 판정된 새 파일을 옮겨 두는 디렉토리 (인덱스에 들어가지 않음)
+        self.duplicates_dir = Path("data/passages_duplicates")
+        # 파일별 MinHash 서명 인덱스 (재시작 후에도 재사용, 파일 목록과 어긋나면 동기화)
+        self.dedup_path = Path(os.getenv("RAG_DEDUP_INDEX", "data/cache/dedup/passages_jp.npz"))
+        self._dedup: Optional[NearDuplicateIndex] = None
+        
         # 메타데이터 파일
         self.metadata_file = self.passages_dir / "metadata.json"
-        
+
+        # 증분 변경이 이 수 이상 쌓이면 백그라운드에서 어휘 재학습(컴팩션)
+        self.compact_min_delta = int(os.getenv("RAG_COMPACT_MIN_DELTA", "200"))
+        # 주기적 컴팩션 간격 (초, 0이면 비활성화)
+        self.compact_interval = float(os.getenv("RAG_COMPACT_INTERVAL_SEC", "1800"))
+        self._compact_lock = threading.Lock()
+        self._compact_thread: Optional[threading.Thread] = None
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
     def load_metadata(self) -> Dict:
         """메타데이터를 로드합니다."""
         if self.metadata_file.exists():
@@ -95,8 +121,10 @@ class RAGUpdater:
         """RAG 시스템을 업데이트합니다."""
         # 새 파일 스캔
         new_files = self.scan_new_files()
+        known = set(self.load_metadata().get('file_hashes', {}))
+        removed_files = known - {p.name for p in self.passages_dir.glob("*.txt")}
         
-        if not new_files:
+        if not new_files and not removed_files:
             return {
                 'success': True,
                 'message': 'No new files to update',
@@ -111,14 +139,20 @@ class RAGUpdater:
             # 새 파일들을 RAG 시스템에 통합
             self._integrate_new_files(new_files)
             
-            # 메타데이터 업데이트
+            # 메타데이터 업데이트 (다음 스캔에서 같은 파일을 다시 처리하지 않도록 해시 저장)
             metadata = self.load_metadata()
+            previous_hashes = metadata.get('passage_hashes', {})
+            current_hashes = self._current_passage_hashes()
+            metadata['file_hashes'] = {
+                p.name: self.get_file_hash(p) for p in self.passages_dir.glob("*.txt")
+            }
+            metadata['passage_hashes'] = current_hashes
             metadata['last_update'] = datetime.now().isoformat()
             metadata['total_files'] = len(list(self.passages_dir.glob("*.txt")))
             self.save_metadata(metadata)
             
-            # RAG 시스템 재초기화 (전역 변수 업데이트)
-            self._reinitialize_rag()
+            # 변경분만 인덱스에 반영 (전체 재빌드 없음)
+            self._apply_incremental(previous_hashes, current_hashes)
             
             return {
                 'success': True,
@@ -141,7 +175,11 @@ class RAGUpdater:
             }
     
     def _integrate_new_files(self, new_files: List[Path]):
-        """새 파일들을 RAG 시스템에 통합합니다."""
+        """새 파일들을 RAG 시스템에 통합합니다.
+        
+        기존 파일과 근접 중복인 파일은 duplicates_dir로 옮겨 인덱스에 반영되지 않게 합니다.
+        """
+        index = self._dedup_index(pending=[p.name for p in new_files])
         for filepath in new_files:
             # 파일 내용 검증
             try:
@@ -153,9 +191,12 @@ class RAGUpdater:
                     print(f"Skipping {filepath.name}: content too short")
                     continue
                 
-                # 중복 내용 검사
-                if self._is_duplicate_content(content):
-                    print(f"Skipping {filepath.name}: duplicate content")
+                # 중복 내용 검사 (서명 인덱스 조회, 기존 파일은 다시 읽지 않음)
+                duplicate_of = index.add_unique(filepath.name, content)
+                if duplicate_of is not None:
+                    index.remove(filepath.name)
+                    self._quarantine_duplicate(filepath)
+                    print(f"Skipping {filepath.name}: duplicate content of {duplicate_of}")
                     continue
                 
                 print(f"Integrated {filepath.name}")
@@ -163,53 +204,152 @@ class RAGUpdater:
             except Exception as e:
                 print(f"Error processing {filepath.name}: {e}")
                 continue
+        self._save_dedup_index()
+    
+    def _is_duplicate_content(self, content: str, exclude: Optional[str] = None) -> bool:
+        """기존 파일과 근접 중복(MinHash 추정 유사도 ≥ RAG_DEDUP_THRESHOLD)인지 검사합니다."""
+        return self._dedup_index().query(content, exclude=exclude) is not None
     
-    def _is_duplicate_content(self, content: str) -> bool:
-        """중복 내용인지 검사합니다."""
-        # 간단한 중복 검사 (실제로는 더 정교한 방법 사용 가능)
-        existing_files = list(self.passages_dir.glob("*.txt"))
+    def _dedup_index(self, pending: Iterable[str] = ()) -> NearDuplicateIndex:
+        """현재 파일 목록과 동기화된 중복 인덱스 (pending 파일은 아직 등록하지 않음)
         
-        for existing_file in existing_files:
-            if existing_file.name == "metadata.json":
-                continue
-                
+        저장된 서명을 재사용하고, 인덱스에 없는 파일만 읽어 서명을 추가합니다.
+        """
+        index = self._dedup or NearDuplicateIndex.load(self.dedup_path) or NearDuplicateIndex()
+        names = {p.name for p in self.passages_dir.glob("*.txt")} - set(pending)
+        for key in set(index.keys()) - names - set(pending):
+            index.remove(key)
+        for name in sorted(names - set(index.keys())):
             try:
-                with open(existing_file, 'r', encoding='utf-8') as f:
-                    existing_content = f.read()
-                
-                # 내용 유사도 검사 (간단한 버전)
-                if len(content) > 100 and len(existing_content) > 100:
-                    # 첫 100자와 마지막 100자 비교
-                    content_start = content[:100]
-                    content_end = content[-100:]
-                    
-                    existing_start = existing_content[:100]
-                    existing_end = existing_content[-100:]
-                    
-                    if (content_start == existing_start and 
-                        content_end == existing_end):
-                        return True
-                        
+                index.add(name, (self.passages_dir / name).read_text(encoding="utf-8"))
             except Exception:
                 continue
-        
-        return False
+        self._dedup = index
+        return index
     
-    def _reinitialize_rag(self):
-        """RAG 시스템을 재초기화합니다."""
-        # 전역 RAG 객체 업데이트
-        import sys
-        if 'backend.services_rag' in sys.modules:
-            rag_module = sys.modules['backend.services_rag']
-            
-            # 새 패시지 로드
-            new_passages = load_disk_passages()
-            
-            # RAG 시스템 재초기화
-            rag_module.GLOBAL_RAG = HybridRAG(new_passages)
-            
-            print(f"RAG system reinitialized with {len(new_passages)} passages")
+    def _save_dedup_index(self):
+        if self._dedup is None:
+            return
+        try:
+            self._dedup.save(self.dedup_path)
+        except OSError as e:
+            print(f"중복 인덱스 저장 실패: {e}")
     
+    def _quarantine_duplicate(self, filepath: Path):
+        """중복 파일을 passages 디렉토리 밖으로 옮깁니다 (삭제하지 않음)."""
+        self.duplicates_dir.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(filepath), str(self.duplicates_dir / filepath.name))
+    
+    def _current_passage_hashes(self) -> Dict[str, str]:
+        """파일명 → 패시지 텍스트 해시 (load_disk_passages와 같은 방식으로 읽음)"""
+        hashes = {}
+        for filepath in sorted(self.passages_dir.glob("*.txt")):
+            try:
+                hashes[filepath.name] = _text_hash(filepath.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+        return hashes
+
+    def _diff_index(self, rag: HybridRAG, previous: Dict[str, str], current: Dict[str, str]):
+        """인덱스와 파일 상태를 비교해 (추가할 패시지, 삭제할 패시지 위치, 추가 패시지의 출처 파일)을 계산합니다.
+
+        해시가 달라진(추가/변경/삭제된) 파일만 보고, 그 파일의 행은 메타데이터 출처 열로 찾습니다.
+        코퍼스 전체를 디코딩/해시하지 않으므로 비용은 바뀐 파일 수에 비례합니다.
+        """
+        changed = sorted(name for name in set(previous) | set(current) if previous.get(name) != current.get(name))
+        added: List[str] = []
+        sources: List[str] = []
+        deleted: List[int] = []
+        for name, rows in rag.metadata.rows_for_sources(changed).items():
+            live = [int(i) for i in rows if not rag.deleted[i]]
+            h = current.get(name)
+            # 메타데이터 해시가 인덱스보다 뒤처진 경우: 이미 현재 내용이 색인돼 있으면 그대로 둠
+            keep = {i for i in live if h is not None and _text_hash(rag.passages[i]) == h}
+            deleted += [i for i in live if i not in keep]
+            if h is None or keep:
+                continue
+            try:
+                added.append((self.passages_dir / name).read_text(encoding="utf-8"))
+                sources.append(name)
+            except Exception:
+                continue
+        return added, deleted, sources
+
+    def _apply_incremental(self, previous: Dict[str, str], current: Dict[str, str]):
+        """추가/변경/삭제된 파일만 전역 인덱스에 반영해 새 세대로 게시합니다."""
+        while True:
+            rag = RAG_REGISTRY.current()
+            if rag is None:
+                self._reinitialize_rag()
+                return
+            added, deleted, sources = self._diff_index(rag, previous, current)
+            if not added and not deleted:
+                return
+            updated = rag.apply_delta(added, deleted, sources=sources)
+            # 컴팩션이 동시에 새 세대를 게시했다면 그 세대 기준으로 다시 계산
+            if RAG_REGISTRY.publish(updated, expected=rag):
+                break
+
+        save_global_snapshot(updated)
+        print(
+            f"RAG index updated incrementally: +{len(added)} / -{len(deleted)} passages "
+            f"(generation {RAG_REGISTRY.generation}, pending delta {updated.pending_delta})"
+        )
+
+        self._start_compaction_scheduler()
+        if updated.pending_delta >= self.compact_min_delta:
+            self.schedule_compaction()
+
+    def schedule_compaction(self) -> bool:
+        """백그라운드 스레드에서 컴팩션을 시작합니다. 이미 실행 중이면 False."""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return False
+        self._compact_thread = threading.Thread(target=self.compact_now, name="rag-compaction", daemon=True)
+        self._compact_thread.start()
+        return True
+
+    def compact_now(self) -> bool:
+        """톰스톤을 정리하고 어휘/IDF를 재학습한 인덱스로 교체합니다."""
+        if not self._compact_lock.acquire(blocking=False):
+            return False
+        try:
+            base = RAG_REGISTRY.current()
+            if base is None or base.pending_delta == 0:
+                return False
+            compacted = base.compact()
+            # 컴팩션 도중 새 증분이 반영됐다면 결과를 버리고 다음 주기에 다시 시도
+            if not RAG_REGISTRY.publish(compacted, expected=base):
+                return False
+            save_global_snapshot(compacted)
+            print(f"RAG index compacted: {len(compacted.passages)} passages")
+            return True
+        except Exception as e:
+            print(f"RAG compaction failed: {e}")
+            return False
+        finally:
+            self._compact_lock.release()
+
+    def _start_compaction_scheduler(self):
+        """주기적 컴팩션 스레드를 (한 번만) 시작합니다."""
+        if self.compact_interval <= 0:
+            return
+        if self._scheduler_thread is not None and self._scheduler_thread.is_alive():
+            return
+
+        def _loop():
+            while not self._stop_event.wait(self.compact_interval):
+                self.compact_now()
+
+        self._scheduler_thread = threading.Thread(target=_loop, name="rag-compaction-scheduler", daemon=True)
+        self._scheduler_thread.start()
+
+    def _reinitialize_rag(self):
+        """RAG 시스템을 재초기화합니다 (전역 인덱스가 없을 때의 전체 빌드 경로)."""
+        # 요청 스레드를 막지 않도록 백그라운드에서 빌드한 뒤 새 세대로 게시
+        # (새 지문으로 스냅샷을 기록해 다른 워커도 재사용)
+        if RAG_REGISTRY.rebuild_async(load_global_rag):
+            print("RAG system rebuild started in background")
+
     def get_rag_statistics(self) -> Dict:
         """RAG 시스템 통계를 가져옵니다."""
         metadata = self.load_metadata()
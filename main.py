@@ -36,18 +36,25 @@ import mimetypes
 sys.path.append('backend')
 # FAST_MODE에서는 무거운 RAG 초기화를 건너뛰어 메모리 사용을 줄임
 FAST_MODE = os.getenv('FAST_MODE', '0').lower() in ('1', 'true', 'on', 'yes')
-GLOBAL_RAG = None
+RAG_REGISTRY = None
+RAG_RESULT_CACHE = None
 symptom_logger = None
 auto_crawl_unhandled_symptoms = None
 try:
     from services_gen import generate_advice
+    # 인덱스는 이름을 임포트 시점에 바인딩하지 않고 레지스트리에서 요청마다 현재 세대를 조회
+    from rag_registry import RAG_REGISTRY
+    # 반복 질의는 세대별 결과 캐시에서 응답 (세대 교체 시 자동 무효화)
+    from rag_result_cache import RAG_RESULT_CACHE
     if not FAST_MODE:
-        from services_rag import GLOBAL_RAG as _GLOBAL_RAG
-        GLOBAL_RAG = _GLOBAL_RAG
+        import services_rag  # noqa: F401  (임포트 시 첫 세대를 레지스트리에 게시)
     from services_logging import symptom_logger  # type: ignore
     from services_auto_crawler import auto_crawl_unhandled_symptoms  # type: ignore
     from services_playwright_crawler import is_playwright_enabled
     from otc_rules import load_rules, save_rules
+    # 병원/약국 최근접 조회는 로컬 POI 인덱스 우선 (Overpass는 갱신용)
+    from geo_poi_store import get_poi_store, nearby_poi_groups
+    from services_geo import fetch_overpass_pois
 except ImportError as e:
     print(f"백엔드 서비스 임포트 오류: {e}")
     # Playwright 의존성이 없거나 기타 임포트 실패 시에도 헬스 체크가 동작하도록 폴백 제공
@@ -360,14 +367,13 @@ async def get_advice(
         rag_passages = []
         rag_confidence = 0.0
         merged_hits = []  # (passage, raw_score)
-        if GLOBAL_RAG:
+        rag_available = RAG_RESULT_CACHE is not None and RAG_REGISTRY.current() is not None
+        if rag_available:
             try:
                 queries = symptom_list or [symptom]
-                for q in queries:
-                    hits = GLOBAL_RAG.search(q, top_k=3)
-                    merged_hits.extend(hits)
-                # 상위 근거 추출 (raw score 기준 정렬)
-                merged_hits = sorted(merged_hits, key=lambda x: x[1], reverse=True)[:3]
+                # 모든 하위 증상을 한 번에 검색하고, 중복 제거된 통합 상위 3개(raw score 기준)를 사용
+                # 검색 동안 현재 세대를 잡아 두어 교체되더라도 같은 인덱스로 끝까지 처리 (캐시 미스 질의만 검색)
+                _, merged_hits = RAG_RESULT_CACHE.search_batch(queries, top_k=3)
                 rag_passages = [p for p, _ in merged_hits]
                 # softmax 정규화로 0~1 신뢰도 계산
                 try:
@@ -432,61 +438,16 @@ async def get_advice(
             # 환경변수로 POI 조회 비활성화 옵션 제공 (지연 시 단기 성능 대응)
             disable_poi = (os.getenv("DISABLE_POI", "0").lower() in ("1", "true", "on", "yes"))
             if lat and lon and not disable_poi:
-                # Overpass API로 간단 검색
-                def search_pois(amenity: str) -> List[Dict[str, Any]]:
-                    # Overpass에서 충분한 후보를 받아온 뒤, 거리 계산해 가까운 순 5개만 반환
-                    poi_timeout = int(os.getenv("POI_TIMEOUT_SEC", "6"))
-                    radius_m = int(os.getenv("POI_RADIUS_M", "1500"))
-                    query = f"""
-                    [out:json][timeout:{poi_timeout}];
-                    (
-                      node["amenity"="{amenity}"](around:{radius_m},{lat},{lon});
-                      way["amenity"="{amenity}"](around:{radius_m},{lat},{lon});
-                      relation["amenity"="{amenity}"](around:{radius_m},{lat},{lon});
-                    );
-                    out center 50;
-                    """
-                    r = requests.post(
-                        "https://overpass-api.de/api/interpreter",
-                        data={"data": query},
-                        timeout=poi_timeout,
-                    )
-                    r.raise_for_status()
-                    js = r.json()
-                    res: List[Dict[str, Any]] = []
-
-                    def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-                        from math import radians, sin, cos, asin, sqrt
-                        R = 6371.0
-                        dlat = radians(lat2 - lat1)
-                        dlon = radians(lon2 - lon1)
-                        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-                        c = 2 * asin(sqrt(a))
-                        return R * c
-
-                    seen = set()
-                    for el in js.get("elements", []):
-                        tags = el.get("tags", {}) or {}
-                        name = tags.get("name") or amenity
-                        if el.get("type") == "node":
-                            clat, clon = el.get("lat"), el.get("lon")
-                        else:
-                            center = el.get("center") or {}
-                            clat, clon = center.get("lat"), center.get("lon")
-                        if clat is None or clon is None:
-                            continue
-                        # 중복 제거 (좌표 반올림 + 이름 기준)
-                        key = (name, round(float(clat), 5), round(float(clon), 5))
-                        if key in seen:
-                            continue
-                        seen.add(key)
-                        dist_km = haversine(float(lat), float(lon), float(clat), float(clon))
-                        res.append({"name": name, "lat": clat, "lon": clon, "distance": dist_km})
-
-                    res.sort(key=lambda x: (x.get("distance", 1e9), x.get("name", "")))
-                    return res[:5]
-                nearby_hospitals = search_pois("hospital")
-                nearby_pharmacies = search_pois("pharmacy")
+                # 로컬 POI 인덱스에서 가까운 순 5개 (영역이 비었거나 오래됐을 때만 병원/약국을 Overpass 한 번에 갱신)
+                radius_m = int(os.getenv("POI_RADIUS_M", "1500"))
+                groups = nearby_poi_groups(get_poi_store(), float(lat), float(lon), {
+                    "hospital": (("hospital",), radius_m, 5),
+                    "pharmacy": (("pharmacy",), radius_m, 5),
+                }, fetch_overpass_pois)
+                nearby_hospitals, nearby_pharmacies = (
+                    [{"name": p["name"], "lat": p["lat"], "lon": p["lon"], "distance": p["distance"]} for p in groups[g]]
+                    for g in ("hospital", "pharmacy")
+                )
         except Exception as e:
             logger.error(f"POI search error: {e}")
         
@@ -496,7 +457,7 @@ async def get_advice(
                 user_input=symptom,
                 advice_content=advice_result['advice'],
                 # merged_hits는 (passage, prob) 형식으로 softmax 정규화됨
-                rag_results=merged_hits if GLOBAL_RAG else [],
+                rag_results=merged_hits if rag_available else [],
                 processing_time=processing_time,
                 advice_quality='good' if rag_confidence > 0.6 else 'poor',
                 image_uploaded=bool(image_bytes),
@@ -677,6 +638,14 @@ async def get_logs(limit: int = 50):
         logger.error(f"Log retrieval error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/rag_cache", dependencies=[Depends(require_admin)])
+async def get_rag_cache_stats():
+    """RAG 검색 결과 캐시 적중/미스/지연 통계"""
+    return {
+        "cache": RAG_RESULT_CACHE.stats() if RAG_RESULT_CACHE is not None else {"enabled": False},
+        "index": RAG_REGISTRY.stats() if RAG_REGISTRY is not None else {},
+    }
+
 @app.get("/api/stats", dependencies=[Depends(require_admin)])
 async def get_stats():
     """시스템 통계"""
@@ -716,7 +685,7 @@ async def get_stats():
             "success_rate": success_rate,
             "confidence_distribution": confidence_ranges,
             "playwright_enabled": is_playwright_enabled(),
-            "rag_passages_count": len(GLOBAL_RAG.passages) if GLOBAL_RAG else 0
+            "rag_passages_count": _rag_passages_count()
         }
     except Exception as e:
         logger.error(f"Stats error: {e}")
@@ -777,15 +746,23 @@ async def trigger_crawling(symptom: str):
             "error": str(e)
         }))
 
+def _rag_passages_count() -> int:
+    rag = RAG_REGISTRY.current() if RAG_REGISTRY is not None else None
+    return len(rag.passages) - rag.n_deleted if rag is not None else 0
+
+
 @app.get("/api/health")
 async def health_check():
     """헬스 체크"""
+    rag_stats = RAG_REGISTRY.stats() if RAG_REGISTRY is not None else {}
     return {
         "status": "healthy",
         "timestamp": (
             datetime.now(ZoneInfo("Asia/Seoul")).isoformat() if ZoneInfo else datetime.now().isoformat()
         ),
-        "rag_loaded": GLOBAL_RAG is not None,
+        "rag_loaded": bool(rag_stats.get("generation")),
+        "rag_generation": rag_stats.get("generation", 0),
+        "rag_index_building": rag_stats.get("building", False),
         "playwright_enabled": is_playwright_enabled(),
         "use_playwright_env": os.getenv("USE_PLAYWRIGHT_CRAWLING"),
         "pw_headless": os.getenv("PW_HEADLESS"),
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Dense ANN 인덱스 벤치마크 (전수 검색 대비 recall@k / 질의당 지연)
+- 임베딩은 384차원(MiniLM과 동일) 군집형 합성 벡터를 사용합니다.
+  (sentence-transformers 없이도 실행 가능하도록; 실제 임베딩 분포와 유사하게 군집 구조를 둠)
+- hnswlib가 설치되어 있으면 HNSW도 함께 측정합니다.
+
+사용 예: python scripts/bench_ann.py --sizes 2000 20000 100000 --nprobe 4 8 16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.rag_ann import HNSWLIB_AVAILABLE, ExactIndex, HNSWIndex, IVFIndex  # noqa: E402
+
+
+def make_embeddings(n: int, dim: int, n_clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    labels = rng.integers(0, n_clusters, size=n)
+    return (centers[labels] + 0.6 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def recall_at_k(approx, exact) -> float:
+    hits = sum(len({i for i, _ in a} & {i for i, _ in e}) for a, e in zip(approx, exact))
+    return hits / max(1, sum(len(e) for e in exact))
+
+
+def time_search(index, queries: np.ndarray, k: int, repeat: int):
+    index.search(queries[:1], k)  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            result = index.search(q[None, :], k)
+    elapsed = (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+    return elapsed, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'passages':>9} | {'index':>12} | {'build s':>8} | {'ms/query':>8} | {'recall@k':>8}")
+    for n in args.sizes:
+        emb = make_embeddings(n, args.dim, n_clusters=max(8, n // 200))
+        rng = np.random.default_rng(1)
+        queries = emb[rng.choice(n, args.queries, replace=False)] + 0.3 * rng.normal(
+            size=(args.queries, args.dim)
+        ).astype(np.float32)
+
+        exact = ExactIndex(emb)
+        exact_results = exact.search(queries, args.top_k)
+        ms, _ = time_search(exact, queries, args.top_k, args.repeat)
+        print(f"{n:>9} | {'exact':>12} | {0.0:>8.2f} | {ms:>8.3f} | {1.0:>8.3f}")
+
+        start = time.perf_counter()
+        ivf = IVFIndex(emb)
+        build = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            ivf.nprobe = min(nprobe, ivf.nlist)
+            ms, _ = time_search(ivf, queries, args.top_k, args.repeat)
+            recall = recall_at_k(ivf.search(queries, args.top_k), exact_results)
+            label = f"ivf/{ivf.nlist}/{ivf.nprobe}"
+            print(f"{n:>9} | {label:>12} | {build:>8.2f} | {ms:>8.3f} | {recall:>8.3f}")
+
+        if HNSWLIB_AVAILABLE:
+            start = time.perf_counter()
+            hnsw = HNSWIndex(emb)
+            build = time.perf_counter() - start
+            ms, _ = time_search(hnsw, queries, args.top_k, args.repeat)
+            recall = recall_at_k(hnsw.search(queries, args.top_k), exact_results)
+            print(f"{n:>9} | {'hnsw':>12} | {build:>8.2f} | {ms:>8.3f} | {recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
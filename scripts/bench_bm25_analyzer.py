@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+BM25 분석기 비교 벤치마크 (regex / cjk-ngram / dict)
+- 프로젝트 패시지(data/passages/jp + 기본 패시지)와 experiments/test_100_symptoms.py의 증상 질의 사용
+- 정답 레이블이 없으므로 증상 카테고리(10개씩)별 일본어 핵심어를 포함한 패시지를 관련 문서로 간주
+- BM25 단독 / 하이브리드(search_batch) 각각 P@3, MRR@10, 0점 질의 비율(BM25), 빌드 시간, 질의당 지연
+
+사용 예: python scripts/bench_bm25_analyzer.py --analyzers regex cjk-ngram dict
+"""
+
+import argparse
+import ast
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+os.environ.setdefault("RAG_INDEX_SNAPSHOT", "0")
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.services_rag import DEFAULT_PASSAGES, HybridRAG, load_disk_passages  # noqa: E402
+
+# SYMPTOMS_100의 카테고리 순서(10개씩)와 같은 순서
+CATEGORY_KEYWORDS = [
+    ["発熱", "熱", "解熱"],
+    ["頭痛"],
+    ["腹痛", "腹", "胃"],
+    ["咳", "喉", "のど", "鼻", "呼吸", "痰"],
+    ["発疹", "かゆみ", "皮膚", "じんましん", "湿疹", "アレルギー"],
+    ["傷", "出血", "止血", "打撲", "骨折"],
+    ["虫", "刺", "蚊", "ハチ", "蜂", "ダニ"],
+    ["下痢", "嘔吐", "吐き気", "消化", "胃"],
+    ["めまい", "意識", "しびれ", "けいれん", "失神"],
+    ["胸", "心臓", "意識", "出血", "やけど", "熱傷", "救急"],
+]
+
+
+def load_symptom_queries() -> List[str]:
+    tree = ast.parse((ROOT / "experiments" / "test_100_symptoms.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", "") == "SYMPTOMS_100" for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    return []
+
+
+def relevance(passages: Sequence[str], n_queries: int) -> List[set]:
+    out = []
+    for qi in range(n_queries):
+        keywords = CATEGORY_KEYWORDS[min(qi // 10, len(CATEGORY_KEYWORDS) - 1)]
+        out.append({i for i, p in enumerate(passages) if any(k in p for k in keywords)})
+    return out
+
+
+def quality(rankings: List[List[int]], relevant: List[set]):
+    p3 = np.mean([sum(i in rel for i in r[:3]) / 3 for r, rel in zip(rankings, relevant)])
+    mrr = np.mean([
+        next((1.0 / (rank + 1) for rank, i in enumerate(r[:10]) if i in rel), 0.0)
+        for r, rel in zip(rankings, relevant)
+    ])
+    return p3, mrr
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analyzers", nargs="+", default=["regex", "cjk-ngram", "dict"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    passages = load_disk_passages() + DEFAULT_PASSAGES
+    queries = load_symptom_queries()
+    relevant = relevance(passages, len(queries))
+    index_of = {p: i for i, p in enumerate(passages)}
+    print(f"passages={len(passages)}, queries={len(queries)}")
+    print(
+        f"{'analyzer':>10} | {'build ms':>8} | {'terms':>6} | {'bm25 zero':>9} | {'bm25 P@3':>8} | "
+        f"{'bm25 MRR':>8} | {'hyb P@3':>7} | {'hyb MRR':>7} | {'ms/query':>8}"
+    )
+    for name in args.analyzers:
+        start = time.perf_counter()
+        rag = HybridRAG(passages, analyzer=name)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        enhanced = [rag._translate_korean_to_japanese(q) for q in queries]
+        bm = [rag.bm25.get_scores(rag._tokenize(q)) for q in enhanced]
+        zero = np.mean([not np.any(s > 0) for s in bm])
+        bm_p3, bm_mrr = quality([list(np.argsort(-s, kind="stable")) for s in bm], relevant)
+
+        per_query, _ = rag.search_batch(queries, top_k=10)
+        hyb_p3, hyb_mrr = quality([[index_of[p] for p, _ in hits] for hits in per_query], relevant)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for q in queries:
+                rag.search(q, top_k=3)
+        ms = (time.perf_counter() - start) * 1000 / (args.repeat * len(queries))
+        print(
+            f"{rag.analyzer:>10} | {build_ms:>8.0f} | {len(rag.bm25.terms):>6} | {zero:>9.2f} | {bm_p3:>8.3f} | "
+            f"{bm_mrr:>8.3f} | {hyb_p3:>7.3f} | {hyb_mrr:>7.3f} | {ms:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+양자화 임베딩 벤치마크 (float32 전수 검색 대비 메모리 / 질의당 지연 / recall@k)
+- 프로젝트 패시지(data/passages/jp + 기본 패시지)와 experiments/test_100_symptoms.py의 증상 질의 사용
+- sentence-transformers가 있으면 MiniLM 임베딩, 없으면 문자 n-gram TF-IDF → SVD(384차원)로 대체
+- --replicate N: 패시지 임베딩에 잡음을 더해 N배로 늘려 대규모 코퍼스의 메모리/지연을 추정
+  (복제본끼리는 거의 같은 벡터라 순위 비교가 무의미하므로 recall은 원본 코퍼스(N=1)에서만 측정)
+
+사용 예: python scripts/bench_quantization.py --replicate 1 50 --top-k 10
+"""
+
+import argparse
+import ast
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+os.environ.setdefault("RAG_INDEX_SNAPSHOT", "0")
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.rag_ann import ExactIndex, QuantizedIndex  # noqa: E402
+from backend.services_rag import DEFAULT_PASSAGES, load_disk_passages  # noqa: E402
+
+
+def load_symptom_queries() -> List[str]:
+    """실험 스크립트를 임포트하지 않고(무거운 초기화 회피) 증상 목록만 읽습니다."""
+    tree = ast.parse((ROOT / "experiments" / "test_100_symptoms.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", "") == "SYMPTOMS_100" for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    return []
+
+
+def embed(passages: List[str], queries: List[str], dim: int):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(analyzer="char", ngram_range=(2, 5), max_features=20000)
+        p = vectorizer.fit_transform(passages)
+        svd = TruncatedSVD(n_components=min(dim, p.shape[0] - 1, p.shape[1] - 1), random_state=0)
+        p_emb = svd.fit_transform(p).astype(np.float32)
+        q_emb = svd.transform(vectorizer.transform(queries)).astype(np.float32)
+        return p_emb, q_emb, "tfidf-svd"
+    model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+    return (
+        np.asarray(model.encode(passages, batch_size=32), dtype=np.float32),
+        np.asarray(model.encode(queries), dtype=np.float32),
+        "minilm",
+    )
+
+
+def recall_at_k(approx, exact, min_score: float = 1e-4) -> float:
+    """정답 상위 k개 중 근사 결과에 포함된 비율 (점수 ~0인 무관 패시지의 순서 차이는 제외)"""
+    relevant = [{i for i, s in e if s > min_score} for e in exact]
+    hits = sum(len({i for i, _ in a} & r) for a, r in zip(approx, relevant))
+    return hits / max(1, sum(len(r) for r in relevant))
+
+
+def per_query_ms(index, queries: np.ndarray, k: int, repeat: int) -> float:
+    index.search(queries[:1], k)  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            index.search(q[None, :], k)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replicate", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    passages = load_disk_passages() + DEFAULT_PASSAGES
+    queries = load_symptom_queries()
+    base, q_emb, kind = embed(passages, queries, args.dim)
+    # TF-IDF 대체 임베딩에서는 패시지와 겹치는 n-gram이 없는 질의가 영벡터가 되어 순위가 무의미하므로 제외
+    q_emb = q_emb[np.linalg.norm(q_emb, axis=1) > 1e-6]
+    print(f"embeddings: {kind}, passages={len(passages)}, queries={len(q_emb)}/{len(queries)}, dim={base.shape[1]}")
+    print(f"{'passages':>9} | {'mode':>6} | {'resident MB':>11} | {'ms/query':>8} | {'recall@k':>8}")
+
+    rng = np.random.default_rng(0)
+    for factor in args.replicate:
+        if factor == 1:
+            emb = base
+        else:
+            scale = 0.05 * np.abs(base).mean()
+            emb = np.vstack([base + scale * rng.normal(size=base.shape) for _ in range(factor)]).astype(np.float32)
+        exact = ExactIndex(emb)
+        reference = exact.search(q_emb, args.top_k) if factor == 1 else None
+        ms = per_query_ms(exact, q_emb, args.top_k, args.repeat)
+        print(f"{len(emb):>9} | {'fp32':>6} | {exact.vectors.nbytes / 2**20:>11.2f} | {ms:>8.3f} | {'1.000':>8}")
+        for mode in ("fp16", "int8"):
+            index = QuantizedIndex(emb, mode=mode, rescore_factor=args.rescore)
+            ms = per_query_ms(index, q_emb, args.top_k, args.repeat)
+            if factor == 1:
+                recall = f"{recall_at_k(index.search(q_emb, args.top_k), reference):.3f}"
+            else:
+                recall = "-"
+            print(f"{len(emb):>9} | {mode:>6} | {index.nbytes / 2**20:>11.2f} | {ms:>8.3f} | {recall:>8}")
+
+
+if __name__ == "__main__":
+    main()
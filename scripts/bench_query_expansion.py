@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+질의 확장 비용 벤치마크 (사전 크기별)
+- 기존 방식: 모든 키에 대해 `key in query` 부분 문자열 검사
+- 오토마톤: Aho-Corasick 한 번 스캔 (backend/rag_query_expansion.py)
+- 실제 사전(data/query_expansion.json)에 합성 한국어 키를 더해 크기를 늘립니다.
+
+사용 예: python scripts/bench_query_expansion.py --sizes 65 1000 10000 50000
+"""
+
+import argparse
+import ast
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.rag_query_expansion import QueryExpander  # noqa: E402
+
+
+def load_symptom_queries() -> List[str]:
+    tree = ast.parse((ROOT / "experiments" / "test_100_symptoms.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", "") == "SYMPTOMS_100" for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    return []
+
+
+def naive_expand(composite: Dict[str, List[str]], terms: Dict[str, List[str]], query: str) -> str:
+    """변경 전 구현과 동일한 키별 부분 문자열 검사"""
+    translated = []
+    for phrase, jp_terms in composite.items():
+        if phrase in query:
+            translated.extend(jp_terms)
+    for korean, jp_terms in terms.items():
+        if korean in query:
+            translated.extend(jp_terms)
+    return query + " " + " ".join(translated) if translated else query
+
+
+def grow_terms(terms: Dict[str, List[str]], size: int, seed: int = 0) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    out = dict(terms)
+    while len(out) < size:
+        # 완성형 한글 음절 2~4자의 합성 키
+        key = "".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 4)))
+        out.setdefault(key, ["合成語"])
+    return out
+
+
+def time_us(fn, queries: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[65, 1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = QueryExpander.from_file()
+    queries = load_symptom_queries()
+    print(f"{'entries':>8} | {'compile ms':>10} | {'naive us/q':>10} | {'automaton us/q':>14} | {'speedup':>7}")
+    for size in args.sizes:
+        terms = grow_terms(base.terms, size - len(base.composite))
+        start = time.perf_counter()
+        expander = QueryExpander(base.composite, terms)
+        compile_ms = (time.perf_counter() - start) * 1000
+        assert all(expander.expand(q) == naive_expand(base.composite, terms, q) for q in queries)
+        naive = time_us(lambda q: naive_expand(base.composite, terms, q), queries, args.repeat)
+        fast = time_us(expander.expand, queries, args.repeat)
+        print(f"{len(expander):>8} | {compile_ms:>10.1f} | {naive:>10.1f} | {fast:>14.1f} | {naive / fast:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+HybridRAG.search 마이크로 벤치마크
+- 코퍼스 크기별 질의당 지연(ms) 비교: 기존 파이썬 루프 융합 vs NumPy 벡터 융합 + argpartition
+- 코퍼스는 실제 패시지를 복제/변형해 원하는 크기로 만듭니다.
+
+사용 예: python scripts/bench_rag_search.py --sizes 200 1000 4000 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+os.environ.setdefault("RAG_INDEX_SNAPSHOT", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sklearn.metrics.pairwise import cosine_similarity  # noqa: E402
+
+from backend.rag_passages import authority_weight  # noqa: E402
+from backend.services_rag import DEFAULT_PASSAGES, HybridRAG, load_disk_passages  # noqa: E402
+
+QUERIES = [
+    "열이 39도입니다", "모기에 물렸어요", "머리가 아프고 어지러워요",
+    "배가 아파요", "頭痛がひどい", "cut bleeding", "말벌에 쏘였어요",
+]
+
+
+def legacy_search(rag: HybridRAG, query: str, top_k: int = 3):
+    """변경 전 구현: 패시지마다 authority_weight 호출 후 전체 정렬"""
+    enhanced = rag._translate_korean_to_japanese(query)
+    bm_scores = rag.bm25.get_scores(rag._tokenize(enhanced))
+    q_vec = rag.vectorizer.transform([enhanced])
+    tf_scores = cosine_similarity(q_vec, rag.tfidf)[0]
+    scores = []
+    for i in range(len(rag.passages)):
+        base = 0.2 * bm_scores[i] + 0.8 * tf_scores[i]
+        scores.append((i, base * authority_weight(rag.passages[i])))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return [(rag.passages[i], float(s)) for i, s in scores[:top_k]]
+
+
+def make_corpus(base: List[str], size: int) -> List[str]:
+    out: List[str] = []
+    i = 0
+    while len(out) < size:
+        out.append(f"{base[i % len(base)]} #{i}")
+        i += 1
+    return out
+
+
+def time_per_query(fn: Callable[[str], object], repeat: int) -> float:
+    fn(QUERIES[0])  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(QUERIES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    base = load_disk_passages() + DEFAULT_PASSAGES
+    print(f"{'passages':>9} | {'legacy ms':>10} | {'vector ms':>10} | {'speedup':>7}")
+    for size in args.sizes:
+        rag = HybridRAG(make_corpus(base, size))
+        legacy = time_per_query(lambda q: legacy_search(rag, q, args.top_k), args.repeat)
+        vector = time_per_query(lambda q: rag.search(q, top_k=args.top_k), args.repeat)
+        print(f"{size:>9} | {legacy:>10.2f} | {vector:>10.2f} | {legacy / vector:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
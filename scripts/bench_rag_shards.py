@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+HybridRAG 샤드 병렬 검색 벤치마크
+- 코퍼스 크기별 질의당 지연(ms): 단일 샤드 vs RAG_SEARCH_SHARDS=N (스레드 풀 + k-way 병합)
+- 코퍼스는 실제 패시지를 복제/변형해 원하는 크기로 만들고, 샤드 결과가 단일 경로와 같은지 확인합니다.
+
+사용 예: python scripts/bench_rag_shards.py --sizes 20000 80000 --shards 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("RAG_INDEX_SNAPSHOT", "0")
+os.environ["RAG_SHARD_MIN_PASSAGES"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.services_rag import DEFAULT_PASSAGES, HybridRAG, load_disk_passages  # noqa: E402
+
+QUERIES = [
+    "열이 39도입니다", "모기에 물렸어요", "머리가 아프고 어지러워요",
+    "배가 아파요", "頭痛がひどい", "cut bleeding", "말벌에 쏘였어요",
+]
+
+
+def make_corpus(base, size):
+    out = []
+    i = 0
+    while len(out) < size:
+        out.append(f"{base[i % len(base)]} #{i}")
+        i += 1
+    return out
+
+
+def per_query_ms(rag: HybridRAG, repeat: int, batch: bool) -> float:
+    rag.search_batch(QUERIES[:1], top_k=3)  # 워밍업 (샤드 뷰/스레드 풀 생성)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if batch:
+            rag.search_batch(QUERIES, top_k=3)
+        else:
+            for q in QUERIES:
+                rag.search(q, top_k=3)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(QUERIES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 80000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = load_disk_passages() + DEFAULT_PASSAGES
+    print(f"cpu_count={os.cpu_count()}")
+    print(f"{'passages':>9} | {'shards':>6} | {'single ms/q':>11} | {'batch(7) ms/q':>13} | {'speedup':>7}")
+    for size in args.sizes:
+        rag = HybridRAG(make_corpus(base, size))
+        baseline = None
+        reference = None
+        for shards in args.shards:
+            os.environ["RAG_SEARCH_SHARDS"] = str(shards)
+            result = rag.search_batch(QUERIES, top_k=3)
+            if reference is None:
+                reference = result
+            assert result == reference, "sharded results differ from single-shard path"
+            single = per_query_ms(rag, args.repeat, batch=False)
+            batch = per_query_ms(rag, args.repeat, batch=True)
+            baseline = baseline or single
+            print(f"{size:>9} | {shards:>6} | {single:>11.2f} | {batch:>13.2f} | {baseline / single:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
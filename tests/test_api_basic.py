@@ -12,6 +12,7 @@ def test_health(client):
     body = res.json()
     assert body.get("status") == "healthy"
     assert "+09:00" in body.get("timestamp", "") or body.get("timestamp")
+    assert "rag_generation" in body
 
 
 def test_advice_mocked(client):
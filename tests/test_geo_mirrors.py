@@ -0,0 +1,71 @@
+import threading
+import time
+
+from backend.geo_mirrors import MirrorPool
+
+
+def test_mirror_pool_hedges_ranks_and_skips_dead_mirrors():
+    pool = MirrorPool(["slow", "fast"], hedge_min_sec=0.05)
+    calls = []
+
+    def send(url):
+        calls.append(url)
+        time.sleep(0.5 if url == "slow" else 0.01)
+        return url
+
+    # 첫 미러가 느리면 헤징 지연 뒤 다음 미러에도 보내 먼저 온 응답을 사용
+    start = time.monotonic()
+    assert pool.request(send, timeout=2.0) == "fast"
+    assert time.monotonic() - start < 0.3 and calls == ["slow", "fast"]
+    time.sleep(0.6)  # 진 요청도 끝나면 지연이 기록되어 순위에 반영
+    assert pool.ranked() == ["fast", "slow"]
+
+    # 실패는 기다리지 않고 다음 미러로, 연속 실패한 미러는 서킷이 열려 요청하지 않음
+    dead = MirrorPool(["a", "b"], hedge_min_sec=1.0, failures=2, cooldown_sec=60)
+    attempts = []
+
+    def fail(url):
+        attempts.append(url)
+        raise ConnectionError(url)
+
+    start = time.monotonic()
+    assert dead.request(fail, timeout=2.0) is None and dead.request(fail, timeout=2.0) is None
+    assert time.monotonic() - start < 0.5 and len(attempts) == 4
+    assert dead.ranked() == [] and dead.request(fail, timeout=2.0) is None and len(attempts) == 4
+    assert all(s["open"] and s["error_rate"] == 1.0 for s in dead.stats().values())
+
+
+def test_mirror_pool_single_half_open_probe_and_no_queueing_behind_lost_hedges():
+    pool = MirrorPool(["m"], failures=1, cooldown_sec=0.05)
+    assert pool.request(lambda url: 1 / 0, timeout=1.0) is None and pool.stats()["m"]["open"]
+    time.sleep(0.1)
+    probes = []
+
+    def slow_ok(url):
+        probes.append(url)
+        time.sleep(0.2)
+        return url
+
+    # 쿨다운 뒤 동시에 들어온 요청 중 하나만 시험 요청을 보냄
+    threads = [threading.Thread(target=pool.request, args=(slow_ok, 1.0)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert probes == ["m"] and not pool.stats()["m"]["open"]
+
+    # 응답 없는 미러에 붙잡힌 헤지가 많아도 새 요청은 줄 서지 않고 빠른 미러에서 바로 응답
+    hedged = MirrorPool(["hung", "fast"], hedge_min_sec=0.02)
+
+    def send(url):
+        time.sleep(1.0 if url == "hung" else 0.01)
+        return url
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(hedged.request(send, 2.0))) for _ in range(16)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["fast"] * 16 and time.monotonic() - start < 0.5
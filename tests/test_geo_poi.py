@@ -0,0 +1,170 @@
+import math
+
+from backend.geo_poi_store import AddressWorker, POIStore, circle_bbox, geohash, nearby_poi_groups, nearby_pois
+
+
+SHINJUKU = (35.6909, 139.7003)
+
+
+def _element(osm_id, amenity, lat, lon, name, **tags):
+    return {"type": "node", "id": osm_id, "lat": lat, "lon": lon,
+            "tags": {"amenity": amenity, "name": name, **tags}}
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def test_poi_store_nearest_and_refresh_only_stale_tiles(tmp_path):
+    store = POIStore(db_path=str(tmp_path / "poi.sqlite"))
+    lat, lon = SHINJUKU
+    elements = [
+        _element(1, "hospital", lat + 0.010, lon, "東京医科大学病院", **{"addr:city": "新宿区"}),
+        _element(2, "clinic", lat + 0.002, lon + 0.001, "新宿クリニック"),
+        _element(3, "pharmacy", lat - 0.001, lon, "新宿薬局"),
+        _element(4, "hospital", lat + 0.2, lon, "遠い病院"),
+        {"type": "way", "id": 5, "center": {"lat": lat + 0.005, "lon": lon}, "tags": {"amenity": "hospital", "name": "中央病院"}},
+    ]
+    calls = []
+
+    def fetch(bbox, categories):
+        calls.append((bbox, tuple(categories)))
+        return elements
+
+    hits = nearby_pois(store, lat, lon, ("hospital", "clinic"), 2000, 5, fetch)
+    assert [h["name"] for h in hits] == ["新宿クリニック", "中央病院", "東京医科大学病院"]
+    assert abs(hits[0]["distance"] - _haversine_km(lat, lon, lat + 0.002, lon + 0.001)) < 1e-6
+    assert hits[2]["address"] == "新宿区"
+
+    # 받아 온 셀 안의 다른 요청은 로컬 인덱스만 사용, 다른 카테고리는 갱신 필요
+    nearby_pois(store, lat + 0.003, lon, ("hospital",), 1000, 5, fetch)
+    assert len(calls) == 1 and store.stats()["tile_hits"] > 0
+    assert [h["name"] for h in nearby_pois(store, lat, lon, ("pharmacy",), 1500, 5, fetch)] == ["新宿薬局"]
+    assert len(calls) == 2
+
+    # 재시작/다른 워커에서도 SQLite 타일로 적중, 갱신 응답에서 빠진 POI는 셀 안에서 삭제
+    reopened = POIStore(db_path=str(tmp_path / "poi.sqlite"))
+    assert reopened.covers(lat, lon, 2000, ("hospital", "clinic"))
+    assert "東京医科大学病院" in [h["name"] for h in reopened.nearest(lat, lon, ("hospital",), n=5)]
+    store.ingest(elements[1:], ("hospital", "clinic"), bbox=circle_bbox(lat, lon, 4000))
+    assert reopened.covers(lat, lon, 2000, ("hospital", "clinic"))  # 더 새로운 타일을 보고 트리를 다시 읽음
+    assert "東京医科大学病院" not in [h["name"] for h in reopened.nearest(lat, lon, ("hospital",), n=5)]
+
+    # TTL이 지난 셀은 다시 받음
+    expired = POIStore(db_path=str(tmp_path / "poi.sqlite"), ttl_sec=0)
+    assert not expired.covers(lat, lon, 500, ("pharmacy",))
+    assert geohash(lat, lon, 6) == "xn774c"
+
+
+def test_address_worker_fills_cache_off_the_request_path(tmp_path):
+    store = POIStore(db_path=str(tmp_path / "poi.sqlite"))
+    lat, lon = SHINJUKU
+    store.ingest([_element(1, "clinic", lat, lon, "新宿クリニック")], ("clinic",), bbox=circle_bbox(lat, lon, 3000))
+    calls = []
+
+    def resolve(la, lo):
+        calls.append((la, lo))
+        return "東京都新宿区西新宿"
+
+    worker = AddressWorker(store, resolve, interval_sec=0)
+    items = store.nearest(lat, lon, ("clinic",))
+    assert worker.fill(items) == 1 and items[0]["address"] == ""  # 응답은 기다리지 않음
+    worker.fill(store.nearest(lat, lon, ("clinic",)))  # 같은 좌표는 한 번만 대기열에
+    assert worker.wait_idle() and len(calls) == 1
+
+    items = store.nearest(lat, lon, ("clinic",))
+    assert worker.fill(items) == 0 and items[0]["address"] == "東京都新宿区西新宿"
+    # 다른 워커/재시작: POI 행에도 기록되어 트리에서 바로 나옴
+    reopened = POIStore(db_path=str(tmp_path / "poi.sqlite"))
+    assert reopened.nearest(lat, lon, ("clinic",))[0]["address"] == "東京都新宿区西新宿"
+
+    # 호출 간격은 DB에 예약되어 모든 워커가 공유
+    first = store.reserve_slot("nominatim", 1.0)
+    assert reopened.reserve_slot("nominatim", 1.0) - first >= 1.0 - 1e-6
+
+
+def test_nearby_poi_groups_fetch_hospitals_and_pharmacies_in_one_query(tmp_path):
+    store = POIStore(db_path=str(tmp_path / "poi.sqlite"))
+    lat, lon = SHINJUKU
+    elements = [
+        _element(1, "hospital", lat + 0.004, lon, "中央病院"),
+        _element(1, "hospital", lat + 0.004, lon, "中央病院"),  # 미러/셀 경계 중복 응답
+        _element(2, "clinic", lat + 0.001, lon, "駅前クリニック"),
+        _element(3, "pharmacy", lat - 0.002, lon, "新宿薬局"),
+    ]
+    calls = []
+
+    def fetch(bbox, categories):
+        calls.append(tuple(categories))
+        return elements
+
+    groups = {"hospitals": (("hospital", "clinic"), 2000, 5), "pharmacies": (("pharmacy",), 1500, 5)}
+    found = nearby_poi_groups(store, lat, lon, groups, fetch)
+    assert calls == [("hospital", "clinic", "pharmacy")]
+    assert [h["name"] for h in found["hospitals"]] == ["駅前クリニック", "中央病院"]
+    assert [p["name"] for p in found["pharmacies"]] == ["新宿薬局"]
+    nearby_poi_groups(store, lat, lon, groups, fetch)
+    assert len(calls) == 1
+
+
+def test_valid_empty_response_stamps_coverage_and_remark_keeps_stored_tiles(tmp_path, monkeypatch):
+    from backend import services_geo
+    from backend.geo_mirrors import MirrorPool
+
+    lat, lon = SHINJUKU
+    path = str(tmp_path / "poi.sqlite")
+    store = POIStore(db_path=path)
+    store.ingest([_element(1, "pharmacy", lat, lon, "新宿薬局")], ("pharmacy",), bbox=circle_bbox(lat, lon, 3000))
+
+    # remark 없는 빈 응답은 완전한 응답 → 해당 영역에 그 카테고리가 없다는 것으로 타일을 기록
+    calls = []
+
+    def fetch_empty(bbox, categories):
+        calls.append(bbox)
+        return []
+
+    empty = POIStore(db_path=str(tmp_path / "empty.sqlite"))
+    assert nearby_pois(empty, lat, lon, ("hospital",), 1500, 5, fetch_empty) == []
+    assert empty.covers(lat, lon, 1500, ("hospital",))
+    nearby_pois(empty, lat, lon, ("hospital",), 1500, 5, fetch_empty)
+    assert len(calls) == 1
+
+    # 갱신이 실패(None)하면 만료된 타일이라도 저장된 결과로 응답
+    expired = POIStore(db_path=path, ttl_sec=0)
+    assert [p["name"] for p in nearby_pois(expired, lat, lon, ("pharmacy",), 1500, 5, lambda b, c: None)] == ["新宿薬局"]
+
+    # 200 + remark(시간 초과)는 미러 실패로 기록되고 None → 저장된 타일로 응답
+    class Response:
+        ok = True
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"remark": "runtime error: Query timed out", "elements": []}
+
+    monkeypatch.setattr(services_geo.requests, "post", lambda *a, **k: Response())
+    monkeypatch.setattr(services_geo, "OVERPASS_MIRRORS", MirrorPool(["mirror"], failures=1))
+    assert services_geo.fetch_overpass_pois(circle_bbox(lat, lon, 500), ("pharmacy",)) is None
+    assert services_geo.OVERPASS_MIRRORS.stats()["mirror"]["error_rate"] == 1.0
+
+
+def test_category_absent_from_area_is_still_cached():
+    # 의원/약국은 있고 병원은 없는 지역: 병원 타일도 기록되어 다시 묻지 않음
+    store = POIStore(db_path=":memory:")
+    lat, lon = SHINJUKU
+    elements = [_element(1, "clinic", lat + 0.001, lon, "駅前クリニック"), _element(2, "pharmacy", lat, lon, "新宿薬局")]
+    calls = []
+
+    def fetch(bbox, categories):
+        calls.append(tuple(categories))
+        return elements
+
+    groups = {"hospitals": (("hospital",), 1500, 5), "pharmacies": (("pharmacy",), 1500, 5)}
+    for _ in range(5):
+        found = nearby_poi_groups(store, lat, lon, groups, fetch)
+    assert calls == [("hospital", "pharmacy")]
+    assert found["hospitals"] == [] and [p["name"] for p in found["pharmacies"]] == ["新宿薬局"]
+    assert store.stats()["tile_hit_rate"] >= 0.8
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from backend import services_pdf_processor as pdf
+from backend.services_pdf_processor import PDFProcessor, iter_pdf_documents, iter_pdf_passages
+
+CALLS = []
+
+
+def _fake_pages(self, pdf_path):
+    """PDF 라이브러리 대신: 파일 내용을 폼 피드(\f)로 나눠 페이지로 사용"""
+    CALLS.append(os.path.basename(pdf_path))
+    with open(pdf_path, "r", encoding="utf-8") as f:
+        for page_num, text in enumerate(f.read().split("\f"), 1):
+            yield page_num, text
+
+
+@pytest.fixture
+def pdf_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_PDF_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(PDFProcessor, "page_extractors", lambda self: [("fake", self.iter_pages_fake, 1)])
+    monkeypatch.setattr(PDFProcessor, "iter_pages_fake", _fake_pages, raising=False)
+    CALLS.clear()
+    directory = tmp_path / "pdfs"
+    directory.mkdir()
+    return directory
+
+
+def _documents(directory, workers=1):
+    return [(header["filename"], header["pages"], list(pages)) for header, pages in iter_pdf_documents(str(directory), workers)]
+
+
+def test_pdf_cache_hit_skips_extraction(pdf_dir):
+    (pdf_dir / "a.pdf").write_text("発熱の対処。\f頭痛の対処。", encoding="utf-8")
+
+    first = _documents(pdf_dir)
+    assert CALLS == ["a.pdf"]
+    assert first == [("a.pdf", 2, [(1, "発熱の対処。"), (2, "頭痛の対処。")])]
+
+    assert _documents(pdf_dir) == first
+    assert CALLS == ["a.pdf"]  # 두 번째는 캐시만 읽음
+
+    # 이름만 바뀐 같은 내용은 캐시를 쓰되 현재 파일명으로 보고
+    (pdf_dir / "a.pdf").rename(pdf_dir / "b.pdf")
+    assert _documents(pdf_dir)[0][0] == "b.pdf"
+    assert CALLS == ["a.pdf"]
+
+
+def test_pdf_cache_invalidated_by_file_change_and_chunker_version(pdf_dir, monkeypatch):
+    target = pdf_dir / "a.pdf"
+    target.write_text("古い内容", encoding="utf-8")
+    _documents(pdf_dir)
+
+    target.write_text("新しい内容\f二ページ目", encoding="utf-8")
+    assert _documents(pdf_dir) == [("a.pdf", 2, [(1, "新しい内容"), (2, "二ページ目")])]
+    assert CALLS == ["a.pdf", "a.pdf"]
+
+    _documents(pdf_dir)
+    assert len(CALLS) == 2
+
+    monkeypatch.setattr(pdf, "CHUNKER_VERSION", pdf.CHUNKER_VERSION + 1)
+    _documents(pdf_dir)
+    assert len(CALLS) == 3
+
+
+def test_pdf_pool_output_follows_filename_order_and_streams(pdf_dir):
+    names = [f"{i:02d}.pdf" for i in range(6)]
+    for i, name in enumerate(reversed(names)):
+        (pdf_dir / name).write_text("本文 " * (200 * (i + 1)) + f"\f{name}", encoding="utf-8")
+
+    documents = iter_pdf_documents(str(pdf_dir), workers=3)
+    header, pages = next(documents)  # 첫 결과는 나머지 추출을 기다리지 않고 나옴
+    assert header["filename"] == names[0]
+    rest = [h["filename"] for h, _ in documents]
+    assert [header["filename"]] + rest == names
+    assert list(pages)[-1] == (2, names[0])
+
+    passages = list(iter_pdf_passages(str(pdf_dir)))  # 캐시 적중 경로
+    sources = [p.split(",")[0][len("[PDF: "):] for p in passages]
+    assert list(dict.fromkeys(sources)) == names
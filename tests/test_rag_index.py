@@ -0,0 +1,515 @@
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+from backend.rag_ann import ExactIndex, IVFIndex, QuantizedIndex, build_dense_index
+from backend.rag_bm25 import PostingsBM25
+from backend.rag_chunker import chunk_pages
+from backend.rag_dedup import NearDuplicateIndex
+from backend.rag_embedding_store import EmbeddingStore
+from backend.rag_passages import PassageStore, describe_passage
+from backend.rag_query_expansion import QueryExpander
+from backend.rag_registry import IndexRegistry
+from backend.rag_result_cache import SearchResultCache
+from backend import rag_shards
+from backend.rag_shards import configured_shards, get_shard_pool
+from backend.rag_tokenizer import TokenVocabulary, build_token_arrays, get_analyzer, iter_typed_tokens, tokenize
+from backend.rag_topk import top_k_indices
+from backend.services_rag import HybridRAG
+
+
+PASSAGES = [
+    "熱があるときはぬるま湯で体を冷やし、水分を十分にとりましょう。アセトアミノフェンは比較的安全です。",
+    "頭痛の応急処置：安静にし、暗い部屋で休みます。痛みが激しい場合は鎮痛剤を服用してください。",
+    "蚊に刺された場合は患部を清潔に保ち、かゆみ止めを塗布します。",
+    "出血している傷は直接圧迫で止血し、きれいな水で洗浄後、滅菌ガーゼを当ててください。",
+    "めまいの応急処置：安静にし、横になって休みます。fdma.go.jp 消防庁",
+]
+
+QUERIES = ["열이 39도입니다", "모기에 물렸어요", "頭痛がひどい", "cut bleeding 出血"]
+
+
+def test_snapshot_roundtrip(tmp_path):
+    rag = HybridRAG(PASSAGES)
+    rag.save(tmp_path, "fp1")
+
+    loaded = HybridRAG.load(tmp_path, "fp1")
+    assert loaded is not None
+    assert list(loaded.passages) == PASSAGES
+    for q in QUERIES:
+        a = rag.search(q, top_k=3)
+        b = loaded.search(q, top_k=3)
+        assert [p for p, _ in a] == [p for p, _ in b]
+        assert np.allclose([s for _, s in a], [s for _, s in b])
+
+
+def test_snapshot_fingerprint_mismatch(tmp_path):
+    HybridRAG(PASSAGES).save(tmp_path, "fp1")
+    assert HybridRAG.load(tmp_path, "fp2") is None
+
+
+def test_top_k_indices_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=200).astype(float)
+    expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    for k in (1, 3, 17, 200, 500):
+        assert list(top_k_indices(scores, k)) == expected[:k]
+
+
+def _synthetic_corpus(n_docs=300, vocab=60, seed=1):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    # Zipf 분포 비슷하게 앞쪽 단어가 자주 등장
+    p = 1.0 / np.arange(1, vocab + 1)
+    p /= p.sum()
+    return [list(rng.choice(words, size=rng.integers(3, 40), p=p)) for _ in range(n_docs)], words
+
+
+def test_postings_bm25_matches_rank_bm25():
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    corpus, words = _synthetic_corpus()
+    ours = PostingsBM25.from_tokenized(corpus)
+    ref = rank_bm25.BM25Okapi(corpus)
+    for query in (["w0"], ["w3", "w7", "w3"], ["w59", "없는단어"], words[:10]):
+        assert np.array_equal(ours.get_scores(query), ref.get_scores(query))
+
+
+def _reference_search(rag, query, top_k):
+    """독립 기준: 질의 하나씩 BM25 get_scores + TF-IDF 코사인, 메타데이터의 패시지별 출처 가중치, 전체 안정 정렬"""
+    enhanced = rag._translate_korean_to_japanese(query)
+    bm_scores = rag.bm25.get_scores(rag._tokenize(enhanced))
+    tf_scores = cosine_similarity(rag.vectorizer.transform([enhanced]), rag.tfidf)[0]
+    scores = [
+        (0.2 * bm_scores[i] + 0.8 * tf_scores[i]) * rag.metadata.authority[i]
+        for i in range(len(rag.passages))
+    ]
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])[:top_k]
+    return [(rag.passages[i], scores[i]) for i in order]
+
+
+def test_search_batch_matches_single_search():
+    rag = HybridRAG(PASSAGES)
+    per_query, merged = rag.search_batch(QUERIES + [""], top_k=2)
+    assert per_query[-1] == []
+    for q, hits in zip(QUERIES, per_query):
+        reference = _reference_search(rag, q, top_k=2)
+        assert [p for p, _ in hits] == [p for p, _ in reference]
+        assert np.allclose([s for _, s in hits], [s for _, s in reference])
+    # 통합 결과는 패시지 중복 없이 점수 내림차순
+    assert len(merged) == 2
+    assert len({p for p, _ in merged}) == len(merged)
+    assert merged[0][1] >= merged[1][1]
+
+
+def test_bm25_append_matches_full_build():
+    corpus, words = _synthetic_corpus()
+    full = PostingsBM25.from_tokenized(corpus + [["새단어", "w1"]])
+    appended = PostingsBM25.from_tokenized(corpus[:250]).append_documents(corpus[250:] + [["새단어", "w1"]])
+    assert appended.terms == full.terms
+    for query in (["w0"], ["w3", "w7", "w3"], ["새단어"], words[:10]):
+        assert np.array_equal(appended.get_scores(query), full.get_scores(query))
+
+
+def test_apply_delta_appends_and_tombstones(tmp_path):
+    rag = HybridRAG(PASSAGES[:3])
+    new_passage = "やけどの応急処置：流水で20分以上冷やします。"
+    updated = rag.apply_delta([new_passage], deleted=[2])
+    # 원본 인덱스는 그대로
+    assert len(rag.passages) == 3 and rag.n_deleted == 0
+    assert updated.search("やけど 冷やす", top_k=1)[0][0] == new_passage
+    assert all(p != PASSAGES[2] for p, _ in updated.search("蚊に刺された", top_k=4))
+    assert updated.pending_delta == 2
+
+    updated.save(tmp_path, "fp1")
+    loaded = HybridRAG.load(tmp_path, "fp1")
+    assert loaded.n_deleted == 1 and loaded.pending_delta == 2
+
+    compacted = updated.compact()
+    assert compacted.passages == PASSAGES[:2] + [new_passage]
+    assert compacted.pending_delta == 0
+
+
+def test_registry_swap_drains_old_generation_after_readers():
+    registry = IndexRegistry("test")
+    old, new = object(), object()
+    assert registry.publish(old) == 1
+    with registry.reader() as held:
+        assert held is old
+        assert registry.publish(new) == 2
+        # 기존 reader는 교체 후에도 같은 세대를 계속 사용
+        assert held is old
+        with registry.reader() as fresh:
+            assert fresh is new
+        assert registry.stats()["draining_generations"] == [1]
+    stats = registry.stats()
+    assert stats["generation"] == 2
+    assert stats["draining_generations"] == [] and stats["drained_generations"] == 1
+    # 현재 세대가 기대와 다르면 게시하지 않음
+    assert registry.publish(object(), expected=old) == 0
+    assert registry.current() is new
+
+
+def test_ivf_index_matches_exact_when_probing_all_lists():
+    rng = np.random.default_rng(3)
+    emb = rng.normal(size=(500, 32)).astype(np.float32)
+    queries = rng.normal(size=(5, 32)).astype(np.float32)
+    exact = ExactIndex(emb).search(queries, 5)
+    ivf = IVFIndex(emb, nlist=10, nprobe=10)
+    for a, e in zip(ivf.search(queries, 5), exact):
+        assert [i for i, _ in a] == [i for i, _ in e]
+        assert np.allclose([s for _, s in a], [s for _, s in e], atol=1e-5)
+    # 소규모 코퍼스는 전수 검색 유지
+    assert build_dense_index(emb, backend="auto").name == "exact"
+
+
+def test_exact_index_keeps_mmap_embeddings_without_copy(tmp_path):
+    rng = np.random.default_rng(5)
+    emb = rng.normal(size=(50, 16)).astype(np.float32)
+    store = EmbeddingStore(tmp_path, "model")
+    texts = [f"passage {i}" for i in range(50)]
+    mapped = store.get_or_encode(texts, lambda batch: emb[[int(t.split()[1]) for t in batch]])
+    index = ExactIndex(mapped)
+    assert index.vectors is mapped and isinstance(index.vectors, np.memmap)
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+    expected = cosine_similarity(queries, emb)
+    for row, hits in zip(expected, index.search(queries, 5)):
+        assert [i for i, _ in hits] == list(np.argsort(-row)[:5])
+        assert np.allclose([s for _, s in hits], row[[i for i, _ in hits]], atol=1e-5)
+
+
+def test_embedding_store_encodes_only_new_passages(tmp_path):
+    encoded = []
+
+    def encode(texts):
+        encoded.append(list(texts))
+        return np.asarray([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+    first = EmbeddingStore(tmp_path, "model-a").get_or_encode(PASSAGES, encode)
+    assert first.shape == (len(PASSAGES), 2) and encoded == [PASSAGES]
+
+    # 재시작 후 같은 코퍼스는 인코딩 없이 mmap 뷰로 로드
+    again = EmbeddingStore(tmp_path, "model-a").get_or_encode(PASSAGES, encode)
+    assert isinstance(again, np.memmap) and len(encoded) == 1
+    assert np.array_equal(again, first)
+
+    # 패시지 하나만 바뀌면 그 패시지만 인코딩
+    changed = PASSAGES[:-1] + ["새 패시지"]
+    store = EmbeddingStore(tmp_path, "model-a", max_shards=1)
+    result = store.get_or_encode(changed, encode)
+    assert encoded[-1] == ["새 패시지"]
+    assert np.array_equal(result[:-1], first[:-1])
+    # 샤드 상한을 넘으면 현재 코퍼스 순서로 병합되어 다시 무복사 경로
+    assert store.shard_count == 1 and len(store) == len(changed)
+    assert isinstance(store.get_or_encode(changed, encode), np.memmap)
+
+
+def test_embedding_store_concurrent_writers_keep_keys_and_vectors_paired(tmp_path):
+    # 두 워커(별도 인스턴스, 같은 디렉토리)가 동시에 새 패시지를 인코딩/병합해도 샤드가 섞이지 않음
+    def encode(texts):
+        time.sleep(0.05)  # 샤드 번호 선택과 게시 사이를 벌려 경합을 재현
+        return np.asarray([[len(t), sum(map(ord, t))] for t in texts], dtype=np.float32)
+
+    corpora = [[f"worker{w} passage {i}" for i in range(5)] for w in range(2)]
+    barrier = threading.Barrier(2)
+    results, errors = {}, []
+
+    def worker(w):
+        store = EmbeddingStore(tmp_path, "model-a", max_shards=1)
+        barrier.wait()
+        try:
+            for round_ in range(3):
+                texts = corpora[w] + [f"worker{w} round {round_}"]
+                results[w] = (texts, np.array(store.get_or_encode(texts, encode)))
+        except Exception as e:  # pragma: no cover - 실패 시 아래 assert로 보고
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    for texts, vectors in results.values():
+        assert np.array_equal(vectors, encode(texts))
+
+
+@pytest.mark.parametrize("mode", ["fp16", "int8"])
+def test_quantized_index_rescores_with_float32(mode):
+    rng = np.random.default_rng(4)
+    emb = rng.normal(size=(400, 48)).astype(np.float32)
+    queries = rng.normal(size=(5, 48)).astype(np.float32)
+    index = QuantizedIndex(emb, mode=mode, rescore_factor=4)
+    assert index.nbytes < ExactIndex(emb).vectors.nbytes
+    for a, e in zip(index.search(queries, 5), ExactIndex(emb).search(queries, 5)):
+        assert [i for i, _ in a] == [i for i, _ in e]
+        # 재채점 점수는 float32 정확값
+        assert np.allclose([s for _, s in a], [s for _, s in e], atol=1e-5)
+
+
+def test_query_embedding_cache_encodes_original_text_once(tmp_path, monkeypatch):
+    from backend import services_advanced_rag as advanced
+
+    class CountingModel:
+        def __init__(self, name):
+            self.calls = []
+
+        def encode(self, texts, **kwargs):
+            self.calls.append(list(texts))
+            return np.asarray([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+
+    monkeypatch.setenv("RAG_EMBED_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(advanced, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+    monkeypatch.setattr(advanced, "SentenceTransformer", CountingModel, raising=False)
+    # 리랭킹이 확장 질의를 인코딩하도록 NLTK 없이도 확장 하나를 고정
+    monkeypatch.setattr(advanced.AdvancedRAG, "_expand_query", lambda self, q: [q, q + " fever"])
+    rag = advanced.AdvancedRAG(PASSAGES)
+    model = rag.embedding_model
+    model.calls.clear()  # 패시지 인코딩 제외
+
+    rag.search("Headache 頭痛", top_k=3)
+    # 첫 검색: 질의 배치 1회 + 확장 질의 배치 1회, 모델에는 정규화 전 원문
+    assert model.calls == [["Headache 頭痛"], ["Headache 頭痛 fever"]]
+    # 공백/대소문자만 다른 질의는 인코딩 없음
+    rag.search("  headache   頭痛 ", top_k=3)
+    assert len(model.calls) == 2
+    assert rag.get_search_stats()["query_cache"] == {"size": 2, "hits": 2, "misses": 2}
+
+
+def test_query_expander_matches_substring_scan():
+    expander = QueryExpander(
+        {"어지러움과 구토": ["めまい", "嘔吐"]},
+        {"열": ["熱"], "발열": ["発熱"], "구토": ["嘔吐"], "어지러움": ["めまい"]},
+    )
+    # 복합 문구 → 단일 용어(사전 순서), 겹치는 키(열/발열)도 모두 매칭
+    assert expander.expand("발열 어지러움과 구토") == "발열 어지러움과 구토 めまい 嘔吐 熱 発熱 嘔吐 めまい"
+    assert expander.expand("두통") == "두통"
+
+
+def test_single_pass_tokenizer_matches_separate_scans():
+    text = "頭痛 Fever 39度 abc123 서울に住むHeadache 2回 x"
+    legacy = (
+        [w.lower() for w in re.findall(r"[가-힣あ-んア-ン一-龯]+", text)]
+        + [w.lower() for w in re.findall(r"\b[a-zA-Z]+\b", text)]
+        + re.findall(r"\d+", text)
+    )
+    # 등장 순서만 다르고 토큰 빈도는 동일 (BM25는 순서 무관)
+    assert Counter(tokenize(text)) == Counter(legacy)
+    assert [k for k, _ in iter_typed_tokens("熱 39 fever")] == ["cjk", "num", "latin"]
+
+    vocab = TokenVocabulary()
+    ids, offsets = build_token_arrays([["a", "b", "a"], [], ["b"]], vocab, unique=True)
+    assert offsets.tolist() == [0, 2, 2, 3]
+    assert ids.tolist() == [0, 1, 1]
+    assert vocab.lookup(["b", "zzz"]).tolist() == [1]
+
+
+def test_cjk_ngram_analyzer_matches_inside_kanji_runs(tmp_path):
+    name, analyze = get_analyzer("cjk-ngram")
+    assert analyze("頭痛薬 fever 39") == ["頭痛", "痛薬", "頭痛薬", "fever", "39"]
+    # regex 분석기는 "頭痛の応急処置" 같은 덩어리 토큰이라 "頭痛"과 매칭되지 않음
+    rag = HybridRAG(PASSAGES, analyzer="cjk-ngram")
+    assert rag.bm25.get_scores(rag._tokenize("頭痛"))[1] > 0
+    assert not np.any(HybridRAG(PASSAGES, analyzer="regex").bm25.get_scores(["頭痛"]) > 0)
+    # 스냅샷은 포스팅을 만든 분석기를 기록해 질의도 같은 분석기로 토큰화
+    rag.save(tmp_path, "fp1")
+    assert HybridRAG.load(tmp_path, "fp1").analyzer == "cjk-ngram"
+
+
+def test_snapshot_built_with_unavailable_analyzer_is_rebuilt(tmp_path, monkeypatch):
+    from backend import rag_tokenizer
+
+    # 형태소 분석기가 있는 프로세스에서 dict 분석기로 스냅샷을 만들고
+    monkeypatch.setattr(rag_tokenizer, "_load_segmenter", lambda: lambda run: [run])
+    rag = HybridRAG(PASSAGES, analyzer="dict")
+    assert rag.analyzer == "dict"
+    rag.save(tmp_path, "fp1")
+    assert HybridRAG.load(tmp_path, "fp1").analyzer == "dict"
+    # 분석기가 없어 cjk-ngram으로 대체되는 프로세스는 그 스냅샷을 쓰지 않음 (질의 토큰이 포스팅과 다름)
+    monkeypatch.setattr(rag_tokenizer, "_load_segmenter", lambda: None)
+    assert HybridRAG.load(tmp_path, "fp1") is None
+
+
+def test_result_cache_hits_and_invalidates_on_publish():
+    registry = IndexRegistry("test")
+    rag = HybridRAG(PASSAGES)
+    registry.publish(rag)
+    cache = SearchResultCache(registry, maxsize=2, ttl=60, near_dup_threshold=0.6)
+
+    per_query, merged = cache.search_batch(["頭痛がひどい", "cut bleeding 出血"], top_k=3)
+    expected, expected_merged = rag.search_batch(["頭痛がひどい", "cut bleeding 出血"], top_k=3)
+    assert per_query == expected and merged == expected_merged
+    # 공백/대소문자 차이는 같은 키, 한 글자 다른 질의는 근사 중복으로 적중
+    assert cache.search("  CUT   bleeding 出血 ", top_k=3) == expected[1]
+    assert cache.search("cut bleeding 出血!", top_k=3) == expected[1]
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (2, 1, 2)
+
+    registry.publish(rag.apply_delta(["頭痛がひどいときは水を飲みます。"]))
+    assert len(cache) == 0 and cache.stats()["generation"] == 2
+    cache.search("頭痛がひどい", top_k=3)
+    assert cache.stats()["misses"] == 3
+
+
+def test_result_cache_miss_searches_original_query(monkeypatch):
+    registry = IndexRegistry("test")
+    rag = HybridRAG(PASSAGES)
+    registry.publish(rag)
+    cache = SearchResultCache(registry, maxsize=8, ttl=60)
+    searched = []
+    search_batch_ids = rag.search_batch_ids
+
+    def spy(queries, top_k=2):
+        searched.extend(queries)
+        return search_batch_ids(queries, top_k=top_k)
+
+    monkeypatch.setattr(rag, "search_batch_ids", spy)
+    # 키는 정규화 질의지만 검색은 키별 첫 원문으로 — 캐시를 거쳐도 직접 검색과 같은 결과
+    query = "ＣＵＴ Bleeding 出血"
+    assert cache.search_batch([query, " cut  bleeding 出血"], top_k=3)[0][0] == rag.search(query, top_k=3)
+    assert searched[0] == query and searched.count(" cut  bleeding 出血") == 0
+
+
+def test_sharded_search_matches_single_shard(monkeypatch):
+    passages = [f"{p} #{i}" for i, p in enumerate(PASSAGES * 8)]
+    rag = HybridRAG(passages).apply_delta(["頭痛と発熱があるときの応急処置"], deleted=[1, 6])
+    single = rag.search_batch(QUERIES, top_k=5)
+    monkeypatch.setenv("RAG_SEARCH_SHARDS", "3")
+    monkeypatch.setenv("RAG_SHARD_MIN_PASSAGES", "0")
+    assert len(rag._shard_views(3)) == 3
+    assert rag.search_batch(QUERIES, top_k=5) == single
+
+
+def test_shard_config_falls_back_and_grown_pool_keeps_old_usable(monkeypatch):
+    monkeypatch.setenv("RAG_SHARD_MIN_PASSAGES", "0")
+    monkeypatch.setenv("RAG_SEARCH_SHARDS", "many")
+    assert configured_shards(100) == 1
+    monkeypatch.setenv("RAG_SEARCH_SHARDS", "4")
+    assert configured_shards(100) == 4
+
+    small = get_shard_pool(1)
+    larger = get_shard_pool(rag_shards._POOL_WORKERS + 1)
+    assert larger is not small and get_shard_pool(1) is larger
+    # 교체 전에 풀을 받아 간 검색도 계속 제출할 수 있음
+    assert small.submit(lambda: 7).result() == 7
+
+
+def test_passage_metadata_sidecar_roundtrip(tmp_path):
+    pdf_chunk = "[PDF: guide.pdf, 페이지: 2/5]\n止血の方法\n出血している傷は直接圧迫します。"
+    crawled = "# 증상: 코피가 나요\nURL: https://www.fdma.go.jp/relocation/\n鼻血の応急手当"
+    rag = HybridRAG(PASSAGES + [pdf_chunk], sources=["default"] * len(PASSAGES) + [""])
+    rag = rag.apply_delta([crawled], deleted=[0], sources=["nosebleed.txt"])
+
+    rec = rag.metadata.record(len(PASSAGES))
+    assert (rec.source_file, rec.title, rec.chunk_index) == ("guide.pdf", "止血の方法", 1)
+    rec = rag.metadata.record(len(PASSAGES) + 1)
+    assert (rec.source_file, rec.source_domain, rec.title) == ("nosebleed.txt", "www.fdma.go.jp", "증상: 코피가 나요")
+    assert rec.authority_weight == rag.source_weights[rec.id] > 1.0
+    assert rec.byte_end - rec.byte_start == len(crawled.encode("utf-8"))
+
+    # 검색 결과 id로 본문/메타데이터 조회
+    hits, merged = rag.search_batch_ids(["鼻血"], top_k=1)
+    assert rag.passage_text(hits[0][0][0]) == crawled
+
+    rag.save(tmp_path, "fp1")
+    loaded = HybridRAG.load(tmp_path, "fp1")
+    assert loaded.metadata.record(rec.id) == rec
+    compacted = loaded.compact()
+    assert compacted.metadata.record(len(compacted.passages) - 1).source_file == "nosebleed.txt"
+
+
+def test_passage_store_lazy_decode(tmp_path):
+    store = PassageStore.from_texts(PASSAGES[:3]).append(PASSAGES[3:])
+    assert len(store) == len(PASSAGES) and list(store) == PASSAGES
+    assert store[-1] == PASSAGES[-1] and store[1:3] == PASSAGES[1:3]
+
+    store.save(tmp_path, "p")
+    opened = PassageStore.open(tmp_path, "p")
+    assert isinstance(opened.blob, np.memmap) and list(opened) == PASSAGES
+
+    # 스냅샷 로드 후 본문은 mmap blob에서 조회 시점에 디코딩
+    rag = HybridRAG(PASSAGES).apply_delta(["熱中症は涼しい場所で休みます。"])
+    rag.save(tmp_path, "fp1")
+    loaded = HybridRAG.load(tmp_path, "fp1")
+    assert isinstance(loaded.passages.blob, np.memmap)
+    assert loaded.passage_text(len(PASSAGES)) == "熱中症は涼しい場所で休みます。"
+    assert loaded.search(QUERIES[0], top_k=1) == rag.search(QUERIES[0], top_k=1)
+
+
+def test_sentence_chunker_streams_pages_with_overlap():
+    sentence = "出血している傷は直接圧迫で止血します。"
+    pages = ((p, sentence * 30) for p in (1, 2, 3))  # 。만 있고 ". "는 없는 일본어 본문
+    chunks = list(chunk_pages(pages, max_chars=200, overlap=40))
+
+    assert all(len(c.text) <= 200 for c in chunks)
+    assert all(c.text.endswith("。") for c in chunks)  # 문장 중간에서 자르지 않음
+    assert chunks[0].page_label == "1" and chunks[-1].page_end == 3
+    assert any(c.page_label == "1-2" for c in chunks)
+    assert chunks[1].text.startswith(sentence)  # 직전 청크 끝 문장이 겹침
+    assert "".join(c.text for c in chunks).count(sentence) >= 90
+
+    header = "[PDF: guide.pdf, 페이지: 3-4/12, 청크: 5]\n止血の方法"
+    assert describe_passage(header) == ("guide.pdf", "", "止血の方法", 4)
+
+
+def test_near_duplicate_index_and_updater_quarantine(tmp_path, monkeypatch):
+    from backend.services_rag_updater import RAGUpdater
+
+    body = "".join(PASSAGES) * 3
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("a.txt", "# 크롤링 시간: 2025-09-12T14:18:44\n" + body)
+    # 크롤링 시간 줄만 다른 파일은 중복, 다른 내용은 중복 아님
+    assert index.query("# 크롤링 시간: 2025-09-12T14:19:57\n" + body)[0] == "a.txt"
+    assert index.query(PASSAGES[0] * 3) is None
+    index.save(tmp_path / "dedup.npz")
+    assert NearDuplicateIndex.load(tmp_path / "dedup.npz").query(body)[0] == "a.txt"
+
+    passages_dir = tmp_path / "jp"
+    passages_dir.mkdir()
+    (passages_dir / "old.txt").write_text(body, encoding="utf-8")
+    monkeypatch.setenv("RAG_DEDUP_INDEX", str(tmp_path / "jp_dedup.npz"))
+    updater = RAGUpdater(passages_dir=str(passages_dir))
+    updater.duplicates_dir = tmp_path / "duplicates"
+    (passages_dir / "copy.txt").write_text(body + "\n追記", encoding="utf-8")
+    (passages_dir / "new.txt").write_text(PASSAGES[1] * 5, encoding="utf-8")
+    updater._integrate_new_files([passages_dir / "copy.txt", passages_dir / "new.txt"])
+
+    assert sorted(p.name for p in passages_dir.glob("*.txt")) == ["new.txt", "old.txt"]
+    assert (tmp_path / "duplicates" / "copy.txt").exists()
+    assert sorted(NearDuplicateIndex.load(tmp_path / "jp_dedup.npz").keys()) == ["new.txt", "old.txt"]
+
+
+def test_updater_diff_touches_only_changed_files(tmp_path, monkeypatch):
+    from backend import services_rag_updater
+    from backend.services_rag_updater import RAGUpdater, _text_hash
+
+    passages_dir = tmp_path / "jp"
+    passages_dir.mkdir()
+    names = [f"p{i}.txt" for i in range(len(PASSAGES))]
+    for name, passage in zip(names, PASSAGES):
+        (passages_dir / name).write_text(passage, encoding="utf-8")
+    rag = HybridRAG(PASSAGES + ["[PDF: guide.pdf, 페이지: 1/1, 청크: 1]\n止血の方法"], sources=names + ["guide.pdf"])
+    previous = {name: _text_hash(p) for name, p in zip(names, PASSAGES)}
+
+    (passages_dir / "p1.txt").write_text("頭痛の応急処置（改訂）", encoding="utf-8")
+    (passages_dir / "p2.txt").unlink()
+    (passages_dir / "new.txt").write_text("熱中症は涼しい場所で休みます。", encoding="utf-8")
+    current = RAGUpdater(passages_dir=str(passages_dir))._current_passage_hashes()
+
+    decoded = []
+    hash_text = services_rag_updater._text_hash
+
+    def counting_hash(text):
+        decoded.append(text)
+        return hash_text(text)
+
+    monkeypatch.setattr(services_rag_updater, "_text_hash", counting_hash)
+    added, deleted, sources = RAGUpdater(passages_dir=str(passages_dir))._diff_index(rag, previous, current)
+    assert sorted(deleted) == [1, 2]
+    assert sorted(zip(sources, added)) == [("new.txt", "熱中症は涼しい場所で休みます。"), ("p1.txt", "頭痛の応急処置（改訂）")]
+    # 바뀐 파일(p1)의 행만 디코딩 — 나머지 패시지/PDF 청크는 읽지 않음
+    assert decoded == [PASSAGES[1]]